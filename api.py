@@ -17,11 +17,15 @@ from app.dependencies import (
     get_item_crawler,
     get_item_kline_processor,
     get_kline_processor,
+    get_prediction_pool,
+    get_prediction_processor,
     get_profit_processor,
     get_trade_notes_processor,
     get_user_actions,
     get_user_manager,
 )
+from app.integrations.quota import Priority, QuotaDeferred
+from models.prediction_pool import PredictionPoolBusy
 from app.routers.auth import router as auth_router
 from app.routers.bufftracker import router as bufftracker_router
 from app.routers.system import router as system_router
@@ -40,6 +44,7 @@ async def lifespan(app: FastAPI):
             ("用户表", user_manager.create_user_table),
             ("追踪表", user_actions.create_track_table),
             ("利润表", profit_processor.ensure_tables),
+            ("预测结果表", prediction_processor.ensure_tables),
             ("买卖笔记表", trade_notes_processor.ensure_tables),
         ]
         for label, bootstrap in bootstrappers:
@@ -53,7 +58,15 @@ async def lifespan(app: FastAPI):
     except Exception:
         logging.exception("核心数据表初始化失败，服务将继续启动并在请求时返回具体错误")
 
-    yield
+    # buff-tracker 连接池随应用启动创建、关闭时释放
+    await bufftracker_client.open()
+    # 预测进程池提前拉起并预热，首个预测请求不再承担导入开销
+    await prediction_pool.start()
+    try:
+        yield
+    finally:
+        prediction_pool.shutdown()
+        await bufftracker_client.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -99,6 +112,8 @@ user_actions = get_user_actions()
 profit_processor = get_profit_processor()
 trade_notes_processor = get_trade_notes_processor()
 bufftracker_client = get_bufftracker_client()
+prediction_pool = get_prediction_pool()
+prediction_processor = get_prediction_processor()
 
 # 延迟建表：不在模块加载时连接数据库，首次请求时再建
 _tables_ensured = False
@@ -581,11 +596,64 @@ async def get_item_kline_data(
         raise HTTPException(status_code=500, detail=f"获取饰品 K线数据失败: {e}")
 
 
+# 正在进行的后台K线刷新任务：{market_hash_name: (asyncio.Task, Priority)}，同一饰品只保留一个
+_kline_refresh_tasks: dict = {}
+
+
+def _schedule_kline_refresh(
+    name: str, priority: Priority = Priority.TRACKED_REFRESH
+) -> asyncio.Task:
+    """
+    启动（或复用）指定饰品的后台K线刷新任务。
+    同一饰品同时只会有一个刷新任务在跑，重复调用返回同一个 Task。
+    priority 决定配额紧张时该刷新能否立即占用上游配额：已有任务的优先级低于
+    本次调用时不复用（它可能正等待配额并最终放弃），改为按本次优先级新建任务，
+    之后的调用复用新任务。
+    """
+    entry = _kline_refresh_tasks.get(name)
+    if entry is not None and not entry[0].done() and entry[1] <= priority:
+        return entry[0]
+
+    task = asyncio.create_task(_fetch_and_store_kline_via_bufftracker(name, priority))
+    _kline_refresh_tasks[name] = (task, priority)
+
+    def _on_done(finished: asyncio.Task):
+        current = _kline_refresh_tasks.get(name)
+        if current is not None and current[0] is finished:
+            _kline_refresh_tasks.pop(name, None)
+        if not finished.cancelled() and finished.exception():
+            logging.error(f"后台K线刷新失败 ({name}): {finished.exception()}")
+
+    task.add_done_callback(_on_done)
+    return task
+
+
+def _is_kline_refreshing(name: str) -> bool:
+    entry = _kline_refresh_tasks.get(name)
+    return entry is not None and not entry[0].done()
+
+
+def _cached_kline_payload(name: str, cached_data, last_updated, stale: bool):
+    return {
+        "success": True,
+        "data": cached_data,
+        "source": "cache",
+        "last_updated": last_updated,
+        "version": last_updated,
+        "stale": stale,
+        "refreshing": _is_kline_refreshing(name),
+    }
+
+
 @app.get("/api/item/kline-cached/{market_hash_name}")
-async def get_cached_item_kline(market_hash_name: str):
+async def get_cached_item_kline(market_hash_name: str, version: Optional[str] = None):
     """
     快速读取缓存的K线数据，从 item_kline_day 表直接查询。
     用于追踪饰品的首屏加载，毫秒级响应。
+
+    stale-while-revalidate：缓存超过 1 小时仍立即返回（stale=true），
+    同时启动一个去重的后台刷新。客户端携带上次拿到的 version 轮询，
+    version 未变化时不重复返回数据（not_modified=true）。
     """
     try:
         loop = asyncio.get_event_loop()
@@ -594,34 +662,50 @@ async def get_cached_item_kline(market_hash_name: str):
             item_kline_processor.get_cached_kline_data,
             market_hash_name
         )
-        return {"success": True, "data": cached_data, "source": "cache", "last_updated": last_updated}
+        stale = not item_kline_processor.is_timestamp_fresh(last_updated)
+        if stale and cached_data:
+            _schedule_kline_refresh(market_hash_name)
+
+        payload = _cached_kline_payload(market_hash_name, cached_data, last_updated, stale)
+        if version and version == last_updated:
+            payload["data"] = []
+            payload["not_modified"] = True
+        return payload
     except Exception as e:
         logging.exception(f"读取缓存K线数据失败: {market_hash_name}")
         raise HTTPException(status_code=500, detail=f"读取缓存数据失败: {e}")
 
 
 @app.post("/api/item/kline-refresh/{market_hash_name}")
-async def refresh_item_kline(market_hash_name: str):
+async def refresh_item_kline(market_hash_name: str, wait: bool = False):
     """
     通过 buff-tracker API 获取最新K线数据并存入数据库。
     先检查缓存新鲜度，1小时内不重复抓取。
+
+    缓存过期但已有数据时直接返回旧数据（stale=true）并在后台刷新，
+    客户端通过 kline-cached 的 version 拿到新数据；无缓存或 wait=true 时
+    才等待刷新完成（与并发请求共享同一个刷新任务）。
     """
     try:
         loop = asyncio.get_event_loop()
-        # 检查缓存是否新鲜
-        is_fresh = await loop.run_in_executor(
-            None, item_kline_processor.is_cache_fresh, market_hash_name
+        cached_data, last_updated = await loop.run_in_executor(
+            None, item_kline_processor.get_cached_kline_data, market_hash_name
         )
-        if is_fresh:
-            cached_data, last_updated = await loop.run_in_executor(
-                None, item_kline_processor.get_cached_kline_data, market_hash_name
-            )
-            return {"success": True, "data": cached_data, "source": "cache", "last_updated": last_updated}
+        if item_kline_processor.is_timestamp_fresh(last_updated):
+            return _cached_kline_payload(market_hash_name, cached_data, last_updated, stale=False)
 
-        # 通过 buff-tracker API 获取并存入数据库
-        result = await _fetch_and_store_kline_via_bufftracker(market_hash_name)
+        interactive = wait or not cached_data
+        task = _schedule_kline_refresh(
+            market_hash_name,
+            Priority.INTERACTIVE if interactive else Priority.TRACKED_REFRESH,
+        )
+        if not interactive:
+            return _cached_kline_payload(market_hash_name, cached_data, last_updated, stale=True)
+
+        # 无缓存可返回：等待共享的交互优先级刷新任务（shield 防止客户端断开时取消任务）
+        result = await asyncio.shield(task)
         if result:
-            return {"success": True, "data": result, "source": "api"}
+            return {"success": True, "data": result, "source": "api", "stale": False, "refreshing": False}
         else:
             raise HTTPException(status_code=502, detail="获取K线数据失败，外部服务不可用")
     except HTTPException as e:
@@ -630,17 +714,21 @@ async def refresh_item_kline(market_hash_name: str):
         logging.exception(f"刷新K线数据失败: {market_hash_name}")
         raise HTTPException(status_code=500, detail=f"刷新K线数据失败: {e}")
 
-async def _fetch_and_store_kline_via_bufftracker(name: str):
+async def _fetch_and_store_kline_via_bufftracker(
+    name: str, priority: Priority = Priority.TRACKED_REFRESH
+):
     """
     通过 buff-tracker API 获取K线数据并存入数据库。
     本地 Playwright 爬虫在容器内 WAF 挑战容易失败，改用 buff-tracker API 更可靠。
+    请求前先经配额调度器准入，配额不足时低优先级刷新会被推迟并放弃。
     """
     try:
-        item_id = item_kline_processor.get_item_id_from_db(name)
+        item_id = await asyncio.to_thread(item_kline_processor.get_item_id_from_db, name)
         if not item_id:
             logging.error(f"未找到饰品 {name} 的 item_id，跳过K线数据获取。")
             return []
 
+        await bufftracker_client.quota.acquire(priority)
         data = await bufftracker_client.get_item_kline_data(
             name,
             platform="BUFF",
@@ -664,15 +752,14 @@ async def _fetch_and_store_kline_via_bufftracker(name: str):
         await loop.run_in_executor(None, item_kline_processor._store_parsed_kline, name, parsed)
         logging.info(f"成功为饰品 {name} 获取并存储了 {len(parsed)} 条K线数据。")
         return parsed
+    except QuotaDeferred as e:
+        logging.warning(f"配额不足，推迟K线刷新 ({name}): {e}")
+        return []
     except Exception as e:
         logging.error(f"获取K线数据失败 ({name}): {e}")
         return []
 
 
-async def _bg_fetch_kline(name: str):
-    """追踪饰品后的后台任务：获取并存储K线数据。"""
-    await _fetch_and_store_kline_via_bufftracker(name)
-
 @app.post("/api/track/add")
 async def add_track(request: TrackRequest):
     # 用 run_in_executor 在线程池中执行同步 pymysql 调用，避免阻塞事件循环
@@ -681,7 +768,7 @@ async def add_track(request: TrackRequest):
         None, user_actions.add_track_item, request.email, request.market_hash_name
     )
     if result["success"]:
-        asyncio.create_task(_bg_fetch_kline(request.market_hash_name))
+        _schedule_kline_refresh(request.market_hash_name)
         return result
     else:
         raise HTTPException(status_code=400, detail=result["message"])
@@ -1102,10 +1189,25 @@ def _latest_cached_price_pair(market_hash_name):
 async def predict_item_profit(market_hash_name: str, hold_days: int = 7):
     """
     预测指定饰品 7 天后的价格，并计算各平台卖出利润。
+    优先读取夜间预计算的 item_price_prediction 表；表中没有时才在
+    独立的预测进程池中按需训练/推理（不阻塞事件循环），并回写结果表。
     """
     try:
-        from models.item_price_predictor import predict_item_7d_range
-        prediction = predict_item_7d_range(market_hash_name)
+        loop = asyncio.get_event_loop()
+        prediction = await loop.run_in_executor(
+            None, prediction_processor.get_prediction, market_hash_name
+        )
+        prediction_source = "precomputed"
+        if not prediction:
+            prediction_source = "on_demand"
+            try:
+                prediction = await prediction_pool.predict_range(market_hash_name)
+            except PredictionPoolBusy as e:
+                raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+            if prediction:
+                await loop.run_in_executor(
+                    None, prediction_processor.save_predictions, {market_hash_name: prediction}
+                )
         if not prediction:
             raise HTTPException(
                 status_code=404,
@@ -1124,7 +1226,7 @@ async def predict_item_profit(market_hash_name: str, hold_days: int = 7):
         live_price_rows = []
         try:
             live_price_rows = _extract_price_rows(
-                await bufftracker_client.get_price(market_hash_name)
+                await bufftracker_client.get_price(market_hash_name, priority=Priority.INTERACTIVE)
             )
         except Exception:
             logging.exception(f"读取 {market_hash_name} 实时多平台价格失败")
@@ -1229,6 +1331,9 @@ async def predict_item_profit(market_hash_name: str, hold_days: int = 7):
                 "predicted_lower": prediction["lower"],
                 "predicted_upper": prediction["upper"],
                 "confidence": prediction["confidence"],
+                "prediction_source": prediction_source,
+                "model_version": prediction.get("model_version"),
+                "prediction_as_of": prediction.get("as_of"),
                 "price_nodes": {
                     "current_lowest_bidding": current_lowest_bidding_node,
                     "current_lowest_sell": current_lowest_sell_node,
@@ -1272,12 +1377,20 @@ async def get_tracked_items_profit(email: str):
         if not items:
             return {"success": True, "data": []}
 
-        # 2. 批量预测价格
-        from models.item_price_predictor import batch_predict_items
+        # 2. 读取预计算的预测结果，缺失的饰品在预测进程池内批量计算并回写
         names = [item["market_hash_name"] for item in items]
-        predicted_prices = await loop.run_in_executor(
-            None, batch_predict_items, names
+        predictions = await loop.run_in_executor(
+            None, prediction_processor.get_predictions, names
         )
+        missing = [name for name in names if name not in predictions]
+        if missing:
+            try:
+                computed = await prediction_pool.batch_predict_range(missing)
+            except PredictionPoolBusy as e:
+                raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+            await loop.run_in_executor(None, prediction_processor.save_predictions, computed)
+            predictions.update({name: p for name, p in computed.items() if p})
+        predicted_prices = {name: p["predicted"] for name, p in predictions.items()}
 
         # 3. 获取利润信息
         items_with_profit = await loop.run_in_executor(
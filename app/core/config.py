@@ -14,6 +14,13 @@ def _csv_env(name: str, default: list[str]) -> list[str]:
     return [item.strip() for item in raw.split(",") if item.strip()]
 
 
+def _bool_env(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
 @dataclass(frozen=True)
 class Settings:
     cors_origins: list[str] = field(default_factory=lambda: _csv_env(
@@ -27,6 +34,43 @@ class Settings:
         ],
     ))
     bufftracker_url: str = os.getenv("BUFFTRACKER_URL", "http://host.docker.internal:8001")
+    bufftracker_max_connections: int = int(os.getenv("BUFFTRACKER_MAX_CONNECTIONS", "50"))
+    bufftracker_max_keepalive_connections: int = int(
+        os.getenv("BUFFTRACKER_MAX_KEEPALIVE_CONNECTIONS", "20")
+    )
+    bufftracker_keepalive_expiry: float = float(os.getenv("BUFFTRACKER_KEEPALIVE_EXPIRY", "30"))
+    bufftracker_http2: bool = _bool_env("BUFFTRACKER_HTTP2", False)
+    bufftracker_cache_max_entries: int = int(os.getenv("BUFFTRACKER_CACHE_MAX_ENTRIES", "2048"))
+    bufftracker_price_ttl: float = float(os.getenv("BUFFTRACKER_PRICE_TTL", "60"))
+    bufftracker_search_ttl: float = float(os.getenv("BUFFTRACKER_SEARCH_TTL", "86400"))
+    bufftracker_negative_ttl: float = float(os.getenv("BUFFTRACKER_NEGATIVE_TTL", "300"))
+    bufftracker_max_retries: int = int(os.getenv("BUFFTRACKER_MAX_RETRIES", "2"))
+    bufftracker_retry_base_delay: float = float(os.getenv("BUFFTRACKER_RETRY_BASE_DELAY", "0.2"))
+    bufftracker_retry_max_delay: float = float(os.getenv("BUFFTRACKER_RETRY_MAX_DELAY", "2"))
+    bufftracker_breaker_failure_threshold: int = int(
+        os.getenv("BUFFTRACKER_BREAKER_FAILURE_THRESHOLD", "5")
+    )
+    bufftracker_breaker_reset_timeout: float = float(
+        os.getenv("BUFFTRACKER_BREAKER_RESET_TIMEOUT", "30")
+    )
+    bufftracker_hedge: bool = _bool_env("BUFFTRACKER_HEDGE", False)
+    bufftracker_quota_refresh_interval: float = float(
+        os.getenv("BUFFTRACKER_QUOTA_REFRESH_INTERVAL", "30")
+    )
+    bufftracker_quota_max_wait: float = float(os.getenv("BUFFTRACKER_QUOTA_MAX_WAIT", "60"))
+    bufftracker_quota_reserve_tracked: float = float(
+        os.getenv("BUFFTRACKER_QUOTA_RESERVE_TRACKED", "0.1")
+    )
+    bufftracker_quota_reserve_investigator: float = float(
+        os.getenv("BUFFTRACKER_QUOTA_RESERVE_INVESTIGATOR", "0.3")
+    )
+    bufftracker_quota_reserve_backfill: float = float(
+        os.getenv("BUFFTRACKER_QUOTA_RESERVE_BACKFILL", "0.5")
+    )
+    bufftracker_proxy_streaming: bool = _bool_env("BUFFTRACKER_PROXY_STREAMING", True)
+    bufftracker_proxy_chunk_size: int = int(os.getenv("BUFFTRACKER_PROXY_CHUNK_SIZE", "65536"))
+    predict_workers: int = int(os.getenv("PREDICT_WORKERS", "2"))
+    predict_max_pending: int = int(os.getenv("PREDICT_MAX_PENDING", "16"))
 
 
 settings = Settings()
@@ -1,13 +1,16 @@
 from functools import lru_cache
 
+from app.core.config import settings
 from app.integrations.bufftracker import BuffTrackerClient
 from crawler.item_price import DailyKlineCrawler
 from db.item_kline_processor import ItemKlineProcessor
 from db.kline_data_processor import KlineDataProcessor
+from db.prediction_processor import PredictionProcessor
 from db.profit_processor import ProfitProcessor
 from db.trade_notes_processor import TradeNotesProcessor
 from db.user_actions import UserActions
 from db.user_manager import UserManager
+from models.prediction_pool import PredictionPool
 
 
 @lru_cache
@@ -40,6 +43,11 @@ def get_profit_processor() -> ProfitProcessor:
     return ProfitProcessor()
 
 
+@lru_cache
+def get_prediction_processor() -> PredictionProcessor:
+    return PredictionProcessor()
+
+
 @lru_cache
 def get_trade_notes_processor() -> TradeNotesProcessor:
     return TradeNotesProcessor()
@@ -48,3 +56,11 @@ def get_trade_notes_processor() -> TradeNotesProcessor:
 @lru_cache
 def get_bufftracker_client() -> BuffTrackerClient:
     return BuffTrackerClient()
+
+
+@lru_cache
+def get_prediction_pool() -> PredictionPool:
+    return PredictionPool(
+        max_workers=settings.predict_workers,
+        max_pending=settings.predict_max_pending,
+    )
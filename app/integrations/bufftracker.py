@@ -1,11 +1,25 @@
 from __future__ import annotations
 
-from typing import Any, Iterable, Mapping
+import asyncio
+import importlib.util
+import logging
+import threading
+import time
+import weakref
+from typing import Any, AsyncIterator, Iterable, Mapping
 from urllib.parse import quote
 
 import httpx
 
 from app.core.config import settings
+from app.integrations.cache import TTLCache
+from app.integrations.quota import Priority, QuotaScheduler
+from app.integrations.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    RetryPolicy,
+)
 
 
 _HOP_BY_HOP_HEADERS = {
@@ -21,14 +35,151 @@ _HOP_BY_HOP_HEADERS = {
     "upgrade",
 }
 _PROXY_RESPONSE_HEADER_BLOCKLIST = _HOP_BY_HOP_HEADERS | {"content-encoding"}
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+_RETRYABLE_STATUS_CODES = {502, 503, 504}
+# Only failures that happen before upstream starts working on the request are
+# retried; timeouts already cost a full client timeout and are not repeated.
+_RETRYABLE_TRANSPORT_ERRORS = (httpx.ConnectError, httpx.RemoteProtocolError)
+
+logger = logging.getLogger(__name__)
 
 
 class BuffTrackerClient:
-    """HTTP adapter for the external buff-tracker service."""
+    """HTTP adapter for the external buff-tracker service.
+
+    Async and sync calls each share one long-lived httpx client, so repeated
+    requests reuse pooled keep-alive connections instead of reconnecting.
+    Every call goes through a circuit breaker; idempotent GETs are retried
+    with jittered backoff on connection errors and 502/503/504 (never on
+    timeouts) and may be hedged after the recent p95 latency.
+    Callers spending SteamDT quota ask ``self.quota`` for admission first.
+    """
 
-    def __init__(self, base_url: str | None = None, timeout: float = 30.0):
+    def __init__(
+        self,
+        base_url: str | None = None,
+        timeout: float = 30.0,
+        max_connections: int | None = None,
+        max_keepalive_connections: int | None = None,
+        keepalive_expiry: float | None = None,
+        http2: bool | None = None,
+        cache_ttls: Mapping[str, float] | None = None,
+        cache_max_entries: int | None = None,
+        retry_policy: RetryPolicy | None = None,
+        breaker: CircuitBreaker | None = None,
+        hedge: bool | None = None,
+    ):
         self.base_url = (base_url or settings.bufftracker_url).rstrip("/")
         self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.bufftracker_max_connections,
+            max_keepalive_connections=(
+                max_keepalive_connections or settings.bufftracker_max_keepalive_connections
+            ),
+            keepalive_expiry=(
+                keepalive_expiry
+                if keepalive_expiry is not None
+                else settings.bufftracker_keepalive_expiry
+            ),
+        )
+        self.http2 = self._resolve_http2(settings.bufftracker_http2 if http2 is None else http2)
+        self._async_client: httpx.AsyncClient | None = None
+        self._async_client_loop: asyncio.AbstractEventLoop | None = None
+        self._async_client_guard: asyncio.Task | None = None
+        self._async_lock = threading.Lock()
+        self._sync_client: httpx.Client | None = None
+        self._sync_lock = threading.Lock()
+        # Per-endpoint TTLs in seconds; "negative" applies to not-found answers.
+        self.cache_ttls = {
+            "price": settings.bufftracker_price_ttl,
+            "search": settings.bufftracker_search_ttl,
+            "negative": settings.bufftracker_negative_ttl,
+            **(cache_ttls or {}),
+        }
+        self.cache = TTLCache(cache_max_entries or settings.bufftracker_cache_max_entries)
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_retries=settings.bufftracker_max_retries,
+            base_delay=settings.bufftracker_retry_base_delay,
+            max_delay=settings.bufftracker_retry_max_delay,
+        )
+        self.breaker = breaker or CircuitBreaker(
+            "buff-tracker",
+            failure_threshold=settings.bufftracker_breaker_failure_threshold,
+            reset_timeout=settings.bufftracker_breaker_reset_timeout,
+        )
+        self.hedge = settings.bufftracker_hedge if hedge is None else hedge
+        self.latency = LatencyTracker()
+        self._resilience_counters = {"retries": 0, "hedged": 0, "hedge_wins": 0, "stale_served": 0}
+        self.quota = QuotaScheduler(
+            self.get_quota,
+            self.get_quota_sync,
+            reserves={
+                Priority.TRACKED_REFRESH: settings.bufftracker_quota_reserve_tracked,
+                Priority.INVESTIGATOR: settings.bufftracker_quota_reserve_investigator,
+                Priority.BACKFILL: settings.bufftracker_quota_reserve_backfill,
+            },
+            refresh_interval=settings.bufftracker_quota_refresh_interval,
+            max_wait=settings.bufftracker_quota_max_wait,
+        )
+        self._pool_counters = {
+            "async_clients_opened": 0,
+            "sync_clients_opened": 0,
+            "requests": 0,
+            "errors": 0,
+            "in_flight": 0,
+        }
+        self._counters_lock = threading.Lock()
+        self._open_streams: weakref.WeakSet[httpx.Response] = weakref.WeakSet()
+
+    async def open(self) -> None:
+        """Create the async pool eagerly (called from the FastAPI lifespan)."""
+        self._get_async_client()
+
+    async def aclose(self) -> None:
+        """Close both pools; later calls transparently reopen them."""
+        with self._async_lock:
+            async_client, self._async_client = self._async_client, None
+            self._async_client_loop = None
+            guard, self._async_client_guard = self._async_client_guard, None
+        if guard is not None:
+            guard.cancel()
+        if async_client is not None:
+            await async_client.aclose()
+        self.close()
+
+    def close(self) -> None:
+        with self._sync_lock:
+            sync_client, self._sync_client = self._sync_client, None
+        if sync_client is not None:
+            sync_client.close()
+
+    def pool_stats(self) -> dict[str, Any]:
+        """Connection pool configuration, usage counters and live connections."""
+        return {
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "http2": self.http2,
+            **self._counters_snapshot(),
+            "async_connections": self._connection_stats(self._async_client),
+            "sync_connections": self._connection_stats(self._sync_client),
+        }
+
+    def resilience_stats(self) -> dict[str, Any]:
+        return {
+            "breaker": self.breaker.stats(),
+            "hedge": self.hedge,
+            "latency_p95": self.latency.percentile(0.95),
+            **self._resilience_counters,
+        }
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pool": self.pool_stats(),
+            "cache": self.cache.stats(),
+            "resilience": self.resilience_stats(),
+            "quota": self.quota.stats(),
+        }
 
     def build_url(self, path: str) -> str:
         normalized_path = self._normalize_path(path)
@@ -45,13 +196,86 @@ class BuffTrackerClient:
         body: bytes | None = None,
     ) -> httpx.Response:
         target_url = self._append_query(self.build_url(path), query)
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            return await client.request(
-                method=method,
-                url=target_url,
-                headers=self._forward_headers(headers),
-                content=body,
-            )
+        return await self._request(
+            method,
+            target_url,
+            headers=self._forward_headers(headers),
+            content=body,
+        )
+
+    async def proxy_stream(
+        self,
+        method: str,
+        path: str,
+        query: str | bytes | None = None,
+        headers: Mapping[str, str] | Iterable[tuple[str, str]] | None = None,
+        body: AsyncIterator[bytes] | None = None,
+    ) -> httpx.Response:
+        """Send a proxied request without buffering either body.
+
+        ``body`` is piped upstream as it arrives and the returned response is
+        still open: the caller must drain it through ``iter_stream`` and also
+        call ``release_stream`` once done, since the body may never be read
+        (e.g. the client disconnects first). Streams cannot be replayed, so
+        there are no retries or hedging here, but the circuit breaker still
+        applies.
+        """
+        forward_headers = self._forward_headers(headers)
+        content_length = self._header_value(headers, "content-length")
+        if body is not None and content_length is not None:
+            # Keep a fixed-length upload instead of switching to chunked encoding.
+            forward_headers["Content-Length"] = content_length
+        elif content_length is None and self._header_value(headers, "transfer-encoding") is None:
+            body = None
+
+        client = self._get_async_client()
+        request = client.build_request(
+            method,
+            self._append_query(self.build_url(path), query),
+            headers=forward_headers,
+            content=body,
+        )
+        probe = self.breaker.before_call()
+        self._count(requests=1, in_flight=1)
+        try:
+            response = await client.send(request, stream=True)
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            self._count(errors=1, in_flight=-1)
+            raise
+        except BaseException:
+            # Client disconnects and cancellations say nothing about upstream.
+            self.breaker.release(probe)
+            self._count(errors=1, in_flight=-1)
+            raise
+        if response.status_code in _RETRYABLE_STATUS_CODES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        with self._counters_lock:
+            self._open_streams.add(response)
+        return response
+
+    async def iter_stream(
+        self,
+        response: httpx.Response,
+        chunk_size: int | None = None,
+    ) -> AsyncIterator[bytes]:
+        """Yield a ``proxy_stream`` response body and release it when done."""
+        try:
+            async for chunk in response.aiter_bytes(chunk_size):
+                yield chunk
+        finally:
+            await self.release_stream(response)
+
+    async def release_stream(self, response: httpx.Response) -> None:
+        """Close a ``proxy_stream`` response; safe to call more than once."""
+        with self._counters_lock:
+            owned = response in self._open_streams
+            self._open_streams.discard(response)
+            if owned:
+                self._pool_counters["in_flight"] -= 1
+        await response.aclose()
 
     async def get_item_kline_data(
         self,
@@ -59,14 +283,17 @@ class BuffTrackerClient:
         platform: str = "BUFF",
         type_day: str = "1",
         date_type: int = 3,
+        timeout: float | None = None,
     ) -> dict[str, Any]:
         encoded_name = quote(market_hash_name, safe="")
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(
-                self.build_url(f"item/kline-data/{encoded_name}"),
-                params={"platform": platform, "type_day": type_day, "date_type": date_type},
-            )
-            return response.json()
+        extra = {"timeout": timeout} if timeout is not None else {}
+        response = await self._request(
+            "GET",
+            self.build_url(f"item/kline-data/{encoded_name}"),
+            params={"platform": platform, "type_day": type_day, "date_type": date_type},
+            **extra,
+        )
+        return response.json()
 
     def get_item_kline_data_sync(
         self,
@@ -74,27 +301,46 @@ class BuffTrackerClient:
         platform: str = "BUFF",
         type_day: str = "1",
         date_type: int = 3,
+        timeout: float | None = None,
     ) -> dict[str, Any]:
         encoded_name = quote(market_hash_name, safe="")
-        response = httpx.get(
+        extra = {"timeout": timeout} if timeout is not None else {}
+        response = self._request_sync(
+            "GET",
             self.build_url(f"item/kline-data/{encoded_name}"),
             params={"platform": platform, "type_day": type_day, "date_type": date_type},
-            timeout=self.timeout,
+            **extra,
         )
         return response.json()
 
     async def search_items(self, name: str, num: int = 10) -> dict[str, Any]:
-        return await self._get_json("search", params={"name": name, "num": num})
+        return await self._get_json_cached("search", "search", params={"name": name, "num": num})
+
+    def search_items_sync(self, name: str, num: int = 10) -> dict[str, Any]:
+        return self._get_json_cached_sync("search", "search", params={"name": name, "num": num})
 
-    async def get_price(self, market_hash_name: str) -> dict[str, Any]:
+    async def get_price(
+        self,
+        market_hash_name: str,
+        priority: Priority | None = None,
+    ) -> dict[str, Any]:
+        """Multi-platform prices; with ``priority``, a cache miss is admitted by ``quota``."""
         encoded_name = quote(market_hash_name, safe="")
-        return await self._get_json(f"price/{encoded_name}")
+        return await self._get_json_cached("price", f"price/{encoded_name}", priority=priority)
 
     async def get_quota(self) -> dict[str, Any]:
         return await self._get_json("quota")
 
+    def get_quota_sync(self) -> dict[str, Any]:
+        response = self._request_sync("GET", self.build_url("quota"))
+        return response.json()
+
     def get_base_items_sync(self) -> dict[str, Any]:
-        response = httpx.get(self.build_url("base"), timeout=max(self.timeout, 60.0))
+        response = self._request_sync(
+            "GET",
+            self.build_url("base"),
+            timeout=max(self.timeout, 60.0),
+        )
         response.raise_for_status()
         return response.json()
 
@@ -103,9 +349,281 @@ class BuffTrackerClient:
         path: str,
         params: Mapping[str, Any] | None = None,
     ) -> dict[str, Any]:
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(self.build_url(path), params=params)
-            return response.json()
+        response = await self._request("GET", self.build_url(path), params=params)
+        return response.json()
+
+    async def _get_json_cached(
+        self,
+        endpoint: str,
+        path: str,
+        params: Mapping[str, Any] | None = None,
+        priority: Priority | None = None,
+    ) -> dict[str, Any]:
+        key = self._cache_key(endpoint, path, params)
+        found, payload = self.cache.get(key)
+        if found:
+            return payload
+        try:
+            if priority is not None:
+                await self.quota.acquire(priority)
+            response = await self._request("GET", self.build_url(path), params=params)
+        except Exception:
+            return self._stale_or_raise(key)
+        if response.status_code >= 500:
+            found, payload = self._stale(key)
+            if found:
+                return payload
+        payload = response.json()
+        self._store_response(endpoint, key, response.status_code, payload)
+        return payload
+
+    def _get_json_cached_sync(
+        self,
+        endpoint: str,
+        path: str,
+        params: Mapping[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        key = self._cache_key(endpoint, path, params)
+        found, payload = self.cache.get(key)
+        if found:
+            return payload
+        try:
+            response = self._request_sync("GET", self.build_url(path), params=params)
+        except Exception:
+            return self._stale_or_raise(key)
+        if response.status_code >= 500:
+            found, payload = self._stale(key)
+            if found:
+                return payload
+        payload = response.json()
+        self._store_response(endpoint, key, response.status_code, payload)
+        return payload
+
+    def _stale(self, key: tuple) -> tuple[bool, Any]:
+        found, payload = self.cache.get_stale(key)
+        if found:
+            self._resilience_counters["stale_served"] += 1
+        return found, payload
+
+    def _stale_or_raise(self, key: tuple) -> Any:
+        """Serve an expired cached answer while upstream is failing, else re-raise."""
+        found, payload = self._stale(key)
+        if found:
+            logger.warning("buff-tracker unavailable, serving stale cache for %s", key[1])
+            return payload
+        raise
+
+    def _store_response(self, endpoint: str, key: tuple, status_code: int, payload: Any) -> None:
+        # Upstream failures are never cached; only definitive answers are.
+        if status_code >= 500 or status_code == 429:
+            return
+        if isinstance(payload, dict) and payload.get("success") and payload.get("data"):
+            self.cache.set(key, payload, self.cache_ttls.get(endpoint, 0))
+        else:
+            self.cache.set(key, payload, self.cache_ttls["negative"], negative=True)
+
+    @staticmethod
+    def _cache_key(endpoint: str, path: str, params: Mapping[str, Any] | None) -> tuple:
+        return (endpoint, path, tuple(sorted((params or {}).items())))
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        client = self._get_async_client()
+        idempotent = method.upper() in _IDEMPOTENT_METHODS
+        attempts = 1 + (self.retry_policy.max_retries if idempotent else 0)
+        self._count(requests=1, in_flight=1)
+        try:
+            for attempt in range(attempts):
+                if attempt:
+                    self._resilience_counters["retries"] += 1
+                    await asyncio.sleep(self.retry_policy.delay(attempt - 1))
+                probe = self.breaker.before_call()
+                started = time.monotonic()
+                try:
+                    if idempotent and self.hedge:
+                        response = await self._send_hedged(client, method, url, kwargs)
+                    else:
+                        response = await client.request(method, url, **kwargs)
+                except httpx.TransportError as error:
+                    self.breaker.record_failure()
+                    if attempt + 1 >= attempts or not isinstance(error, _RETRYABLE_TRANSPORT_ERRORS):
+                        raise
+                    continue
+                except BaseException:
+                    self.breaker.release(probe)
+                    raise
+                if self._record_outcome(response, time.monotonic() - started) and attempt + 1 < attempts:
+                    continue
+                return response
+        except Exception:
+            self._count(errors=1)
+            raise
+        finally:
+            self._count(in_flight=-1)
+
+    def _request_sync(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        client = self._get_sync_client()
+        idempotent = method.upper() in _IDEMPOTENT_METHODS
+        attempts = 1 + (self.retry_policy.max_retries if idempotent else 0)
+        self._count(requests=1, in_flight=1)
+        try:
+            for attempt in range(attempts):
+                if attempt:
+                    self._resilience_counters["retries"] += 1
+                    time.sleep(self.retry_policy.delay(attempt - 1))
+                probe = self.breaker.before_call()
+                started = time.monotonic()
+                try:
+                    response = client.request(method, url, **kwargs)
+                except httpx.TransportError as error:
+                    self.breaker.record_failure()
+                    if attempt + 1 >= attempts or not isinstance(error, _RETRYABLE_TRANSPORT_ERRORS):
+                        raise
+                    continue
+                except BaseException:
+                    self.breaker.release(probe)
+                    raise
+                if self._record_outcome(response, time.monotonic() - started) and attempt + 1 < attempts:
+                    continue
+                return response
+        except Exception:
+            self._count(errors=1)
+            raise
+        finally:
+            self._count(in_flight=-1)
+
+    def _record_outcome(self, response: httpx.Response, elapsed: float) -> bool:
+        """Feed the breaker and latency window; return True if worth retrying."""
+        if response.status_code in _RETRYABLE_STATUS_CODES:
+            self.breaker.record_failure()
+            return True
+        self.breaker.record_success()
+        self.latency.record(elapsed)
+        return False
+
+    async def _send_hedged(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        url: str,
+        kwargs: Mapping[str, Any],
+    ) -> httpx.Response:
+        """Fire a second identical request if the first outlives the recent p95."""
+        hedge_after = self.latency.percentile(0.95)
+        primary = asyncio.ensure_future(client.request(method, url, **kwargs))
+        if hedge_after is None:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        self._resilience_counters["hedged"] += 1
+        hedge = asyncio.ensure_future(client.request(method, url, **kwargs))
+        pending = {primary, hedge}
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._resilience_counters["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        # Pooled connections belong to one event loop; scripts that call
+        # asyncio.run() repeatedly get a fresh pool per loop.
+        with self._async_lock:
+            if self._async_client is not None and self._async_client_loop is loop:
+                return self._async_client
+            stale, stale_loop = self._async_client, self._async_client_loop
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+            )
+            self._async_client, self._async_client_loop = client, loop
+            if loop is not None:
+                # asyncio.run() cancels leftover tasks before closing its loop,
+                # so the pool is closed on the loop that owns its connections.
+                self._async_client_guard = loop.create_task(self._close_with_loop(client))
+        self._count(async_clients_opened=1)
+        if stale is not None:
+            self._retire_async_client(stale, stale_loop)
+        return client
+
+    async def _close_with_loop(self, client: httpx.AsyncClient) -> None:
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            with self._async_lock:
+                if self._async_client is client:
+                    self._async_client = None
+                    self._async_client_loop = None
+                    self._async_client_guard = None
+            await client.aclose()
+
+    @staticmethod
+    def _retire_async_client(
+        client: httpx.AsyncClient,
+        loop: asyncio.AbstractEventLoop | None,
+    ) -> None:
+        """Close a pool replaced by one for another event loop."""
+        if client.is_closed:
+            return
+        if loop is not None and loop.is_running():
+            # The owning loop lives on in another thread; close it there.
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        elif loop is not None:
+            logger.warning("Dropping a buff-tracker pool whose event loop is no longer running")
+
+    def _count(self, **deltas: int) -> None:
+        with self._counters_lock:
+            for name, delta in deltas.items():
+                self._pool_counters[name] += delta
+
+    def _counters_snapshot(self) -> dict[str, int]:
+        with self._counters_lock:
+            return dict(self._pool_counters)
+
+    def _get_sync_client(self) -> httpx.Client:
+        with self._sync_lock:
+            if self._sync_client is None:
+                self._sync_client = httpx.Client(
+                    timeout=self.timeout,
+                    limits=self.limits,
+                    http2=self.http2,
+                )
+                self._count(sync_clients_opened=1)
+            return self._sync_client
+
+    @staticmethod
+    def _resolve_http2(requested: bool) -> bool:
+        if requested and importlib.util.find_spec("h2") is None:
+            logger.warning("BUFFTRACKER_HTTP2 is enabled but the h2 package is missing; using HTTP/1.1")
+            return False
+        return requested
+
+    @staticmethod
+    def _connection_stats(client: httpx.AsyncClient | httpx.Client | None) -> dict[str, int]:
+        # httpx has no public pool API; read httpcore's pool defensively.
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = 0
+        for connection in connections:
+            try:
+                idle += 1 if connection.is_idle() else 0
+            except Exception:
+                continue
+        return {"open": len(connections), "idle": idle, "active": len(connections) - idle}
 
     @staticmethod
     def _join(*parts: str) -> str:
@@ -138,6 +656,19 @@ class BuffTrackerClient:
             if key.lower() not in _HOP_BY_HOP_HEADERS
         }
 
+    @staticmethod
+    def _header_value(
+        headers: Mapping[str, str] | Iterable[tuple[str, str]] | None,
+        name: str,
+    ) -> str | None:
+        if not headers:
+            return None
+        items = headers.items() if hasattr(headers, "items") else headers
+        for key, value in items:
+            if key.lower() == name:
+                return value
+        return None
+
     @staticmethod
     def response_headers(
         headers: Mapping[str, str] | Iterable[tuple[str, str]],
@@ -0,0 +1,84 @@
+"""In-process response cache shared by integration clients."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a per-entry TTL.
+
+    Entries are stored as positive (a real answer) or negative (the upstream
+    said "not found"), so callers can give misses a shorter lifetime and
+    report them separately in the hit/miss counters. Expired entries stay
+    until LRU eviction so ``get_stale`` can serve them when upstream is down.
+    """
+
+    def __init__(self, max_entries: int = 2048, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max(1, max_entries)
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, bool, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "stale_hits": 0,
+        }
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        """Return ``(found, value)``; expired entries count as misses."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return False, None
+            expires_at, negative, value = entry
+            if expires_at <= self._clock():
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._counters["negative_hits" if negative else "hits"] += 1
+            return True, value
+
+    def get_stale(self, key: Hashable) -> tuple[bool, Any]:
+        """Return a positive entry even if expired (fallback when upstream fails)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1]:
+                return False, None
+            self._counters["stale_hits"] += 1
+            return True, entry[2]
+
+    def set(self, key: Hashable, value: Any, ttl: float, negative: bool = False) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, negative, value)
+            self._entries.move_to_end(key)
+            self._counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["negative_hits"] + self._counters["misses"]
+            served = self._counters["hits"] + self._counters["negative_hits"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                **self._counters,
+                "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,215 @@
+"""Quota-aware admission control for upstream (SteamDT) requests."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Mapping
+
+
+logger = logging.getLogger(__name__)
+
+QUOTA_BUCKETS = ("single", "batch", "base")
+
+
+class Priority(IntEnum):
+    """Request classes, most important first."""
+
+    INTERACTIVE = 0
+    TRACKED_REFRESH = 1
+    INVESTIGATOR = 2
+    BACKFILL = 3
+
+
+class QuotaDeferred(RuntimeError):
+    """Raised when a low-priority request is not admitted before its deadline."""
+
+    def __init__(self, priority: Priority, bucket: str, remaining: float | None):
+        super().__init__(
+            f"{priority.name.lower()} request deferred: {bucket} quota at {remaining}"
+        )
+        self.priority = priority
+        self.bucket = bucket
+        self.remaining = remaining
+
+
+class QuotaScheduler:
+    """Admit upstream requests by priority against the remaining quota.
+
+    The quota snapshot is re-read at most every ``refresh_interval`` seconds
+    and decremented locally for each admitted request in between. A request
+    of a given priority is admitted while the remaining fraction of its bucket
+    is at or above that priority's reserve; interactive requests are always
+    admitted. Each process keeps its own scheduler, but every refresh reads
+    the real upstream quota, so usage from other processes is picked up.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[Mapping[str, Any]]],
+        fetch_sync: Callable[[], Mapping[str, Any]],
+        reserves: Mapping[Priority, float] | None = None,
+        refresh_interval: float = 30.0,
+        max_wait: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._fetch = fetch
+        self._fetch_sync = fetch_sync
+        self.reserves = {
+            Priority.INTERACTIVE: 0.0,
+            Priority.TRACKED_REFRESH: 0.1,
+            Priority.INVESTIGATOR: 0.3,
+            Priority.BACKFILL: 0.5,
+            **(reserves or {}),
+        }
+        self.refresh_interval = refresh_interval
+        self.max_wait = max_wait
+        self._clock = clock
+        self._lock = threading.Lock()
+        # bucket -> [remaining, total]; empty until the first successful refresh.
+        self._buckets: dict[str, list[float]] = {}
+        self._fetched_at: float | None = None
+        self._refresh_started_at: float | None = None
+        self._used_since_refresh = {bucket: 0 for bucket in QUOTA_BUCKETS}
+        self._counters = {
+            priority.name.lower(): {"granted": 0, "deferred": 0, "rejected": 0}
+            for priority in Priority
+        }
+        self._refresh_errors = 0
+
+    async def acquire(
+        self,
+        priority: Priority,
+        bucket: str = "single",
+        max_wait: float | None = None,
+    ) -> None:
+        """Wait until ``priority`` may spend one unit of ``bucket``.
+
+        Raises QuotaDeferred if quota is still too low after ``max_wait``.
+        """
+        if priority != Priority.INTERACTIVE and self._refresh_due():
+            await self._refresh()
+        deadline = self._clock() + (self.max_wait if max_wait is None else max_wait)
+        waited = False
+        while not self._try_admit(priority, bucket):
+            now = self._clock()
+            if now >= deadline:
+                self._reject(priority, bucket)
+            if not waited:
+                self._count(priority, "deferred")
+                waited = True
+            await asyncio.sleep(min(self.refresh_interval, deadline - now))
+            await self._refresh()
+
+    def acquire_sync(
+        self,
+        priority: Priority,
+        bucket: str = "single",
+        max_wait: float | None = None,
+    ) -> None:
+        """Blocking variant of ``acquire`` for scripts and worker threads."""
+        if priority != Priority.INTERACTIVE and self._refresh_due():
+            self._refresh_sync()
+        deadline = self._clock() + (self.max_wait if max_wait is None else max_wait)
+        waited = False
+        while not self._try_admit(priority, bucket):
+            now = self._clock()
+            if now >= deadline:
+                self._reject(priority, bucket)
+            if not waited:
+                self._count(priority, "deferred")
+                waited = True
+            time.sleep(min(self.refresh_interval, deadline - now))
+            self._refresh_sync()
+
+    def update(self, payload: Mapping[str, Any]) -> None:
+        """Replace the snapshot with a quota payload from buff-tracker."""
+        data = payload.get("data") if isinstance(payload.get("data"), Mapping) else payload
+        buckets = {}
+        for bucket in QUOTA_BUCKETS:
+            remaining = data.get(f"{bucket}_remaining")
+            total = data.get(f"{bucket}_total")
+            if remaining is None or not total:
+                continue
+            buckets[bucket] = [float(remaining), float(total)]
+        with self._lock:
+            self._buckets = buckets
+            self._fetched_at = self._clock()
+            self._refresh_started_at = None
+            self._used_since_refresh = {bucket: 0 for bucket in QUOTA_BUCKETS}
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            now = self._clock()
+            return {
+                "buckets": {
+                    bucket: {
+                        "remaining": remaining,
+                        "total": total,
+                        "fraction": round(remaining / total, 4),
+                        "used_since_refresh": self._used_since_refresh.get(bucket, 0),
+                    }
+                    for bucket, (remaining, total) in self._buckets.items()
+                },
+                "snapshot_age": round(now - self._fetched_at, 1) if self._fetched_at is not None else None,
+                "refresh_errors": self._refresh_errors,
+                "reserves": {priority.name.lower(): share for priority, share in self.reserves.items()},
+                "priorities": {name: dict(counts) for name, counts in self._counters.items()},
+            }
+
+    def _try_admit(self, priority: Priority, bucket: str) -> bool:
+        with self._lock:
+            counts = self._counters[priority.name.lower()]
+            entry = self._buckets.get(bucket)
+            # Unknown quota (never fetched, or upstream omits the bucket) fails open.
+            if entry is not None and priority != Priority.INTERACTIVE:
+                remaining, total = entry
+                if remaining <= 0 or remaining / total < self.reserves[priority]:
+                    return False
+            if entry is not None:
+                entry[0] = max(0.0, entry[0] - 1)
+            self._used_since_refresh[bucket] = self._used_since_refresh.get(bucket, 0) + 1
+            counts["granted"] += 1
+            return True
+
+    def _count(self, priority: Priority, outcome: str) -> None:
+        with self._lock:
+            self._counters[priority.name.lower()][outcome] += 1
+
+    def _reject(self, priority: Priority, bucket: str) -> None:
+        self._count(priority, "rejected")
+        with self._lock:
+            entry = self._buckets.get(bucket)
+        raise QuotaDeferred(priority, bucket, entry[0] if entry else None)
+
+    def _refresh_due(self) -> bool:
+        with self._lock:
+            now = self._clock()
+            if self._fetched_at is not None and now - self._fetched_at < self.refresh_interval:
+                return False
+            # Only one caller refreshes at a time; others use the current snapshot.
+            if self._refresh_started_at is not None and now - self._refresh_started_at < self.refresh_interval:
+                return False
+            self._refresh_started_at = now
+            return True
+
+    async def _refresh(self) -> None:
+        try:
+            self.update(await self._fetch())
+        except Exception as exc:
+            self._refresh_failed(exc)
+
+    def _refresh_sync(self) -> None:
+        try:
+            self.update(self._fetch_sync())
+        except Exception as exc:
+            self._refresh_failed(exc)
+
+    def _refresh_failed(self, exc: Exception) -> None:
+        with self._lock:
+            self._refresh_errors += 1
+            self._refresh_started_at = None
+        logger.warning("Failed to refresh buff-tracker quota: %r", exc)
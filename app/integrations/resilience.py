@@ -0,0 +1,163 @@
+"""Failure-handling primitives for calls to external services."""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling upstream while the circuit breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed → open after consecutive failures → half-open probe → closed.
+
+    While open every call fails immediately. Once ``reset_timeout`` has
+    passed, up to ``half_open_max_calls`` probes are let through; a probe
+    success closes the circuit and a probe failure re-opens it. A probe that
+    ends without an outcome (cancelled, or failed before reaching upstream)
+    must hand its slot back through ``release``.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._half_open_round = 0
+        self._counters = {"opened": 0, "short_circuited": 0, "failures": 0, "successes": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def before_call(self) -> int | None:
+        """Reserve permission for one upstream call or raise CircuitOpenError.
+
+        Returns a probe token when the call took a half-open slot, else None.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return None
+            if state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return self._half_open_round
+            self._counters["short_circuited"] += 1
+            retry_after = max(0.0, self._opened_at + self.reset_timeout - self._clock())
+        raise CircuitOpenError(self.name, retry_after)
+
+    def release(self, probe: int | None) -> None:
+        """Return a probe slot whose call ended without a success or failure.
+
+        Slots from an earlier half-open round are ignored: the transition that
+        ended that round already reset the count.
+        """
+        if probe is None:
+            return
+        with self._lock:
+            if (
+                self._current_state() == self.HALF_OPEN
+                and probe == self._half_open_round
+                and self._half_open_calls > 0
+            ):
+                self._half_open_calls -= 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._counters["successes"] += 1
+            self._consecutive_failures = 0
+            if self._state != self.CLOSED:
+                self._state = self.CLOSED
+                self._half_open_calls = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._counters["failures"] += 1
+            self._consecutive_failures += 1
+            state = self._current_state()
+            if state == self.HALF_OPEN or (
+                state == self.CLOSED and self._consecutive_failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._half_open_calls = 0
+                self._counters["opened"] += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                **self._counters,
+            }
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+            self._half_open_round += 1
+        return self._state
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Capped exponential backoff with full jitter."""
+
+    max_retries: int = 2
+    base_delay: float = 0.2
+    max_delay: float = 2.0
+
+    def delay(self, retry_number: int) -> float:
+        cap = min(self.max_delay, self.base_delay * (2 ** retry_number))
+        return random.uniform(0, cap)
+
+
+class LatencyTracker:
+    """Sliding window of recent successful latencies for hedge timing."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+        return ordered[index]
@@ -1,9 +1,13 @@
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
+from app.core.config import settings
 from app.dependencies import get_bufftracker_client
 from app.integrations.bufftracker import BuffTrackerClient
+from app.integrations.resilience import CircuitOpenError
 
 
 router = APIRouter(prefix="/api/bufftracker", tags=["bufftracker"])
@@ -15,8 +19,27 @@ async def proxy_bufftracker(
     path: str,
     client: BuffTrackerClient = Depends(get_bufftracker_client),
 ):
-    """Proxy buff-tracker requests through Buffotte to avoid mixed-content issues."""
+    """Proxy buff-tracker requests through Buffotte to avoid mixed-content issues.
+
+    By default request and response bodies are streamed chunk by chunk, so
+    large payloads such as the ``/base`` item list are never held in memory.
+    """
     try:
+        if settings.bufftracker_proxy_streaming:
+            response = await client.proxy_stream(
+                method=request.method,
+                path=path,
+                query=request.url.query,
+                headers=request.headers,
+                body=request.stream(),
+            )
+            return StreamingResponse(
+                client.iter_stream(response, settings.bufftracker_proxy_chunk_size),
+                status_code=response.status_code,
+                headers=client.response_headers(response.headers),
+                # Runs even if the body is never iterated (client gone first).
+                background=BackgroundTask(client.release_stream, response),
+            )
         response = await client.proxy_request(
             method=request.method,
             path=path,
@@ -29,6 +52,12 @@ async def proxy_bufftracker(
             status_code=response.status_code,
             headers=client.response_headers(response.headers),
         )
+    except CircuitOpenError as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Buff-tracker service unavailable: {str(exc)}",
+            headers={"Retry-After": str(max(1, int(exc.retry_after)))},
+        )
     except Exception as exc:
         logging.error(f"Buff-tracker proxy error: {repr(exc)}")
         raise HTTPException(
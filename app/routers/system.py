@@ -2,7 +2,11 @@ import asyncio
 import logging
 import os
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.dependencies import get_bufftracker_client, get_prediction_pool
+from app.integrations.bufftracker import BuffTrackerClient
+from models.prediction_pool import PredictionPool
 
 
 router = APIRouter(prefix="/api/system", tags=["system"])
@@ -107,3 +111,19 @@ async def get_system_stats():
     except Exception as e:
         logging.exception("获取系统状态失败")
         raise HTTPException(status_code=500, detail=f"获取系统状态失败: {e}")
+
+
+@router.get("/bufftracker")
+async def get_bufftracker_stats(
+    client: BuffTrackerClient = Depends(get_bufftracker_client),
+):
+    """buff-tracker 客户端运行指标（连接池等）。"""
+    return {"success": True, "data": client.stats()}
+
+
+@router.get("/model-cache")
+async def get_model_cache_stats(
+    pool: PredictionPool = Depends(get_prediction_pool),
+):
+    """预测进程池计数与全部 worker 模型缓存的汇总指标（不向进程池提交任务）。"""
+    return {"success": True, "data": {"pool": pool.stats(), "cache": pool.model_cache_stats()}}
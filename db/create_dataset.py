@@ -23,21 +23,35 @@ def get_db_connection():
     }
     return pymysql.connect(**config)
 
+# DECIMAL 列经 pymysql 读出是 Decimal 对象，统一转成 float
+_NUMERIC_COLUMNS = ['open_price', 'high_price', 'low_price', 'close_price', 'volume', 'turnover']
+
+
+def load_kline_frame(limit=1000):
+    """
+    从 kline_data_day 表读取最新的 limit 条数据（按时间升序），直接返回 DataFrame。
+    """
+    conn = get_db_connection()
+    try:
+        # SQL 查询语句，获取最新的 limit 条数据并按时间升序排序
+        sql_query = "SELECT * FROM (SELECT * FROM kline_data_day ORDER BY timestamp DESC LIMIT %s) AS sub ORDER BY timestamp ASC"
+        logger.info(f"正在从数据库读取最新的{limit}条数据...")
+        df = pd.read_sql(sql_query, conn, params=(limit,))
+    finally:
+        conn.close()
+    for col in _NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+    logger.info(f"成功读取 {len(df)} 条数据。")
+    return df
+
+
 def export_kline_data_to_csv():
     """
     从 kline_data_day 表中查询所有数据，并保存为 CSV 文件。
     """
     try:
-        conn = get_db_connection()
-        logger.info("数据库连接成功。")
-
-        # SQL 查询语句，获取最新的1000条数据并按时间升序排序
-        sql_query = "SELECT * FROM (SELECT * FROM kline_data_day ORDER BY timestamp DESC LIMIT 1000) AS sub ORDER BY timestamp ASC"
-        
-        # 使用 pandas 直接从 SQL 查询读取数据到 DataFrame
-        logger.info("正在从数据库读取最新的1000条数据...")
-        df = pd.read_sql(sql_query, conn)
-        logger.info(f"成功读取 {len(df)} 条数据。")
+        df = load_kline_frame()
 
         # 定义输出路径，确保 train.csv 保存在 models 文件夹下
         output_filename = 'train.csv'
@@ -52,10 +66,6 @@ def export_kline_data_to_csv():
 
     except Exception as e:
         logger.error(f"导出数据时发生错误: {e}")
-    finally:
-        if 'conn' in locals() and conn.open:
-            conn.close()
-            logger.info("数据库连接已关闭。")
 
 if __name__ == "__main__":
     export_kline_data_to_csv()
@@ -0,0 +1,338 @@
+"""
+cs2_item_index.py — cs2_items 名称的进程内索引
+
+market_hash_name 解析（调查员补全品质后缀、K 线请求查 c5_id）原来每次都要查库，
+包含匹配还是 LIKE '%x%' 全表扫描。这里把 cs2_items 的 (market_hash_name, c5_id)
+一次性加载到内存：
+  - 哈希表：精确匹配 → c5_id；
+  - 有序数组 + 二分：前缀匹配（hash + 品质后缀）；
+  - 三元组倒排索引：包含匹配（★ 前缀的刀具/手套、Souvenir 等），候选集再逐个校验。
+匹配不区分大小写（与表的 utf8mb4_0900_ai_ci 排序规则一致）；多个候选时取字典序最小的一个。
+
+加载与刷新：
+  - 超过 CS2_ITEM_INDEX_TTL 秒（默认 3600）后在后台线程重新加载，期间继续使用旧索引，
+    调用方（包括事件循环上的请求）不会等待全表读取和索引构建；加载失败按指数退避重试；
+  - 同步新饰品的是单独的进程（python -m db.cs2_items_processor），本进程的索引可能还没有新饰品：
+    精确查找 c5_id 未命中时回查一行并记入索引；名称解析未命中时按 COUNT(*)/MAX(id)
+    判断表是否有新行（至多每 CS2_ITEM_INDEX_MISS_CHECK 秒一次），有则触发后台重新加载。
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pymysql
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+NGRAM = 3
+DEFAULT_TTL_SECONDS = float(os.getenv("CS2_ITEM_INDEX_TTL", "3600"))
+MISS_CHECK_SECONDS = float(os.getenv("CS2_ITEM_INDEX_MISS_CHECK", "60"))
+_RETRY_MIN_SECONDS = 5.0
+
+
+def _get_db_connection():
+    return pymysql.connect(
+        host=os.getenv("HOST"),
+        port=int(os.getenv("PORT", 3306)),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        database=os.getenv("DATABASE"),
+        charset=os.getenv("CHARSET", "utf8mb4"),
+    )
+
+
+def _ngrams(text: str) -> set:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class Cs2ItemIndex:
+    """
+    名称索引，由 (market_hash_name, c5_id) 行构建；刷新时整体替换，读取无需加锁。
+    主体结构构建后不再修改，加载后才出现的饰品经 remember() 记在精确匹配的附加表里。
+    signature 为加载时 cs2_items 的 (COUNT(*), MAX(id))，用于判断表是否有新行。
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, Optional[str]]],
+                 signature: Optional[Tuple[int, int]] = None):
+        self.signature = signature
+        self._extra: Dict[str, Tuple[str, Optional[str]]] = {}
+        entries = {}
+        for name, c5_id in rows:
+            if not name:
+                continue
+            entries.setdefault(name.casefold(), (name, None if c5_id is None else str(c5_id)))
+
+        # 按折叠后的名称排序，下标即名称 ID；倒排表天然有序，取最小 ID 即字典序最小
+        self._keys: List[str] = sorted(entries)
+        self._names: List[str] = [entries[k][0] for k in self._keys]
+        self._c5_ids: List[Optional[str]] = [entries[k][1] for k in self._keys]
+        self._exact: Dict[str, int] = {k: i for i, k in enumerate(self._keys)}
+
+        postings: Dict[str, List[int]] = {}
+        for i, key in enumerate(self._keys):
+            for gram in _ngrams(key):
+                postings.setdefault(gram, []).append(i)
+        self._postings = postings
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, market_hash_name: str) -> bool:
+        return self._lookup(market_hash_name) is not None
+
+    def _lookup(self, market_hash_name: str) -> Optional[Tuple[str, Optional[str]]]:
+        if not market_hash_name:
+            return None
+        key = market_hash_name.casefold()
+        i = self._exact.get(key)
+        if i is not None:
+            return self._names[i], self._c5_ids[i]
+        return self._extra.get(key)
+
+    def remember(self, market_hash_name: str, c5_id: Optional[str]) -> None:
+        """记下加载之后才入库的饰品（只参与精确匹配，下次重新加载时并入主体）。"""
+        self._extra[market_hash_name.casefold()] = (
+            market_hash_name, None if c5_id is None else str(c5_id)
+        )
+
+    def get_c5_id(self, market_hash_name: str) -> Optional[str]:
+        """精确匹配的 c5_id；不存在或该饰品没有 c5_id 时返回 None。"""
+        entry = self._lookup(market_hash_name)
+        return entry[1] if entry else None
+
+    def exact(self, market_hash_name: str) -> Optional[str]:
+        entry = self._lookup(market_hash_name)
+        return entry[0] if entry else None
+
+    def prefix(self, prefix: str) -> Optional[str]:
+        """以 prefix 开头的字典序最小的名称。"""
+        if not prefix:
+            return None
+        key = prefix.casefold()
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i].startswith(key):
+            return self._names[i]
+        return None
+
+    def contains(self, substring: str) -> Optional[str]:
+        """包含 substring 的字典序最小的名称。"""
+        if not substring:
+            return None
+        key = substring.casefold()
+        if len(key) < NGRAM:
+            candidates = range(len(self._keys))
+        else:
+            lists = []
+            for gram in _ngrams(key):
+                posting = self._postings.get(gram)
+                if posting is None:
+                    return None
+                lists.append(posting)
+            lists.sort(key=len)
+            # 从最短的倒排表出发，与其余表求交；交集只是候选，仍需校验真正包含
+            candidates = set(lists[0])
+            for posting in lists[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    return None
+            candidates = sorted(candidates)
+        for i in candidates:
+            if key in self._keys[i]:
+                return self._names[i]
+        return None
+
+    def resolve(self, market_hash_name: str) -> Optional[str]:
+        """三级匹配：精确 → 前缀 → 包含，返回 cs2_items 中的完整名称。"""
+        return (
+            self.exact(market_hash_name)
+            or self.prefix(market_hash_name)
+            or self.contains(market_hash_name)
+        )
+
+
+def _signature(cursor) -> Tuple[int, int]:
+    cursor.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM cs2_items")
+    count, max_id = cursor.fetchone()
+    return int(count), int(max_id)
+
+
+def load_index(conn=None) -> Cs2ItemIndex:
+    """从 cs2_items 读取全部名称构建索引。"""
+    own_conn = conn is None
+    conn = conn or _get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            signature = _signature(cursor)
+            cursor.execute("SELECT market_hash_name, c5_id FROM cs2_items")
+            return Cs2ItemIndex(cursor.fetchall(), signature=signature)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+_index: Optional[Cs2ItemIndex] = None
+_index_lock = threading.Lock()
+_first_load_lock = threading.Lock()
+_loader: Optional[threading.Thread] = None
+_failures = 0
+_next_attempt_at = 0.0
+_next_miss_check_at = 0.0
+
+
+def _install(index: Cs2ItemIndex, started: float) -> None:
+    global _index, _failures, _next_attempt_at
+    with _index_lock:
+        _index = index
+        _failures = 0
+        _next_attempt_at = 0.0
+    logger.info(f"cs2_items 名称索引已加载: {len(index)} 条，耗时 {time.monotonic() - started:.2f}s")
+
+
+def _record_failure(error: Exception, ttl_seconds: float) -> None:
+    """加载失败后指数退避（5s、10s、20s…，不超过 TTL），避免数据库故障时每次查找都重连。"""
+    global _failures, _next_attempt_at
+    with _index_lock:
+        _failures += 1
+        delay = min(max(ttl_seconds, _RETRY_MIN_SECONDS), _RETRY_MIN_SECONDS * 2 ** (_failures - 1))
+        _next_attempt_at = time.monotonic() + delay
+    logger.error(f"加载 cs2_items 名称索引失败（{delay:.0f}s 后重试）: {error}")
+
+
+def refresh_index(conn=None, ttl_seconds: float = DEFAULT_TTL_SECONDS) -> Optional[Cs2ItemIndex]:
+    """在当前线程重新加载进程内索引；加载失败时保留旧索引并返回 None。"""
+    started = time.monotonic()
+    try:
+        index = load_index(conn)
+    except Exception as e:
+        _record_failure(e, ttl_seconds)
+        return None
+    _install(index, started)
+    return index
+
+
+def refresh_in_background(ttl_seconds: float = DEFAULT_TTL_SECONDS) -> bool:
+    """启动一次后台重新加载（已有加载在进行或仍在退避期内时不重复启动），返回是否启动。"""
+    global _loader
+    with _index_lock:
+        if (_loader is not None and _loader.is_alive()) or time.monotonic() < _next_attempt_at:
+            return False
+        _loader = threading.Thread(
+            target=refresh_index, kwargs={"ttl_seconds": ttl_seconds},
+            name="cs2-item-index-loader", daemon=True,
+        )
+        _loader.start()
+        return True
+
+
+def get_index(ttl_seconds: float = DEFAULT_TTL_SECONDS, wait: bool = True) -> Optional[Cs2ItemIndex]:
+    """
+    进程内共享的索引。超过 ttl_seconds 时在后台重新加载并先返回旧索引。
+    从未加载过时：wait=True 在当前线程加载（调查员等后台任务），
+    wait=False 只启动后台加载并返回 None（请求路径由调用方回查数据库）。
+    数据库不可用时返回旧索引（从未加载成功则为 None）。
+    """
+    index = _index
+    if index is not None:
+        if time.monotonic() - index.loaded_at >= ttl_seconds:
+            refresh_in_background(ttl_seconds)
+        return index
+    if not wait:
+        refresh_in_background(ttl_seconds)
+        return None
+    with _first_load_lock:
+        # 并发的首次调用只由一个线程加载
+        if _index is not None or time.monotonic() < _next_attempt_at:
+            return _index
+        started = time.monotonic()
+        try:
+            index = load_index()
+        except Exception as e:
+            failure = e
+        else:
+            failure = None
+    if failure is not None:
+        _record_failure(failure, ttl_seconds)
+        return None
+    _install(index, started)
+    return index
+
+
+def check_for_new_items(index: Optional[Cs2ItemIndex], min_interval: float = MISS_CHECK_SECONDS) -> bool:
+    """
+    名称解析未命中时调用：至多每 min_interval 秒比较一次表的 (COUNT(*), MAX(id))，
+    与索引加载时不同说明其他进程同步了新饰品，触发后台重新加载。返回是否触发。
+    """
+    global _next_miss_check_at
+    if index is None:
+        return False
+    with _index_lock:
+        if time.monotonic() < _next_miss_check_at:
+            return False
+        _next_miss_check_at = time.monotonic() + min_interval
+    conn = None
+    try:
+        conn = _get_db_connection()
+        with conn.cursor() as cursor:
+            signature = _signature(cursor)
+    except Exception as e:
+        logger.warning(f"检查 cs2_items 是否有新饰品失败: {e}")
+        return False
+    finally:
+        if conn:
+            conn.close()
+    if signature == index.signature:
+        return False
+    logger.info(f"cs2_items 有新饰品 {index.signature} → {signature}，后台重新加载名称索引")
+    return refresh_in_background()
+
+
+def lookup_c5_id(market_hash_name: str) -> Optional[str]:
+    """
+    market_hash_name → c5_id。先查内存索引；索引未加载或未命中时回查一行，
+    命中的新饰品记入索引，之后的查找不再访问数据库。
+    """
+    if not market_hash_name:
+        return None
+    index = get_index(wait=False)
+    if index is not None and market_hash_name in index:
+        return index.get_c5_id(market_hash_name)
+
+    conn = None
+    try:
+        conn = _get_db_connection()
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT market_hash_name, c5_id FROM cs2_items WHERE market_hash_name = %s LIMIT 1",
+                (market_hash_name,),
+            )
+            row = cursor.fetchone()
+    except Exception as e:
+        logger.error(f"从数据库查询 item_id 失败: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+    if not row:
+        return None
+    if index is not None:
+        index.remember(row[0], row[1])
+    return None if row[1] is None else str(row[1])
+
+
+def resolve_name(market_hash_name: str) -> Optional[str]:
+    """三级匹配（精确 → 前缀 → 包含）解析完整名称；未命中时检查表是否有新饰品。"""
+    index = get_index()
+    if index is None:
+        return None
+    resolved = index.resolve(market_hash_name)
+    if resolved is None:
+        check_for_new_items(index)
+    return resolved
@@ -14,6 +14,8 @@ import pymysql
 from dotenv import load_dotenv
 
 from app.integrations.bufftracker import BuffTrackerClient
+from app.integrations.quota import Priority
+from db.cs2_item_index import refresh_index
 
 logger = logging.getLogger(__name__)
 
@@ -80,6 +82,8 @@ class Cs2ItemsProcessor:
             "platformList": [{"name": str, "itemId": str}, ...] }
         """
         try:
+            # 全量基础数据属于回填任务，配额紧张时等待或放弃（QuotaDeferred 走下方异常处理）
+            self.bufftracker_client.quota.acquire_sync(Priority.BACKFILL, bucket="base")
             data = self.bufftracker_client.get_base_items_sync()
             if not data.get("success"):
                 logger.error(
@@ -183,6 +187,8 @@ class Cs2ItemsProcessor:
                     to_insert,
                 )
             conn.commit()
+            # 新饰品入库后立即刷新本进程的名称索引（其他进程查找未命中时按表的 COUNT/MAX(id) 发现新行）
+            refresh_index(conn)
 
             inserted = len(to_insert)
             skipped = len(items) - inserted
@@ -10,6 +10,8 @@ from fastapi import HTTPException
 import asyncio
 
 from app.integrations.bufftracker import BuffTrackerClient
+from app.integrations.quota import Priority, QuotaDeferred
+from db.cs2_item_index import lookup_c5_id
 
 logger = logging.getLogger(__name__)
 
@@ -33,26 +35,10 @@ class ItemKlineProcessor:
     
     def get_item_id_from_db(self, market_hash_name: str) -> Optional[str]:
         """
-        从 cs2_items 表中查询饰品的 c5_id (即 item_id)
+        查询饰品在 cs2_items 中的 c5_id (即 item_id)，走进程内名称索引；
+        索引未命中（其他进程刚同步的新饰品）时回查一行。可能访问数据库，异步路径经 asyncio.to_thread 调用
         """
-        conn = None
-        try:
-            conn = self.get_db_connection()
-            with conn.cursor() as cursor:
-                cursor.execute(
-                    "SELECT c5_id FROM cs2_items WHERE market_hash_name = %s LIMIT 1",
-                    (market_hash_name,)
-                )
-                result = cursor.fetchone()
-                if result:
-                    return str(result[0])
-                return None
-        except Exception as e:
-            logger.error(f"从数据库查询 item_id 失败: {e}")
-            return None
-        finally:
-            if conn:
-                conn.close()
+        return lookup_c5_id(market_hash_name)
 
     def parse_item_kline_data(self, raw_data: dict, market_hash_name: str, item_id: str) -> List[Dict]:
         """
@@ -415,7 +401,7 @@ class ItemKlineProcessor:
             from crawler.item_price import DailyKlineCrawler
 
             # 从数据库获取 item_id
-            item_id = self.get_item_id_from_db(market_hash_name)
+            item_id = await asyncio.to_thread(self.get_item_id_from_db, market_hash_name)
             if not item_id:
                 logger.error(f"数据库中未找到饰品 {market_hash_name} 的 c5_id")
                 raise HTTPException(status_code=404, detail=f"数据库中未找到饰品 '{market_hash_name}' 的ID,请确认饰品名称是否正确")
@@ -514,6 +500,19 @@ class ItemKlineProcessor:
             if conn:
                 conn.close()
 
+    @staticmethod
+    def is_timestamp_fresh(updated_at, max_age_hours: int = 1) -> bool:
+        """判断 updated_at（datetime 或 ISO 字符串）是否在指定时间窗口内。"""
+        if not updated_at:
+            return False
+        if isinstance(updated_at, str):
+            try:
+                updated_at = datetime.fromisoformat(updated_at)
+            except ValueError:
+                return False
+        age = datetime.now() - updated_at
+        return age.total_seconds() < max_age_hours * 3600
+
     def is_cache_fresh(self, market_hash_name: str, max_age_hours: int = 1) -> bool:
         """检查缓存是否在指定时间内更新过，避免频繁抓取。"""
         conn = None
@@ -526,9 +525,7 @@ class ItemKlineProcessor:
                 )
                 result = cursor.fetchone()
                 if result and result[0]:
-                    from datetime import datetime as dt
-                    age = dt.now() - result[0]
-                    return age.total_seconds() < max_age_hours * 3600
+                    return self.is_timestamp_fresh(result[0], max_age_hours)
                 return False
         except Exception as e:
             logger.error(f"检查缓存新鲜度失败: {e}")
@@ -574,6 +571,13 @@ class ItemKlineProcessor:
             name = item['market_hash_name']
             item_id = str(item['item_id'])
             logger.info(f"[{idx}/{total}] 刷新: {name}")
+            try:
+                bufftracker_client.quota.acquire_sync(Priority.TRACKED_REFRESH)
+            except QuotaDeferred as e:
+                # 配额不足时剩余饰品留给下一轮刷新，把配额让给交互请求
+                logger.warning(f"配额不足，推迟剩余 {total - idx + 1} 个饰品的刷新: {e}")
+                fail_count += total - idx + 1
+                break
             try:
                 data = bufftracker_client.get_item_kline_data_sync(
                     name,
@@ -619,7 +623,7 @@ class ItemKlineProcessor:
         if self.is_item_tracked(market_hash_name):
             logger.info(f"饰品 '{market_hash_name}' 在追踪列表中，将获取并存储数据。")
 
-            item_id = self.get_item_id_from_db(market_hash_name)
+            item_id = await asyncio.to_thread(self.get_item_id_from_db, market_hash_name)
             if not item_id:
                 raise HTTPException(status_code=404, detail=f"数据库中未找到饰品 '{market_hash_name}' 的ID。")
 
@@ -143,31 +143,19 @@ class MarketAnalysisProcessor:
         logger.info("正在调用豆包 LLM 生成分析...")
 
         try:
-            import httpx
-            api_key = os.getenv("ARK_API_KEY")
-            model = os.getenv("DOUBAO_MODEL", "doubao-seed-1-6-flash-250828").strip("[]").split(",")[-1]
-            base_url = os.getenv("ARK_BASE_URL", "https://ark.cn-beijing.volces.com/api/v3")
+            from llm.clients.llm_client import LLMClient
 
-            if not api_key:
+            model = os.getenv("DOUBAO_MODEL", "doubao-seed-1-6-flash-250828").strip("[]").split(",")[-1].strip()
+            if not os.getenv("ARK_API_KEY"):
                 logger.error("ARK_API_KEY 未设置")
                 return False
 
-            response = httpx.post(
-                f"{base_url}/chat/completions",
-                headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
-                json={
-                    "model": model,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": 500,
-                    "temperature": 0.7,
-                },
-                timeout=30.0,
+            # 同一天重跑时数据不变、prompt 不变，直接命中响应缓存
+            analysis_text = LLMClient(model=model, timeout=30.0).chat(
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=500,
+                temperature=0.7,
             )
-            result = response.json()
-            if "choices" not in result:
-                logger.error(f"LLM 返回异常: {response.status_code} {result}")
-                return False
-            analysis_text = result["choices"][0]["message"]["content"]
             logger.info(f"LLM 返回分析: {analysis_text[:100]}...")
         except Exception as e:
             logger.error(f"调用 LLM 失败: {e}")
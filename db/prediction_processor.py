@@ -0,0 +1,266 @@
+"""
+prediction_processor.py — 饰品价格预测结果表
+
+每日 K 线刷新后批量预测所有追踪中或近期被查看过的饰品，
+结果写入 item_price_prediction 表；/api/profit/predict 与 /api/profit/tracked
+优先读表，表中没有（或已过期）时才按需计算并回写。
+
+用法: python -m db.prediction_processor [--viewed-days 7] [--chunk-size 50]
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import pymysql
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# 预测结果的有效期：夜间任务每天跑一次，留出余量
+DEFAULT_MAX_AGE_HOURS = 36
+
+_CREATE_ITEM_PRICE_PREDICTION_TABLE = """
+CREATE TABLE IF NOT EXISTS item_price_prediction (
+    market_hash_name VARCHAR(255) NOT NULL PRIMARY KEY COMMENT '饰品标识',
+    predicted DECIMAL(12, 2) DEFAULT NULL COMMENT '7 天后预测价格',
+    lower_bound DECIMAL(12, 2) DEFAULT NULL COMMENT '预测区间下界',
+    upper_bound DECIMAL(12, 2) DEFAULT NULL COMMENT '预测区间上界',
+    confidence VARCHAR(16) DEFAULT NULL COMMENT '置信度：high/medium/low',
+    model_version VARCHAR(32) DEFAULT NULL COMMENT '模型版本（训练完成时间）',
+    as_of BIGINT DEFAULT NULL COMMENT '预测所用最新 K 线的 timestamp',
+    predicted_at DATETIME DEFAULT NULL COMMENT '预测写入时间',
+    last_viewed_at DATETIME DEFAULT NULL COMMENT '最近一次被查询的时间',
+    INDEX idx_predicted_at (predicted_at),
+    INDEX idx_last_viewed_at (last_viewed_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='饰品 7 天价格预测结果'
+"""
+
+_PREDICTION_COLUMNS = (
+    "market_hash_name, predicted, lower_bound, upper_bound, confidence, "
+    "model_version, as_of, predicted_at"
+)
+
+
+class PredictionProcessor:
+    def __init__(self):
+        self.config = {
+            "host": os.getenv("HOST"),
+            "port": int(os.getenv("PORT", 3306)),
+            "user": os.getenv("DB_USER"),
+            "password": os.getenv("DB_PASSWORD"),
+            "database": os.getenv("DATABASE"),
+            "charset": os.getenv("CHARSET", "utf8mb4"),
+        }
+
+    def get_db_connection(self):
+        return pymysql.connect(**self.config)
+
+    def ensure_tables(self):
+        conn = None
+        try:
+            conn = self.get_db_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(_CREATE_ITEM_PRICE_PREDICTION_TABLE)
+            conn.commit()
+            logger.info("item_price_prediction 表已确保存在")
+        except Exception as e:
+            logger.error(f"创建 item_price_prediction 表失败: {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def _row_to_prediction(row: Dict) -> Dict:
+        def _num(value):
+            return float(value) if value is not None else None
+
+        predicted_at = row.get("predicted_at")
+        return {
+            "predicted": _num(row["predicted"]),
+            "lower": _num(row["lower_bound"]),
+            "upper": _num(row["upper_bound"]),
+            "confidence": row["confidence"],
+            "model_version": row["model_version"],
+            "as_of": row["as_of"],
+            "predicted_at": predicted_at.isoformat() if predicted_at else None,
+        }
+
+    def get_predictions(
+        self,
+        market_hash_names: List[str],
+        max_age_hours: float = DEFAULT_MAX_AGE_HOURS,
+        mark_viewed: bool = True,
+    ) -> Dict[str, Dict]:
+        """
+        读取未过期的预测结果，返回 {market_hash_name: prediction}，缺失的饰品不在结果中。
+        mark_viewed 时同时刷新 last_viewed_at，供夜间任务挑选“近期查看”的饰品：
+        已有的行直接更新；没有行的饰品只有在 cs2_items 中存在时才插入，
+        任意字符串的查询不会在表里留下记录、也不会进入夜间批量预测。
+        """
+        names = list(dict.fromkeys(market_hash_names))
+        if not names:
+            return {}
+        conn = None
+        try:
+            conn = self.get_db_connection()
+            placeholders = ", ".join(["%s"] * len(names))
+            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                if mark_viewed:
+                    cursor.execute(
+                        "UPDATE item_price_prediction SET last_viewed_at = NOW() "
+                        f"WHERE market_hash_name IN ({placeholders})",
+                        names,
+                    )
+                    cursor.execute(
+                        "INSERT INTO item_price_prediction (market_hash_name, last_viewed_at) "
+                        "SELECT c.market_hash_name, NOW() FROM cs2_items c "
+                        f"WHERE c.market_hash_name IN ({placeholders}) "
+                        "ON DUPLICATE KEY UPDATE last_viewed_at = NOW()",
+                        names,
+                    )
+                    conn.commit()
+                cursor.execute(
+                    f"SELECT {_PREDICTION_COLUMNS} FROM item_price_prediction "
+                    f"WHERE market_hash_name IN ({placeholders}) "
+                    "AND predicted IS NOT NULL AND predicted_at >= %s",
+                    (*names, datetime.now() - timedelta(hours=max_age_hours)),
+                )
+                rows = cursor.fetchall()
+            return {row["market_hash_name"]: self._row_to_prediction(row) for row in rows}
+        except Exception as e:
+            logger.error(f"读取预测结果失败: {e}")
+            return {}
+        finally:
+            if conn:
+                conn.close()
+
+    def get_prediction(
+        self, market_hash_name: str, max_age_hours: float = DEFAULT_MAX_AGE_HOURS
+    ) -> Optional[Dict]:
+        return self.get_predictions([market_hash_name], max_age_hours).get(market_hash_name)
+
+    def save_predictions(self, predictions: Dict[str, Optional[Dict]]) -> int:
+        """写入（覆盖）预测结果，跳过预测失败（None）的饰品，返回写入条数。"""
+        rows = [
+            (
+                name,
+                p["predicted"],
+                p["lower"],
+                p["upper"],
+                p["confidence"],
+                p.get("model_version"),
+                p.get("as_of"),
+            )
+            for name, p in predictions.items()
+            if p
+        ]
+        if not rows:
+            return 0
+        conn = None
+        try:
+            conn = self.get_db_connection()
+            with conn.cursor() as cursor:
+                cursor.executemany(
+                    "INSERT INTO item_price_prediction "
+                    "(market_hash_name, predicted, lower_bound, upper_bound, confidence, "
+                    "model_version, as_of, predicted_at) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s, NOW()) "
+                    "ON DUPLICATE KEY UPDATE "
+                    "predicted = VALUES(predicted), lower_bound = VALUES(lower_bound), "
+                    "upper_bound = VALUES(upper_bound), confidence = VALUES(confidence), "
+                    "model_version = VALUES(model_version), as_of = VALUES(as_of), "
+                    "predicted_at = VALUES(predicted_at)",
+                    rows,
+                )
+            conn.commit()
+            return len(rows)
+        except Exception as e:
+            logger.error(f"写入预测结果失败: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    def prune_unpredicted(self, viewed_days: int = 7) -> int:
+        """删除从未得到预测、且 viewed_days 天内没有再被查看的行，返回删除条数。"""
+        conn = None
+        try:
+            conn = self.get_db_connection()
+            with conn.cursor() as cursor:
+                deleted = cursor.execute(
+                    "DELETE FROM item_price_prediction "
+                    "WHERE predicted IS NULL "
+                    "AND (last_viewed_at IS NULL OR last_viewed_at < %s)",
+                    (datetime.now() - timedelta(days=viewed_days),),
+                )
+            conn.commit()
+            if deleted:
+                logger.info(f"清理 {deleted} 条从未预测成功的查看记录")
+            return deleted
+        except Exception as e:
+            logger.error(f"清理预测结果表失败: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+
+    def get_names_to_precompute(self, viewed_days: int = 7) -> List[str]:
+        """所有被追踪的饰品 + 最近 viewed_days 天内被查询过的饰品。"""
+        conn = None
+        try:
+            conn = self.get_db_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT market_hash_name COLLATE utf8mb4_unicode_ci FROM track "
+                    "UNION "
+                    "SELECT market_hash_name COLLATE utf8mb4_unicode_ci FROM item_price_prediction "
+                    "WHERE last_viewed_at >= %s",
+                    (datetime.now() - timedelta(days=viewed_days),),
+                )
+                return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"获取待预测饰品列表失败: {e}")
+            return []
+        finally:
+            if conn:
+                conn.close()
+
+    def precompute(self, viewed_days: int = 7, chunk_size: int = 50) -> Dict[str, int]:
+        """夜间批量预测：按块调用批量预测引擎并写表。"""
+        from models.item_price_predictor import batch_predict_item_ranges
+
+        self.ensure_tables()
+        self.prune_unpredicted(viewed_days)
+        names = self.get_names_to_precompute(viewed_days)
+        stats = {"total": len(names), "saved": 0, "failed": 0}
+        logger.info(f"开始预计算 {len(names)} 个饰品的价格预测")
+        for start in range(0, len(names), chunk_size):
+            chunk = names[start:start + chunk_size]
+            predictions = batch_predict_item_ranges(chunk)
+            saved = self.save_predictions(predictions)
+            stats["saved"] += saved
+            stats["failed"] += len(chunk) - saved
+            logger.info(f"  [{min(start + chunk_size, len(names))}/{len(names)}] 已写入 {saved} 条")
+        logger.info(
+            f"预计算完成: 共 {stats['total']} | 写入 {stats['saved']} | 失败 {stats['failed']}"
+        )
+        return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="批量预计算饰品价格预测")
+    parser.add_argument("--viewed-days", type=int, default=7)
+    parser.add_argument("--chunk-size", type=int, default=50)
+    args = parser.parse_args()
+    PredictionProcessor().precompute(viewed_days=args.viewed_days, chunk_size=args.chunk_size)
@@ -263,6 +263,20 @@ class SkinEntityProcessor:
             logger.error(f"查询 skin_entity 失败: {e}")
             return None
 
+    def get_skin_entities_by_ids(self, entity_ids: list[int]) -> dict[int, dict]:
+        """批量查询饰品实体，返回 {id: 实体}。"""
+        ids = sorted(set(entity_ids))
+        if not ids:
+            return {}
+        sql = "SELECT * FROM skin_entities WHERE id IN ({})".format(','.join(['%s'] * len(ids)))
+        try:
+            with self.conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute(sql, ids)
+                return {row['id']: row for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"批量查询 skin_entity 失败: {e}")
+            return {}
+
     def update_market_hash_name(self, entity_id: int, market_hash_name: str):
         """更新实体的 market_hash_name（搜索保底成功后回写正确名称）。"""
         sql = "UPDATE skin_entities SET market_hash_name = %s WHERE id = %s"
@@ -315,6 +329,13 @@ class SkinEntityProcessor:
             return []
 
 
+# 认领顺序与 idx_status_priority 的列方向必须一致（priority 降序、created_at 升序），
+# 否则带锁的 SELECT 会退化为 filesort，锁住全部 pending 行而不只是 LIMIT 行，
+# 并发认领的其他进程会因此跳过所有任务、一无所获。降序索引需要 MySQL 8.0+（SKIP LOCKED 同样需要）。
+CLAIM_ORDER_BY = "priority DESC, created_at ASC"
+CLAIM_INDEX_COLUMNS = "status, priority DESC, created_at ASC"
+
+
 class SkinSearchTaskProcessor:
     """搜索任务处理器：管理 skin_search_tasks 表的 CRUD 操作。"""
 
@@ -339,22 +360,69 @@ class SkinSearchTaskProcessor:
             priority INT DEFAULT 0 COMMENT '优先级：3=价格事件, 2=新皮肤发布, 1=一般提及',
             status ENUM('pending', 'running', 'done', 'failed') DEFAULT 'pending' COMMENT '任务状态',
             assigned_agent VARCHAR(64) DEFAULT NULL COMMENT '执行任务的代理标识',
+            lease_expires_at DATETIME DEFAULT NULL COMMENT '认领租约到期时间，过期后可被其他进程重新认领',
             result_json JSON DEFAULT NULL COMMENT '爬取结果JSON',
             error_message TEXT DEFAULT NULL COMMENT '错误信息',
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
             INDEX idx_status (status),
+            INDEX idx_status_priority ({}),
             INDEX idx_skin_entity_id (skin_entity_id),
             FOREIGN KEY (skin_entity_id) REFERENCES skin_entities(id)
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """
+        """.format(CLAIM_INDEX_COLUMNS)
         try:
             with self.conn.cursor() as cursor:
                 cursor.execute(sql)
             self.conn.commit()
+            self.ensure_lease_columns()
         except Exception as e:
             logger.error(f"创建 skin_search_tasks 表失败: {e}")
 
+    def ensure_lease_columns(self):
+        """
+        为历史表补齐租约字段和认领用的 idx_status_priority 索引；
+        早先按升序 priority 建的索引无法服务认领顺序，删除后按降序重建。
+        """
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT COUNT(*) FROM information_schema.columns
+                    WHERE table_schema = DATABASE()
+                      AND table_name = 'skin_search_tasks'
+                      AND column_name = 'lease_expires_at'
+                """)
+                has_lease = bool(cursor.fetchone()[0])
+                cursor.execute("""
+                    SELECT collation FROM information_schema.statistics
+                    WHERE table_schema = DATABASE()
+                      AND table_name = 'skin_search_tasks'
+                      AND index_name = 'idx_status_priority'
+                      AND column_name = 'priority'
+                """)
+                row = cursor.fetchone()
+                has_index = row is not None
+                index_descending = has_index and row[0] == 'D'
+
+                if not has_lease:
+                    cursor.execute(
+                        "ALTER TABLE skin_search_tasks ADD COLUMN lease_expires_at DATETIME DEFAULT NULL "
+                        "COMMENT '认领租约到期时间，过期后可被其他进程重新认领' AFTER assigned_agent"
+                    )
+                if not has_index:
+                    cursor.execute(
+                        f"ALTER TABLE skin_search_tasks ADD INDEX idx_status_priority ({CLAIM_INDEX_COLUMNS})"
+                    )
+                elif not index_descending:
+                    cursor.execute(
+                        "ALTER TABLE skin_search_tasks DROP INDEX idx_status_priority, "
+                        f"ADD INDEX idx_status_priority ({CLAIM_INDEX_COLUMNS})"
+                    )
+            self.conn.commit()
+        except Exception as e:
+            logger.error(f"补齐 skin_search_tasks 租约字段失败: {e}")
+            self.conn.rollback()
+
     def create_task(self, skin_entity_id: int, source_url: str = None,
                     source_annotation_json: dict = None, priority: int = 0) -> int | None:
         """创建新的搜索任务，返回任务 ID。"""
@@ -417,6 +485,126 @@ class SkinSearchTaskProcessor:
             logger.error(f"更新任务状态失败: {e}")
             self.conn.rollback()
 
+    def reclaim_expired_leases(self, lease_seconds: int = 600) -> int:
+        """
+        把租约已过期的 running 任务放回 pending（认领它的进程已崩溃或卡死）。
+        没有租约字段值的历史 running 任务按 updated_at 超过 lease_seconds 处理。返回回收数量。
+        """
+        sql = """
+        UPDATE skin_search_tasks
+        SET status = 'pending', assigned_agent = NULL, lease_expires_at = NULL
+        WHERE status = 'running'
+          AND (lease_expires_at < NOW()
+               OR (lease_expires_at IS NULL AND updated_at < NOW() - INTERVAL %s SECOND))
+        """
+        try:
+            with self.conn.cursor() as cursor:
+                reclaimed = cursor.execute(sql, (lease_seconds,))
+            self.conn.commit()
+            if reclaimed:
+                logger.info(f"回收 {reclaimed} 个租约过期的任务")
+            return reclaimed
+        except Exception as e:
+            logger.error(f"回收过期租约失败: {e}")
+            self.conn.rollback()
+            return 0
+
+    def claim_tasks(self, limit: int, assigned_agent: str, lease_seconds: int = 600) -> list:
+        """
+        原子认领优先级最高的 limit 个 pending 任务：先回收过期租约，
+        再 SELECT ... FOR UPDATE SKIP LOCKED 锁定行并标记 running、写入代理标识和租约。
+        多个调查进程同时认领时互相跳过已锁定的行，不会拿到同一任务。
+        """
+        self.reclaim_expired_leases(lease_seconds)
+        select_sql = f"""
+        SELECT * FROM skin_search_tasks FORCE INDEX (idx_status_priority)
+        WHERE status = 'pending'
+        ORDER BY {CLAIM_ORDER_BY}
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+        """
+        return self._claim(select_sql, (limit,), assigned_agent, lease_seconds)
+
+    def claim_tasks_by_ids(self, task_ids: list[int], assigned_agent: str,
+                           lease_seconds: int = 600) -> list:
+        """认领指定 ID 中仍为 pending 且未被其他进程锁定的任务（流式流水线直接认领刚创建的任务）。"""
+        if not task_ids:
+            return []
+        select_sql = """
+        SELECT * FROM skin_search_tasks
+        WHERE id IN ({}) AND status = 'pending'
+        ORDER BY {}
+        FOR UPDATE SKIP LOCKED
+        """.format(','.join(['%s'] * len(task_ids)), CLAIM_ORDER_BY)
+        return self._claim(select_sql, tuple(task_ids), assigned_agent, lease_seconds)
+
+    def _claim(self, select_sql: str, params: tuple, assigned_agent: str, lease_seconds: int) -> list:
+        """在同一事务里锁定并标记任务，返回认领到的任务行。"""
+        try:
+            self.conn.begin()
+            with self.conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                cursor.execute(select_sql, params)
+                tasks = cursor.fetchall()
+                if tasks:
+                    ids = [t['id'] for t in tasks]
+                    cursor.execute(
+                        "UPDATE skin_search_tasks "
+                        "SET status = 'running', assigned_agent = %s, "
+                        "    lease_expires_at = NOW() + INTERVAL %s SECOND "
+                        "WHERE id IN ({})".format(','.join(['%s'] * len(ids))),
+                        [assigned_agent, lease_seconds, *ids],
+                    )
+            self.conn.commit()
+            for task in tasks:
+                task['status'] = 'running'
+                task['assigned_agent'] = assigned_agent
+            return list(tasks)
+        except Exception as e:
+            logger.error(f"认领任务失败: {e}")
+            self.conn.rollback()
+            return []
+
+    def update_task_statuses(self, updates: list[dict], assigned_agent: str = None):
+        """
+        批量更新任务状态（一次 executemany + 一次提交），同时清除租约。
+        updates: [{task_id, status, result_json?, error_message?}]，未给出的字段保持原值。
+        给出 assigned_agent 时只更新仍由该代理持有的任务（租约过期后被他人回收的不会被覆盖）；
+        状态回到 pending 时释放代理标识。
+        """
+        if not updates:
+            return
+        sql = """
+        UPDATE skin_search_tasks
+        SET status = %s,
+            result_json = COALESCE(%s, result_json),
+            error_message = COALESCE(%s, error_message),
+            assigned_agent = IF(%s = 'pending', NULL, assigned_agent),
+            lease_expires_at = NULL
+        WHERE id = %s
+        """
+        params_tail = ()
+        if assigned_agent is not None:
+            sql += " AND assigned_agent = %s"
+            params_tail = (assigned_agent,)
+        rows = [
+            (
+                u['status'],
+                json.dumps(u['result_json'], ensure_ascii=False) if u.get('result_json') is not None else None,
+                u.get('error_message'),
+                u['status'],
+                u['task_id'],
+                *params_tail,
+            )
+            for u in updates
+        ]
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.executemany(sql, rows)
+            self.conn.commit()
+        except Exception as e:
+            logger.error(f"批量更新任务状态失败: {e}")
+            self.conn.rollback()
+
     def get_tasks_by_skin_entity(self, skin_entity_id: int) -> list:
         """获取指定饰品实体的所有任务。"""
         sql = """
@@ -587,6 +775,56 @@ class SkinDetailProcessor:
             self.conn.rollback()
             return None
 
+    def upsert_skin_details(self, platform: str, details: list[dict]) -> dict[int, int]:
+        """
+        批量插入或更新饰品详情（一次 executemany + 一次提交）。
+        details: [{skin_entity_id, current_price, price_change_24h, price_change_7d, volume, kline_data_json}]
+        返回 {skin_entity_id: detail_id}。
+        """
+        if not details:
+            return {}
+        sql = """
+        INSERT INTO skin_details
+            (skin_entity_id, platform, current_price, price_change_24h, price_change_7d,
+             volume, supply_count, kline_data_json, extra_data_json, last_crawled_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+        ON DUPLICATE KEY UPDATE
+            current_price = VALUES(current_price),
+            price_change_24h = VALUES(price_change_24h),
+            price_change_7d = VALUES(price_change_7d),
+            volume = VALUES(volume),
+            supply_count = VALUES(supply_count),
+            kline_data_json = VALUES(kline_data_json),
+            extra_data_json = VALUES(extra_data_json),
+            last_crawled_at = NOW()
+        """
+        rows = [
+            (
+                d['skin_entity_id'], platform, d.get('current_price'), d.get('price_change_24h'),
+                d.get('price_change_7d'), d.get('volume'), d.get('supply_count'),
+                json.dumps(d['kline_data_json'], ensure_ascii=False) if d.get('kline_data_json') else None,
+                json.dumps(d['extra_data_json'], ensure_ascii=False) if d.get('extra_data_json') else None,
+            )
+            for d in details
+        ]
+        entity_ids = sorted({d['skin_entity_id'] for d in details})
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.executemany(sql, rows)
+            self.conn.commit()
+            with self.conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT skin_entity_id, id FROM skin_details WHERE platform = %s AND skin_entity_id IN ({})".format(
+                        ','.join(['%s'] * len(entity_ids))
+                    ),
+                    [platform, *entity_ids],
+                )
+                return {row[0]: row[1] for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"批量插入/更新 skin_detail 失败: {e}")
+            self.conn.rollback()
+            return {}
+
     def get_skin_detail(self, skin_entity_id: int, platform: str = None) -> dict | list | None:
         """获取饰品详情，可指定平台或获取所有平台数据。"""
         if platform:
@@ -142,17 +142,23 @@ export default {
   },
 
   // 从数据库读取缓存的K线数据（毫秒级响应）
-  async getCachedItemKlineData(marketHashName) {
+  // 传入上次的 version 时，数据未变化会返回 not_modified 且 data 为空
+  async getCachedItemKlineData(marketHashName, version = null) {
     try {
       const encodedName = encodeURIComponent(marketHashName);
       const { data } = await client.get(
-        `/item/kline-cached/${encodedName}`
+        `/item/kline-cached/${encodedName}`,
+        { params: version ? { version } : {} }
       );
       return {
         success: true,
         data: normalizeKlineRows(data.data || []),
         source: data.source,
         last_updated: data.last_updated,
+        version: data.version,
+        stale: !!data.stale,
+        refreshing: !!data.refreshing,
+        not_modified: !!data.not_modified,
       };
     } catch (err) {
       console.error(`读取缓存K线数据失败 ${marketHashName}:`, err);
@@ -174,6 +180,9 @@ export default {
         data: normalizeKlineRows(data.data || []),
         source: data.source,
         last_updated: data.last_updated,
+        version: data.version,
+        stale: !!data.stale,
+        refreshing: !!data.refreshing,
       };
     } catch (err) {
       console.error(`刷新K线数据失败 ${marketHashName}:`, err);
@@ -4,11 +4,16 @@
 分类结果以 JSON 格式输出，直接写入 news.category 字段。
 """
 import os
+import sys
 import json
 import logging
 import pymysql
 from dotenv import load_dotenv
-from openai import OpenAI
+
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from llm.clients.llm_client import LLMClient, doubao_models
 
 logger = logging.getLogger(__name__)
 
@@ -64,45 +69,39 @@ def _get_uncategorized_news(conn, limit=50):
         return cursor.fetchall()
 
 
+def _parse_classifications(raw: str) -> list:
+    """解析分类结果 JSON（容忍 markdown 代码块标记），格式不对时抛异常。"""
+    raw = raw.strip()
+    # 清理可能的 markdown 代码块标记
+    if raw.startswith("```"):
+        raw = raw.split("\n", 1)[-1]
+    if raw.endswith("```"):
+        raw = raw.rsplit("```", 1)[0]
+    return json.loads(raw.strip())
+
+
 def _call_classifier(news_items: list) -> list:
-    """调用豆包模型对新闻进行分类。"""
+    """调用豆包模型对新闻进行分类（同一批新闻重试时直接命中响应缓存）。"""
     load_dotenv()
-    api_key = os.getenv("ARK_API_KEY")
-    models_str = os.getenv("DOUBAO_MODEL", "").strip('[]')
     # 使用 flash 模型（第二个）进行分类，更快更便宜
-    models = [m.strip() for m in models_str.split(',') if m.strip()]
+    models = doubao_models()
     model_name = models[-1] if len(models) > 1 else models[0]
 
-    client = OpenAI(
-        base_url="https://ark.cn-beijing.volces.com/api/v3",
-        api_key=api_key,
-    )
-
     # 构造输入：只传必要字段，节省 token
     input_data = [
         {"id": n["id"], "title": n["title"], "preview": (n.get("preview") or "")[:120]}
         for n in news_items
     ]
 
-    response = client.chat.completions.create(
-        model=model_name,
+    return LLMClient(model=model_name).chat(
         messages=[
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": json.dumps(input_data, ensure_ascii=False)},
         ],
+        parse=_parse_classifications,
         temperature=0.1,
     )
 
-    raw = response.choices[0].message.content.strip()
-    # 清理可能的 markdown 代码块标记
-    if raw.startswith("```"):
-        raw = raw.split("\n", 1)[-1]
-    if raw.endswith("```"):
-        raw = raw.rsplit("```", 1)[0]
-    raw = raw.strip()
-
-    return json.loads(raw)
-
 
 def _update_categories(conn, classifications: list):
     """将分类结果批量写入数据库。"""
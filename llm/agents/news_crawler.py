@@ -1,8 +1,13 @@
 import os
+import sys
 import logging
-from openai import OpenAI
 from dotenv import load_dotenv
 
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from llm.clients.llm_client import LLMClient, doubao_models
+
 logger = logging.getLogger(__name__)
 
 def run_news_crawler_workflow():
@@ -12,8 +17,8 @@ def run_news_crawler_workflow():
     # 1. 加载配置
     load_dotenv()
     api_key = os.getenv("ARK_API_KEY")
-    models_str = os.getenv("DOUBAO_MODEL", "").strip('[]')
-    model_name = models_str.split(',')[0].strip() # 默认使用列表中的第一个模型
+    models = doubao_models()
+    model_name = models[0] if models else None # 默认使用列表中的第一个模型
 
     if not api_key or not model_name:
         logger.error("错误: 请确保 .env 文件中已配置 ARK_API_KEY 和有效的 DOUBAO_MODEL。")
@@ -31,12 +36,9 @@ def run_news_crawler_workflow():
 
     # 3. 初始化客户端
     try:
-        client = OpenAI(
-            base_url="https://ark.cn-beijing.volces.com/api/v3",
-            api_key=api_key,
-        )
+        client = LLMClient(model=model_name)
     except Exception as e:
-        logger.error(f"初始化 OpenAI 客户端时出错: {e}")
+        logger.error(f"初始化 LLM 客户端时出错: {e}")
         return
 
     # 4. 调用模型
@@ -46,8 +48,9 @@ def run_news_crawler_workflow():
     logger.info(f"正在使用模型 '{model_name}' 执行任务")
 
     try:
-        response = client.chat.completions.create(
-            model=model_name,
+        # "最新信息" 时效性强：6 小时内重跑才复用缓存的回复
+        content = client.chat(
+            max_age=6 * 3600,
             messages=[
                 {
                     "role": "system",
@@ -59,12 +62,7 @@ def run_news_crawler_workflow():
                 }
             ]
         )
-
-        if response.choices:
-            content = response.choices[0].message.content
-            logger.info(f"模型回复: {content[:200]}...")
-        else:
-            logger.warning("未能从响应中提取到有效的回复内容")
+        logger.info(f"模型回复: {content[:200]}...")
 
     except Exception as e:
         logger.error(f"请求失败: {e}")
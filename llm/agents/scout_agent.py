@@ -1,8 +1,10 @@
 import os
 import json
+import asyncio
 import logging
 from datetime import datetime
-from openai import OpenAI
+from typing import AsyncIterator
+from openai import AsyncOpenAI, OpenAI
 from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
@@ -11,6 +13,12 @@ logger = logging.getLogger(__name__)
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
 
 
+ARK_BASE_URL = "https://ark.cn-beijing.volces.com/api/v3"
+
+# 并发搜索的话题数上限与单话题超时（秒）
+SCOUT_CONCURRENCY = int(os.getenv("SCOUT_CONCURRENCY", "3"))
+SCOUT_TOPIC_TIMEOUT = float(os.getenv("SCOUT_TOPIC_TIMEOUT", "180"))
+
 # 默认搜索话题配置
 DEFAULT_SEARCH_TOPICS = [
     {
@@ -56,8 +64,9 @@ class ScoutAgent:
             model = next((m for m in models if 'flash' in m), models[0] if models else 'doubao-seed-1-6-flash-250828')
 
         self.model = model
+        self._api_key = api_key
         self.client = OpenAI(
-            base_url="https://ark.cn-beijing.volces.com/api/v3",
+            base_url=ARK_BASE_URL,
             api_key=api_key,
         )
 
@@ -84,26 +93,88 @@ class ScoutAgent:
         if topic is None:
             topic = DEFAULT_SEARCH_TOPICS[0]
 
-        tools = [{
-            "type": "web_search",
-            "sources": topic.get("sources", ["douyin", "toutiao"]),
-            "max_keyword": max_keyword,
-            "limit": limit,
-        }]
-
         logger.info(f"[Scout] 正在搜索: {topic['name']} (模型: {self.model}, max_tool_calls={max_tool_calls})")
 
         try:
             response = self.client.responses.create(
-                model=self.model,
-                input=[{"role": "user", "content": topic["prompt"]}],
-                tools=tools,
-                max_tool_calls=max_tool_calls,
+                **self._request_kwargs(topic, max_keyword, max_tool_calls, limit)
             )
         except Exception as e:
             logger.error(f"[Scout] API 调用失败: {e}")
             return {"error": str(e)}
 
+        return self._build_result(response, topic)
+
+    async def search_async(self, client: AsyncOpenAI, topic: dict, max_keyword: int = 4,
+                           max_tool_calls: int = 3, limit: int = 10,
+                           timeout: float = SCOUT_TOPIC_TIMEOUT) -> dict:
+        """
+        search() 的异步版本，使用调用方传入的 AsyncOpenAI 客户端。
+        超时或 API 失败时返回 {"error": ..., "topic": 话题名}，不抛异常。
+        """
+        logger.info(f"[Scout] 正在搜索: {topic['name']} (模型: {self.model}, max_tool_calls={max_tool_calls})")
+
+        try:
+            response = await asyncio.wait_for(
+                client.responses.create(**self._request_kwargs(topic, max_keyword, max_tool_calls, limit)),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"[Scout] 话题 {topic['name']} 超时（{timeout:.0f}s）")
+            return {"error": f"timeout after {timeout:.0f}s", "topic": topic["name"]}
+        except Exception as e:
+            logger.error(f"[Scout] API 调用失败: {e}")
+            return {"error": str(e), "topic": topic["name"]}
+
+        # 结果落盘是同步 IO，放到线程里避免阻塞其他话题
+        return await asyncio.to_thread(self._build_result, response, topic)
+
+    async def iter_search_results(self, topics: list = None, concurrency: int = SCOUT_CONCURRENCY,
+                                  timeout: float = SCOUT_TOPIC_TIMEOUT, max_keyword: int = 4,
+                                  max_tool_calls: int = 3, limit: int = 10) -> AsyncIterator[dict]:
+        """
+        并发搜索多个话题，按完成顺序逐个产出结果（先完成的话题先交给下游处理）。
+
+        Args:
+            topics: 话题列表，None 使用默认话题。
+            concurrency: 同时进行的搜索数上限。
+            timeout: 单个话题的超时（秒）。
+        """
+        if topics is None:
+            topics = DEFAULT_SEARCH_TOPICS
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        async with AsyncOpenAI(base_url=ARK_BASE_URL, api_key=self._api_key) as client:
+            async def _bounded(topic: dict) -> dict:
+                async with semaphore:
+                    return await self.search_async(client, topic, max_keyword=max_keyword,
+                                                   max_tool_calls=max_tool_calls, limit=limit,
+                                                   timeout=timeout)
+
+            tasks = [asyncio.create_task(_bounded(topic)) for topic in topics]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield await next_done
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    def _request_kwargs(self, topic: dict, max_keyword: int, max_tool_calls: int, limit: int) -> dict:
+        """构造 responses.create 的参数（同步 / 异步共用）。"""
+        return {
+            "model": self.model,
+            "input": [{"role": "user", "content": topic["prompt"]}],
+            "tools": [{
+                "type": "web_search",
+                "sources": topic.get("sources", ["douyin", "toutiao"]),
+                "max_keyword": max_keyword,
+                "limit": limit,
+            }],
+            "max_tool_calls": max_tool_calls,
+        }
+
+    def _build_result(self, response, topic: dict) -> dict:
+        """序列化响应、落盘并提取引用与摘要，返回 search() 的结果字典。"""
         # 序列化响应
         response_data = json.loads(response.model_dump_json(indent=2))
 
@@ -129,9 +200,11 @@ class ScoutAgent:
         logger.info(f"[Scout] 响应已保存: {filepath}")
 
         return {
+            "topic": topic["name"],
             "response_data": response_data,
             "filepath": filepath,
             "references": references,
+            "reference_count": len(references),
             "summary_text": summary_text,
             "health": health,
         }
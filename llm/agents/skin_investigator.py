@@ -8,10 +8,10 @@ K 线数据，并将结果持久化到 skin_details 表。
 import time
 import sys
 import os
+import socket
+import asyncio
 import logging
-from urllib.parse import quote
-
-import httpx
+from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
@@ -26,18 +26,25 @@ from db.skin_processor import (
     SkinSearchTaskProcessor,
     SkinDetailProcessor,
 )
-from db.item_kline_processor import ItemKlineProcessor
+from db.cs2_item_index import resolve_name
+from app.integrations.bufftracker import BuffTrackerClient
+from app.integrations.quota import Priority, QuotaDeferred
 
 AGENT_ID = "skin_investigator_v1"
 CRAWL_DELAY_SECONDS = 2   # buff-tracker 间隔不需要太长
 DEFAULT_BATCH_SIZE = 10   # 每次批量处理的任务数
 DEFAULT_PLATFORM = "BUFF"
+KLINE_TIMEOUT_SECONDS = 30.0
+
+# 并发 worker 数；所有 worker 共享一个限速器，上游请求速率默认仍为每 CRAWL_DELAY_SECONDS 一次
+INVESTIGATOR_WORKERS = int(os.getenv("INVESTIGATOR_WORKERS", "4"))
+INVESTIGATOR_RATE = float(os.getenv("INVESTIGATOR_RATE", str(1 / CRAWL_DELAY_SECONDS)))
 
-# buff-tracker 服务地址
-BUFFTRACKER_URL = os.getenv("BUFFTRACKER_URL", "http://host.docker.internal:8001")
+# 认领租约：进程崩溃或卡住超过该时长后，其认领的 running 任务会被其他进程回收
+INVESTIGATOR_LEASE_SECONDS = int(os.getenv("INVESTIGATOR_LEASE_SECONDS", "600"))
 
-# 用于从 cs2_items 查找完整的 market_hash_name（含品质后缀）
-_kline_processor = ItemKlineProcessor()
+# 共享的 buff-tracker 客户端（连接池 + 搜索结果缓存）
+_bufftracker_client = BuffTrackerClient(timeout=15.0)
 
 
 def _normalize_hash_name(name: str) -> str:
@@ -65,60 +72,23 @@ def _normalize_hash_name(name: str) -> str:
 
 def _lookup_full_hash_name(market_hash_name: str) -> str:
     """
-    从 cs2_items 表查找完整的 market_hash_name（含品质后缀如 Field-Tested）。
+    从 cs2_items 查找完整的 market_hash_name（含品质后缀如 Field-Tested）。
     buff-tracker 需要完整名称来获取 kline 数据。
-    三级匹配：精确 → 前缀 LIKE → 包含 LIKE（处理 ★ 前缀的刀具/手套）。
+    三级匹配：精确 → 前缀 → 包含（处理 ★ 前缀的刀具/手套），均在进程内名称索引上完成；
+    未命中时检查 cs2_items 是否有其他进程新同步的饰品，有则后台重新加载索引。
     """
-    conn = None
-    try:
-        conn = _kline_processor.get_db_connection()
-        with conn.cursor() as cursor:
-            # 精确匹配
-            cursor.execute(
-                "SELECT market_hash_name FROM cs2_items WHERE market_hash_name = %s LIMIT 1",
-                (market_hash_name,)
-            )
-            row = cursor.fetchone()
-            if row:
-                return str(row[0])
-
-            # 前缀匹配：hash + 品质后缀 (Field-Tested) 等
-            cursor.execute(
-                "SELECT market_hash_name FROM cs2_items WHERE market_hash_name LIKE %s LIMIT 1",
-                (f"{market_hash_name}%",)
-            )
-            row = cursor.fetchone()
-            if row:
-                return str(row[0])
-
-            # 包含匹配：处理 ★ 前缀的刀具/手套/Souvenir 等
-            cursor.execute(
-                "SELECT market_hash_name FROM cs2_items WHERE market_hash_name LIKE %s LIMIT 1",
-                (f"%{market_hash_name}%",)
-            )
-            row = cursor.fetchone()
-            if row:
-                return str(row[0])
-    except Exception as e:
-        logger.warning(f"查找完整名称失败: {e}")
-    finally:
-        if conn and conn.open:
-            conn.close()
+    return resolve_name(market_hash_name) or ""
 
-    return ""
 
-
-def _search_hash_name_via_bufftracker(chinese_name: str) -> str:
+async def _search_hash_name_via_bufftracker(chinese_name: str) -> str:
     """
     通过 buff-tracker 的 /api/search 接口，用中文名搜索获取 market_hash_name。
     作为 cs2_items 本地查找失败时的保底机制。
     返回第一个匹配结果的 market_hash_name，失败返回空字符串。
     """
-    url = f"{BUFFTRACKER_URL}/api/search"
     try:
-        resp = httpx.get(url, params={"name": chinese_name}, timeout=15.0)
-        resp.raise_for_status()
-        data = resp.json()
+        # 经 BuffTrackerClient 的响应缓存，重复的中文名查找不再访问上游
+        data = await _bufftracker_client.search_items(chinese_name)
         if data.get("success") and data.get("data"):
             first = data["data"][0]
             hash_name = first.get("market_hash_name", "")
@@ -131,22 +101,21 @@ def _search_hash_name_via_bufftracker(chinese_name: str) -> str:
         return ""
 
 
-def _fetch_kline_from_bufftracker(
+async def _fetch_kline_from_bufftracker(
     market_hash_name: str,
     platform: str = "BUFF",
     type_day: str = "2",
 ) -> dict | None:
     """
-    通过 buff-tracker 服务获取 K 线数据。
+    通过 buff-tracker 服务获取 K 线数据（共享连接池 + 熔断/重试）。
     buff-tracker 内部使用 Playwright+Chrome 绕过 steamdt WAF。
     返回格式: {success: True, data: [[ts, price, sell, buy_price, buy_count, turnover, volume, total], ...]}
     """
-    url = f"{BUFFTRACKER_URL}/api/item/kline-data/{quote(market_hash_name)}"
-    params = {"platform": platform, "type_day": type_day, "date_type": "3"}
     try:
-        resp = httpx.get(url, params=params, timeout=30.0)
-        resp.raise_for_status()
-        data = resp.json()
+        data = await _bufftracker_client.get_item_kline_data(
+            market_hash_name, platform=platform, type_day=type_day, date_type=3,
+            timeout=KLINE_TIMEOUT_SECONDS,
+        )
         if data.get("success") and data.get("data"):
             return data
         logger.warning(f"buff-tracker 返回无数据: {data.get('errorMsg', data.get('detail', ''))}")
@@ -200,152 +169,292 @@ def _extract_price_from_kline(kline_data: dict) -> tuple[float | None, float | N
         return None, None, None, None
 
 
+class AsyncRateLimiter:
+    """
+    多个 worker 共享的请求限速器：相邻两次放行至少间隔 1/rate 秒。
+    只在真正访问上游前等待，失败、跳过和本地查找不再额外 sleep。
+    """
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
 class SkinInvestigatorAgent:
     """
     调查员 Agent：负责爬取各饰品的价格 K 线数据，并写入 DB。
+
+    一批任务由 workers 个协程并发调查，共享限速器和 buff-tracker 连接池；
+    任务认领、详情写入和状态更新都按批执行（各一次往返）。
+    多个调查进程可同时运行：任务经 claim_tasks 原子认领并带租约，互不重复。
     """
 
-    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, platform: str = DEFAULT_PLATFORM):
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, platform: str = DEFAULT_PLATFORM,
+                 workers: int = INVESTIGATOR_WORKERS, rate_per_second: float = INVESTIGATOR_RATE,
+                 lease_seconds: int = INVESTIGATOR_LEASE_SECONDS):
         self.batch_size = batch_size
         self.platform = platform
-
-    def run_pending_tasks(self) -> dict:
+        self.workers = max(1, workers)
+        self.rate_per_second = rate_per_second
+        self.lease_seconds = lease_seconds
+        # 每个进程一个代理标识，写入 assigned_agent，状态回写时只更新自己仍持有的任务
+        self.agent_id = f"{AGENT_ID}@{socket.gethostname()}:{os.getpid()}"[:64]
+
+    def claim_tasks(self, task_proc, limit: int) -> list[dict]:
+        """按优先级原子认领至多 limit 个 pending 任务。"""
+        return task_proc.claim_tasks(limit, self.agent_id, self.lease_seconds)
+
+    def claim_tasks_by_ids(self, task_proc, task_ids: list[int]) -> list[dict]:
+        """认领指定的任务（已被其他进程认领或已完成的会被跳过）。"""
+        return task_proc.claim_tasks_by_ids(task_ids, self.agent_id, self.lease_seconds)
+
+    def rate_limiter(self) -> AsyncRateLimiter:
+        """新建限速器（asyncio 原语绑定事件循环，每次 asyncio.run 各建一个）。"""
+        return AsyncRateLimiter(self.rate_per_second)
+
+    @contextmanager
+    def session(self):
         """
-        主入口：从 DB 获取 pending 任务，逐一爬取，更新 DB。
-        返回运行统计。
+        打开调查所需的 DB 处理器，yield (task_proc, entity_proc, detail_proc)；
+        DB 连接失败时 yield None。
         """
-        stats = {"total": 0, "succeeded": 0, "failed": 0, "skipped": 0}
-
-        with SkinSearchTaskProcessor() as task_proc:
+        with SkinSearchTaskProcessor() as task_proc, \
+                SkinEntityProcessor() as entity_proc, \
+                SkinDetailProcessor() as detail_proc:
             if not task_proc.conn:
                 logger.error("[Investigator] DB 连接失败")
+                yield None
+                return
+            # 独立运行的调查进程也要先补齐租约字段/索引，否则认领 SQL 会一直失败
+            task_proc.create_table_if_not_exists()
+            detail_proc.create_table_if_not_exists()
+            yield task_proc, entity_proc, detail_proc
+
+    async def _investigate(self, task: dict, entity: dict | None,
+                           limiter: AsyncRateLimiter, state: dict) -> dict:
+        """
+        调查单个任务，不写 DB，返回结果记录：
+        {task_id, entity_id, outcome(done/failed/skipped/deferred), error_message, kline, fixed_hash_name}
+        """
+        task_id = task['id']
+        entity_id = task['skin_entity_id']
+        record = {"task_id": task_id, "entity_id": entity_id, "outcome": "failed",
+                  "error_message": None, "kline": None, "fixed_hash_name": None}
+
+        if not entity:
+            logger.warning(f"  任务 #{task_id}: 找不到实体 ID={entity_id}，跳过")
+            record.update(outcome="skipped", error_message="entity not found")
+            return record
+
+        skin_name = entity.get('skin_name', '未知')
+        market_hash_name = entity.get('market_hash_name')
+
+        # 修正 hash name 格式问题
+        if market_hash_name:
+            market_hash_name = _normalize_hash_name(market_hash_name)
+
+        if not market_hash_name:
+            # 无 market_hash_name 则无法爬取 steamdt
+            logger.warning(f"  任务 #{task_id} [{skin_name}]: 缺少 market_hash_name，跳过")
+            record.update(outcome="skipped", error_message="no market_hash_name")
+            return record
+
+        if state["deferred"]:
+            record["outcome"] = "deferred"
+            return record
+
+        logger.info(f"  调查 #{task_id}: {skin_name} ({market_hash_name})")
+
+        # 查找带品质后缀的完整名称（buff-tracker 需要完整名称）
+        full_name = await asyncio.to_thread(_lookup_full_hash_name, market_hash_name)
+        if full_name:
+            logger.info(f"    完整名称: {full_name}")
+        else:
+            # 找不到完整名称，尝试用原始名称
+            full_name = market_hash_name
+            logger.warning(f"    未匹配到完整名称，使用原始: {full_name}")
+
+        # 配额不足时让位给交互请求与追踪刷新，剩余任务保持 pending 留待下次
+        try:
+            await _bufftracker_client.quota.acquire(Priority.INVESTIGATOR)
+        except QuotaDeferred as e:
+            if not state["deferred"]:
+                logger.warning(f"  配额不足，推迟剩余任务: {e}")
+            state["deferred"] = True
+            record["outcome"] = "deferred"
+            return record
+
+        await limiter.wait()
+        kline_result = await _fetch_kline_from_bufftracker(
+            market_hash_name=full_name,
+            platform=self.platform,
+            type_day="2",
+        )
+
+        # 保底机制：kline 获取失败时，用中文名通过 search API 查找 hash name 后重试
+        if not kline_result and skin_name:
+            logger.info(f"    触发搜索保底，使用中文名: {skin_name}")
+            fallback_name = await _search_hash_name_via_bufftracker(skin_name)
+            if fallback_name and fallback_name != full_name:
+                try:
+                    await _bufftracker_client.quota.acquire(Priority.INVESTIGATOR)
+                    await limiter.wait()
+                    kline_result = await _fetch_kline_from_bufftracker(
+                        market_hash_name=fallback_name,
+                        platform=self.platform,
+                        type_day="2",
+                    )
+                    if kline_result:
+                        # 保底成功，稍后回写正确的 market_hash_name 到实体
+                        record["fixed_hash_name"] = fallback_name
+                        logger.info(f"    保底成功: {fallback_name}")
+                except QuotaDeferred as e:
+                    logger.warning(f"    保底因配额不足放弃: {e}")
+                except Exception as e:
+                    logger.error(f"    保底获取失败: {e}")
+
+        if not kline_result:
+            logger.warning(f"    buff-tracker 返回为空")
+            record["error_message"] = "empty kline from bufftracker"
+            return record
+
+        record.update(outcome="done", kline=kline_result)
+        return record
+
+    def _flush(self, procs, records: list[dict], stats: dict):
+        """把一批调查结果批量写回：skin_details、实体名称修正、任务状态各一次。"""
+        task_proc, entity_proc, detail_proc = procs
+
+        details = []
+        for record in records:
+            if record["outcome"] != "done":
+                continue
+            current_price, change_24h, change_7d, volume = _extract_price_from_kline(record["kline"])
+            record["result"] = {"current_price": current_price, "change_24h": change_24h,
+                                "change_7d": change_7d, "volume": volume}
+            details.append({
+                "skin_entity_id": record["entity_id"],
+                "current_price": current_price,
+                "price_change_24h": change_24h,
+                "price_change_7d": change_7d,
+                "volume": volume,
+                "kline_data_json": record["kline"],
+            })
+        detail_ids = detail_proc.upsert_skin_details(self.platform, details)
+        for record in records:
+            # 详情没写进去（upsert 失败）的任务不能标记 done，否则爬到的数据丢失且不会重试
+            if record["outcome"] == "done" and record["entity_id"] not in detail_ids:
+                record["outcome"] = "write_failed"
+
+        for record in records:
+            if record["fixed_hash_name"]:
+                entity_proc.update_market_hash_name(record["entity_id"], record["fixed_hash_name"])
+
+        updates = []
+        for record in records:
+            outcome = record["outcome"]
+            if outcome == "done":
+                result = {**record["result"], "detail_id": detail_ids.get(record["entity_id"])}
+                updates.append({"task_id": record["task_id"], "status": "done", "result_json": result})
+                price = result["current_price"]
+                change = result["change_24h"]
+                price_str = f"¥{price:.2f}" if price else "N/A"
+                change_str = f"{change*100:+.2f}%" if change is not None else "N/A"
+                logger.info(f"    #{record['task_id']} 价格: {price_str}  24h: {change_str}  "
+                            f"detail_id={result['detail_id']}")
+                stats["succeeded"] += 1
+            elif outcome == "deferred":
+                # 释放认领，留待下次
+                updates.append({"task_id": record["task_id"], "status": "pending"})
+                stats["deferred"] += 1
+            elif outcome == "write_failed":
+                logger.warning(f"    #{record['task_id']} skin_details 写入失败，任务放回 pending 待重试")
+                updates.append({"task_id": record["task_id"], "status": "pending",
+                                "error_message": "skin_details write failed"})
+                stats["failed"] += 1
+            else:
+                updates.append({"task_id": record["task_id"], "status": "failed",
+                                "error_message": record["error_message"]})
+                stats["skipped" if outcome == "skipped" else "failed"] += 1
+        task_proc.update_task_statuses(updates, assigned_agent=self.agent_id)
+
+    async def investigate_batch(self, tasks: list[dict], procs, stats: dict,
+                                limiter: AsyncRateLimiter = None) -> list[dict]:
+        """
+        并发调查一批已认领（claim_tasks / claim_tasks_by_ids）的任务并批量写回 DB，
+        结果累加到 stats，返回结果记录列表。
+        DB 读写按批经 asyncio.to_thread 完成，不阻塞同一事件循环上的其他阶段
+        （流式模式下的 Scout 流与 Parser）；worker 之间只并发网络请求。
+        """
+        if not tasks:
+            return []
+        _, entity_proc, _ = procs
+        limiter = limiter or self.rate_limiter()
+
+        entities = await asyncio.to_thread(
+            entity_proc.get_skin_entities_by_ids, [t['skin_entity_id'] for t in tasks]
+        )
+
+        pending = list(tasks)
+        records: list[dict] = []
+        state = {"deferred": False}
+
+        async def worker():
+            while pending:
+                task = pending.pop(0)
+                try:
+                    record = await self._investigate(task, entities.get(task['skin_entity_id']), limiter, state)
+                except Exception as e:
+                    logger.error(f"  任务 #{task['id']} 调查异常: {e}")
+                    record = {"task_id": task['id'], "entity_id": task['skin_entity_id'], "outcome": "failed",
+                              "error_message": str(e)[:500], "kline": None, "fixed_hash_name": None}
+                records.append(record)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, len(tasks)))))
+        await asyncio.to_thread(self._flush, procs, records, stats)
+        return records
+
+    async def run_pending_tasks_async(self) -> dict:
+        """认领一批 pending 任务并发调查，返回运行统计。"""
+        stats = {"total": 0, "succeeded": 0, "failed": 0, "skipped": 0, "deferred": 0}
+
+        with self.session() as procs:
+            if procs is None:
                 return stats
 
-            tasks = task_proc.get_pending_tasks(limit=self.batch_size)
+            tasks = await asyncio.to_thread(self.claim_tasks, procs[0], self.batch_size)
             stats["total"] = len(tasks)
 
             if not tasks:
                 logger.info("[Investigator] 没有待处理的任务")
                 return stats
 
-            logger.info(f"[Investigator] 获取到 {len(tasks)} 个待处理任务")
-
-            with SkinEntityProcessor() as entity_proc:
-                with SkinDetailProcessor() as detail_proc:
-                    detail_proc.create_table_if_not_exists()
-
-                    for i, task in enumerate(tasks):
-                        task_id = task['id']
-                        entity_id = task['skin_entity_id']
-
-                        # 获取饰品实体信息
-                        entity = entity_proc.get_skin_entity_by_id(entity_id)
-                        if not entity:
-                            logger.warning(f"  任务 #{task_id}: 找不到实体 ID={entity_id}，跳过")
-                            task_proc.update_task_status(task_id, 'failed', error_message="entity not found")
-                            stats["skipped"] += 1
-                            continue
-
-                        skin_name = entity.get('skin_name', '未知')
-                        market_hash_name = entity.get('market_hash_name')
-
-                        # 修正 hash name 格式问题
-                        if market_hash_name:
-                            market_hash_name = _normalize_hash_name(market_hash_name)
-
-                        if not market_hash_name:
-                            # 无 market_hash_name 则无法爬取 steamdt
-                            logger.warning(f"  任务 #{task_id} [{skin_name}]: 缺少 market_hash_name，跳过")
-                            task_proc.update_task_status(task_id, 'failed', error_message="no market_hash_name")
-                            stats["skipped"] += 1
-                            continue
-
-                        logger.info(f"  [{i+1}/{len(tasks)}] 调查: {skin_name} ({market_hash_name})")
-
-                        # 查找带品质后缀的完整名称（buff-tracker 需要完整名称）
-                        full_name = _lookup_full_hash_name(market_hash_name)
-                        if full_name:
-                            logger.info(f"    完整名称: {full_name}")
-                        else:
-                            # 找不到完整名称，尝试用原始名称
-                            full_name = market_hash_name
-                            logger.warning(f"    未匹配到完整名称，使用原始: {full_name}")
-
-                        # 标记任务为运行中
-                        task_proc.update_task_status(task_id, 'running', assigned_agent=AGENT_ID)
-
-                        # 通过 buff-tracker 获取 K 线数据
-                        kline_result = None
-                        try:
-                            kline_result = _fetch_kline_from_bufftracker(
-                                market_hash_name=full_name,
-                                platform=self.platform,
-                                type_day="2",
-                            )
-                        except Exception as e:
-                            logger.error(f"    获取失败: {e}")
-
-                        # 保底机制：kline 获取失败时，用中文名通过 search API 查找 hash name 后重试
-                        if not kline_result and skin_name:
-                            logger.info(f"    触发搜索保底，使用中文名: {skin_name}")
-                            fallback_name = _search_hash_name_via_bufftracker(skin_name)
-                            if fallback_name and fallback_name != full_name:
-                                time.sleep(CRAWL_DELAY_SECONDS)
-                                try:
-                                    kline_result = _fetch_kline_from_bufftracker(
-                                        market_hash_name=fallback_name,
-                                        platform=self.platform,
-                                        type_day="2",
-                                    )
-                                    if kline_result:
-                                        # 保底成功，回写正确的 market_hash_name 到实体
-                                        entity_proc.update_market_hash_name(entity_id, fallback_name)
-                                        logger.info(f"    保底成功，已更新 hash_name: {fallback_name}")
-                                except Exception as e:
-                                    logger.error(f"    保底获取失败: {e}")
-
-                        if not kline_result:
-                            logger.warning(f"    buff-tracker 返回为空")
-                            task_proc.update_task_status(task_id, 'failed', error_message="empty kline from bufftracker")
-                            stats["failed"] += 1
-                            if i < len(tasks) - 1:
-                                time.sleep(CRAWL_DELAY_SECONDS)
-                            continue
-
-                        # 解析价格数据
-                        current_price, change_24h, change_7d, volume = _extract_price_from_kline(kline_result)
-
-                        # 写入 skin_details
-                        detail_id = detail_proc.upsert_skin_detail(
-                            skin_entity_id=entity_id,
-                            platform=self.platform,
-                            current_price=current_price,
-                            price_change_24h=change_24h,
-                            price_change_7d=change_7d,
-                            volume=volume,
-                            kline_data_json=kline_result,
-                        )
-
-                        price_str = f"¥{current_price:.2f}" if current_price else "N/A"
-                        change_str = f"{change_24h*100:+.2f}%" if change_24h is not None else "N/A"
-                        logger.info(f"    价格: {price_str}  24h: {change_str}  detail_id={detail_id}")
-
-                        # 更新任务状态为完成
-                        task_proc.update_task_status(
-                            task_id, 'done',
-                            result_json={"current_price": current_price, "change_24h": change_24h,
-                                         "change_7d": change_7d, "volume": volume, "detail_id": detail_id}
-                        )
-                        stats["succeeded"] += 1
-
-                        # 爬取间隔
-                        if i < len(tasks) - 1:
-                            time.sleep(CRAWL_DELAY_SECONDS)
+            logger.info(f"[Investigator] {self.agent_id} 认领 {len(tasks)} 个待处理任务，{min(self.workers, len(tasks))} 个 worker 并发调查")
+            started = time.monotonic()
+            await self.investigate_batch(tasks, procs, stats)
+            stats["elapsed_seconds"] = round(time.monotonic() - started, 2)
 
         logger.info(f"[Investigator] 完成: 共 {stats['total']} 任务 | "
-              f"成功 {stats['succeeded']} | 失败 {stats['failed']} | 跳过 {stats['skipped']}")
+              f"成功 {stats['succeeded']} | 失败 {stats['failed']} | 跳过 {stats['skipped']} | "
+              f"推迟 {stats['deferred']} | 耗时 {stats['elapsed_seconds']}s")
         return stats
 
+    def run_pending_tasks(self) -> dict:
+        """
+        主入口：从 DB 认领 pending 任务，并发爬取，批量更新 DB。
+        返回运行统计。
+        """
+        return asyncio.run(self.run_pending_tasks_async())
+
 
 if __name__ == "__main__":
     agent = SkinInvestigatorAgent(batch_size=5)
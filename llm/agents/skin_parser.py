@@ -11,12 +11,17 @@ Skin Parser Agent（饰品解析代理）
 """
 
 import os
+import sys
 import json
 import re
 import logging
-from openai import OpenAI
 from dotenv import load_dotenv
 
+# 添加项目根目录到 sys.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from llm.clients.llm_client import LLMClient
+
 logger = logging.getLogger(__name__)
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
@@ -108,10 +113,7 @@ class SkinParserAgent:
                          models[0] if models else 'doubao-seed-1-6-flash-250828')
 
         self.model = model
-        self.client = OpenAI(
-            base_url="https://ark.cn-beijing.volces.com/api/v3",
-            api_key=api_key,
-        )
+        self.llm = LLMClient(model=model)
 
     def parse(self, scout_result: dict) -> dict:
         """
@@ -122,14 +124,15 @@ class SkinParserAgent:
                           包含 response_data, references, summary_text
 
         Returns:
-            包含 entities, tasks_created 的字典
+            包含 entities, tasks_created, tasks 的字典；
+            tasks 为新建任务 [{id, skin_entity_id, priority}]，供流式流水线直接交给 Investigator
         """
         references = scout_result.get('references', [])
         summary_text = scout_result.get('summary_text', '')
 
         if not references and not summary_text:
             logger.info("[Parser] 无可解析内容")
-            return {"entities": [], "tasks_created": 0}
+            return {"entities": [], "tasks_created": 0, "tasks": []}
 
         # Step 1: 规则匹配（快速、无 API 调用）
         rule_entities = self._extract_by_rules(references, summary_text)
@@ -144,11 +147,12 @@ class SkinParserAgent:
         logger.info(f"[Parser] 合并后: {len(merged_entities)} 个唯一实体")
 
         # Step 4: 写入 DB 并创建任务
-        tasks_created = self._save_entities_and_create_tasks(merged_entities, references)
+        tasks = self._save_entities_and_create_tasks(merged_entities, references)
 
         return {
             "entities": merged_entities,
-            "tasks_created": tasks_created,
+            "tasks_created": len(tasks),
+            "tasks": tasks,
         }
 
     def _extract_by_rules(self, references: list, summary_text: str) -> list[dict]:
@@ -272,35 +276,34 @@ class SkinParserAgent:
         combined_text = "\n\n".join(text_parts)
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            entities_raw = self.llm.chat(
                 messages=[
                     {"role": "system", "content": PARSER_SYSTEM_PROMPT},
                     {"role": "user", "content": PARSER_USER_TEMPLATE.format(text=combined_text)},
                 ],
+                parse=self._parse_entities_json,
                 temperature=0.1,
                 max_tokens=2000,
             )
-            content = response.choices[0].message.content.strip()
-
-            # 提取 JSON
-            json_match = re.search(r'\[.*?\]', content, re.DOTALL)
-            if json_match:
-                entities_raw = json.loads(json_match.group())
-                # 添加来源标记
-                for entity in entities_raw:
-                    entity['source'] = 'llm'
-                return entities_raw
-            else:
-                logger.warning(f"[Parser] LLM 返回非 JSON 内容: {content[:100]}")
-                return []
-        except json.JSONDecodeError as e:
-            logger.warning(f"[Parser] JSON 解析失败: {e}")
+            # 添加来源标记
+            for entity in entities_raw:
+                entity['source'] = 'llm'
+            return entities_raw
+        except ValueError as e:
+            logger.warning(f"[Parser] LLM 返回内容无法解析: {e}")
             return []
         except Exception as e:
             logger.error(f"[Parser] LLM 提取失败: {e}")
             return []
 
+    @staticmethod
+    def _parse_entities_json(content: str) -> list[dict]:
+        """从 LLM 回复中取出 JSON 数组；格式不对时抛 ValueError（该回复不会进入缓存）。"""
+        json_match = re.search(r'\[.*?\]', content.strip(), re.DOTALL)
+        if not json_match:
+            raise ValueError(f"非 JSON 内容: {content.strip()[:100]}")
+        return json.loads(json_match.group())
+
     @staticmethod
     def _merge_entities(rule_entities: list, llm_entities: list) -> list[dict]:
         """
@@ -335,26 +338,26 @@ class SkinParserAgent:
 
         return merged
 
-    def _save_entities_and_create_tasks(self, entities: list, references: list) -> int:
+    def _save_entities_and_create_tasks(self, entities: list, references: list) -> list[dict]:
         """
         将实体写入 skin_entities 表，并创建 skin_search_tasks。
-        返回创建的任务数。
+        返回新建的任务列表 [{id, skin_entity_id, priority}]。
         """
         from db.skin_processor import SkinEntityProcessor, SkinSearchTaskProcessor
 
-        tasks_created = 0
+        tasks = []
 
         with SkinEntityProcessor() as entity_proc:
             if not entity_proc.conn:
                 logger.warning("[Parser] DB 连接失败，跳过持久化")
-                return 0
+                return tasks
 
             entity_proc.create_table_if_not_exists()
 
             with SkinSearchTaskProcessor() as task_proc:
                 if not task_proc.conn:
                     logger.warning("[Parser] 任务表 DB 连接失败")
-                    return 0
+                    return tasks
 
                 task_proc.create_table_if_not_exists()
 
@@ -392,7 +395,7 @@ class SkinParserAgent:
                                 priority=priority,
                             )
                             if task_id:
-                                tasks_created += 1
+                                tasks.append({"id": task_id, "skin_entity_id": entity_id, "priority": priority})
                     else:
                         # 无相关 reference，仍创建一个基础任务
                         task_id = task_proc.create_task(
@@ -402,9 +405,9 @@ class SkinParserAgent:
                             priority=priority,
                         )
                         if task_id:
-                            tasks_created += 1
+                            tasks.append({"id": task_id, "skin_entity_id": entity_id, "priority": priority})
 
-        return tasks_created
+        return tasks
 
     @staticmethod
     def _detect_weapon_type(weapon_name: str) -> str:
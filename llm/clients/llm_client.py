@@ -0,0 +1,259 @@
+"""
+llm_client.py — 共享的豆包 LLM 客户端（带内容寻址响应缓存）
+
+Parser / 新闻分类 / 新闻抓取 / 大盘分析都通过 LLMClient.chat() 调用 chat.completions。
+缓存键为 sha256(model, messages, 采样参数)，响应落盘到 LLM_CACHE_DIR：
+  - 同一输入（重试、重跑、不同话题间重复的引用）直接命中，不消耗 token 也没有延迟；
+  - 条目超过 LLM_CACHE_TTL 秒后失效，总大小超过 LLM_CACHE_MAX_MB 时按最近使用时间淘汰；
+  - LLM_CACHE_TTL=0 关闭缓存。
+Scout 的联网搜索结果依赖实时内容，不走缓存。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from openai import OpenAI
+
+logger = logging.getLogger(__name__)
+
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
+
+ARK_BASE_URL = os.getenv("ARK_BASE_URL", "https://ark.cn-beijing.volces.com/api/v3")
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "LLM_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+)
+DEFAULT_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+DEFAULT_MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+
+def doubao_models() -> List[str]:
+    """解析 DOUBAO_MODEL 环境变量（形如 "[model-a, model-b]"）为模型列表。"""
+    models_str = os.getenv("DOUBAO_MODEL", "").strip('[]')
+    return [m.strip() for m in models_str.split(',') if m.strip()]
+
+
+def cache_key(model: str, messages: List[Dict], params: Dict) -> str:
+    """(model, messages, params) 的规范化 JSON 的 sha256。"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    磁盘上的内容寻址缓存：<cache_dir>/<key[:2]>/<key>.json。
+    写入用临时文件 + os.replace，多进程并发读写安全；命中时刷新 mtime 作为 LRU 依据。
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_bytes: Optional[int] = None
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "evicted": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str, max_age: float = None) -> Optional[Any]:
+        """返回缓存的响应；不存在或已过期返回 None。max_age 可为单次查询收紧 TTL。"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+
+        age = time.time() - entry.get("created_at", 0)
+        if age > self.ttl_seconds:
+            self._count("expired")
+            self._count("misses")
+            self.delete(key)
+            return None
+        if max_age is not None and age > max_age:
+            self._count("misses")
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count("hits")
+        return entry["response"]
+
+    def set(self, key: str, response: Any, model: str = None) -> None:
+        if not self.enabled:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(
+            {"created_at": time.time(), "model": model, "response": response}, ensure_ascii=False
+        ).encode("utf-8")
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"[LLMCache] 写入缓存失败: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        self._count("stores")
+        with self._lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = self._scan_size()
+            else:
+                self._approx_bytes += len(data)
+            over_limit = self._approx_bytes > self.max_bytes
+        if over_limit:
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _entries(self) -> List[tuple]:
+        """[(mtime, size, path)]，跳过写入中的临时文件。"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        """按 mtime 从旧到新删除，直到总大小降到上限的 90%。"""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * 0.9)
+            evicted = 0
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+            self._approx_bytes = total
+            self._counters["evicted"] += evicted
+        if evicted:
+            logger.info(f"[LLMCache] 超出大小上限，淘汰 {evicted} 条缓存")
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache() -> ResponseCache:
+    """进程内共享的默认缓存实例。"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+
+class LLMClient:
+    """
+    chat.completions 的薄封装：先查缓存，未命中再调用模型并写回缓存。
+
+    Args:
+        model: 默认模型名，chat() 可按次覆盖。
+        cache: 响应缓存，None 使用进程共享的默认缓存。
+        client: 注入的 OpenAI 兼容客户端（测试用），None 时按 ARK_API_KEY 创建。
+        timeout: 单次请求超时（秒）。
+    """
+
+    def __init__(self, model: str = None, cache: ResponseCache = None,
+                 client: Any = None, timeout: float = 60.0):
+        self.model = model
+        self.cache = cache or default_cache()
+        if client is None:
+            api_key = os.getenv("ARK_API_KEY")
+            if not api_key:
+                raise ValueError("未配置 ARK_API_KEY，请在 .env 中设置")
+            client = OpenAI(base_url=ARK_BASE_URL, api_key=api_key, timeout=timeout)
+        self.client = client
+
+    def chat(self, messages: List[Dict], model: str = None,
+             parse: Callable[[str], Any] = None, use_cache: bool = True,
+             max_age: float = None, **params) -> Any:
+        """
+        发送 chat.completions 请求，返回回复文本（或 parse(文本) 的结果）。
+        max_age 限制可接受的缓存条目年龄（秒），用于时效性强的 prompt。
+
+        parse 抛异常时该回复视为无效：新回复不写入缓存，命中的缓存条目被删除后重新请求，
+        避免一次格式错误的回复在 TTL 内反复生效。
+        """
+        model = model or self.model
+        key = cache_key(model, messages, params)
+
+        if use_cache:
+            cached = self.cache.get(key, max_age=max_age)
+            if cached is not None:
+                try:
+                    result = parse(cached) if parse else cached
+                    logger.debug(f"[LLMClient] 缓存命中 {key[:12]} ({model})")
+                    return result
+                except Exception as e:
+                    logger.warning(f"[LLMClient] 缓存条目无效，重新请求: {e}")
+                    self.cache.delete(key)
+
+        response = self.client.chat.completions.create(model=model, messages=messages, **params)
+        content = response.choices[0].message.content if response.choices else None
+        if content is None:
+            raise ValueError("LLM 未返回内容")
+
+        result = parse(content) if parse else content
+        if use_cache:
+            self.cache.set(key, content, model=model)
+        return result
@@ -8,7 +8,10 @@ orchestrator.py — Phase 5: Pipeline Orchestrator
 import sys
 import os
 import time
+import asyncio
 import logging
+from contextlib import ExitStack
+from dataclasses import dataclass, field
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -16,10 +19,257 @@ logger = logging.getLogger(__name__)
 # 添加项目根目录到 sys.path
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from llm.agents.scout_agent import ScoutAgent, DEFAULT_SEARCH_TOPICS
+from llm.agents.scout_agent import (
+    ScoutAgent,
+    DEFAULT_SEARCH_TOPICS,
+    SCOUT_CONCURRENCY,
+    SCOUT_TOPIC_TIMEOUT,
+)
 from llm.agents.skin_parser import SkinParserAgent
 from llm.agents.skin_investigator import SkinInvestigatorAgent
 
+# 流式模式下 Scout → Parser 队列容量（Parser → Investigator 队列容量为调查预算）
+STREAM_QUEUE_SIZE = 2
+
+# 阶段结束标记
+_END = object()
+
+
+@dataclass
+class StageMeter:
+    """流式流水线单个阶段的计数与计时。"""
+    processed: int = 0
+    busy_seconds: float = 0.0
+    blocked_seconds: float = 0.0
+    started: float = field(default_factory=time.monotonic)
+    finished: float = 0.0
+
+    async def put(self, queue: asyncio.Queue, item):
+        """向下游队列投递；队列满时等待（背压），等待时间计入 blocked_seconds。"""
+        t0 = time.monotonic()
+        await queue.put(item)
+        self.blocked_seconds += time.monotonic() - t0
+
+    def as_dict(self) -> dict:
+        busy = self.busy_seconds
+        return {
+            "processed": self.processed,
+            "busy_seconds": round(busy, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "active_seconds": round((self.finished or time.monotonic()) - self.started, 3),
+            "throughput_per_min": round(self.processed / busy * 60, 2) if busy > 0 else 0.0,
+        }
+
+
+def _parse_result(parser: SkinParserAgent, result: dict, parser_stats: dict) -> dict:
+    """解析单条 Scout 结果并累加到 parser_stats，返回 parse() 的结果。"""
+    parse_result = parser.parse(result)
+    entity_count = len(parse_result.get("entities", []))
+    tasks_count = parse_result.get("tasks_created", 0)
+    parser_stats["total_entities"] += entity_count
+    parser_stats["total_tasks_created"] += tasks_count
+    logger.info(f"  提取 {entity_count} 个实体，创建 {tasks_count} 个任务")
+    return parse_result
+
+
+async def _store_scout_result(scout: ScoutAgent, result: dict, scout_stats: dict) -> bool:
+    """Scout 结果入库；失败时记录并计入 db_errors，不影响其他话题的搜索。"""
+    try:
+        await asyncio.to_thread(scout.process_to_db, result)
+        return True
+    except Exception as e:
+        logger.error(f"  话题 {result.get('topic')} 入库失败: {e}")
+        scout_stats["db_errors"] += 1
+        return False
+
+
+async def _scout_and_parse(
+    scout: ScoutAgent,
+    parser: SkinParserAgent,
+    topics: list,
+    scout_stats: dict,
+    parser_stats: dict,
+    concurrency: int,
+    timeout: float,
+    max_tool_calls: int,
+    limit: int,
+) -> list:
+    """
+    并发搜索所有话题；每个话题完成后立即入库并交给 Parser，
+    其余话题的搜索在此期间继续进行。返回按完成顺序排列的 Scout 结果。
+    """
+    scout_results = []
+    async for result in scout.iter_search_results(
+        topics, concurrency=concurrency, timeout=timeout,
+        max_tool_calls=max_tool_calls, limit=limit,
+    ):
+        scout_results.append(result)
+        if "error" in result:
+            scout_stats["failed"] += 1
+            logger.warning(f"  话题 {result.get('topic')} 搜索失败: {result['error']}")
+            continue
+
+        scout_stats["topics_searched"] += 1
+        scout_stats["total_references"] += result.get("reference_count", 0)
+        if result.get("health", {}).get("is_healthy"):
+            # 持久化到 DB
+            if await _store_scout_result(scout, result, scout_stats):
+                logger.info(f"  话题 {result['topic']} 找到 {result.get('reference_count', 0)} 条引用")
+        else:
+            logger.warning(f"  话题 {result['topic']} 搜索结果不健康，跳过入库")
+
+        try:
+            await asyncio.to_thread(_parse_result, parser, result, parser_stats)
+        except Exception as e:
+            logger.error(f"  Parser 处理话题 {result['topic']} 失败: {e}")
+            parser_stats["errors"] += 1
+    return scout_results
+
+
+async def _run_streaming(
+    scout: ScoutAgent,
+    parser: SkinParserAgent,
+    investigator: SkinInvestigatorAgent,
+    topics: list,
+    pipeline_stats: dict,
+    concurrency: int,
+    timeout: float,
+    max_tool_calls: int,
+    limit: int,
+    queue_size: int = STREAM_QUEUE_SIZE,
+):
+    """
+    流式流水线：Scout → Parser → Investigator 三个阶段由有界队列连接并同时运行。
+    第一个话题解析出的任务立即开始调查，后续话题仍在搜索；
+    下游处理不过来时上游阻塞在 put 上（背压）。
+    调查数量以 investigator.batch_size 为上限，超出的任务保持 pending 留待下次；
+    流结束后若预算仍有剩余，再补调查 DB 中此前积压的 pending 任务。
+    """
+    scout_stats = pipeline_stats["scout"]
+    parser_stats = pipeline_stats["parser"]
+    inv_stats = pipeline_stats["investigator"]
+    meters = {"scout": StageMeter(), "parser": StageMeter(), "investigator": StageMeter()}
+    parse_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+    task_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, investigator.batch_size))
+
+    async def scout_stage():
+        meter = meters["scout"]
+        try:
+            async for result in scout.iter_search_results(
+                topics, concurrency=concurrency, timeout=timeout,
+                max_tool_calls=max_tool_calls, limit=limit,
+            ):
+                if "error" in result:
+                    scout_stats["failed"] += 1
+                    logger.warning(f"  [Scout] 话题 {result.get('topic')} 搜索失败: {result['error']}")
+                    continue
+                t0 = time.monotonic()
+                scout_stats["topics_searched"] += 1
+                scout_stats["total_references"] += result.get("reference_count", 0)
+                if result.get("health", {}).get("is_healthy"):
+                    await _store_scout_result(scout, result, scout_stats)
+                meter.busy_seconds += time.monotonic() - t0
+                meter.processed += 1
+                await meter.put(parse_queue, result)
+        except Exception as e:
+            logger.error(f"  [Scout] 阶段失败: {e}")
+            scout_stats["error"] = str(e)
+        finally:
+            meter.finished = time.monotonic()
+            await parse_queue.put(_END)
+
+    async def parser_stage():
+        meter = meters["parser"]
+        try:
+            while (result := await parse_queue.get()) is not _END:
+                t0 = time.monotonic()
+                try:
+                    parse_result = await asyncio.to_thread(_parse_result, parser, result, parser_stats)
+                except Exception as e:
+                    logger.error(f"  [Parser] 处理话题 {result.get('topic')} 失败: {e}")
+                    parser_stats["errors"] += 1
+                    continue
+                finally:
+                    meter.busy_seconds += time.monotonic() - t0
+                meter.processed += 1
+                for task in parse_result.get("tasks", []):
+                    await meter.put(task_queue, task)
+        finally:
+            meter.finished = time.monotonic()
+            await task_queue.put(_END)
+
+    async def investigator_stage():
+        meter = meters["investigator"]
+        budget = investigator.batch_size
+        limiter = investigator.rate_limiter()
+        state = {"deferred": False}
+
+        async def investigate(batch, procs):
+            t0 = time.monotonic()
+            try:
+                records = await investigator.investigate_batch(batch, procs, inv_stats, limiter)
+                deferred = sum(1 for r in records if r["outcome"] == "deferred")
+            except Exception as e:
+                logger.error(f"  [Investigator] 批次调查失败: {e}")
+                inv_stats["failed"] += len(batch)
+                deferred = 0
+            meter.busy_seconds += time.monotonic() - t0
+            inv_stats["total"] += len(batch) - deferred
+            meter.processed += len(batch) - deferred
+            if deferred:
+                state["deferred"] = True
+
+        with ExitStack() as stack:
+            try:
+                procs = await asyncio.to_thread(stack.enter_context, investigator.session())
+            except Exception as e:
+                logger.error(f"  [Investigator] 打开 DB 失败: {e}")
+                inv_stats["error"] = str(e)
+                procs = None
+
+            # 即使无法调查也要持续消费队列，避免上游阻塞
+            ended = False
+            while not ended and (task := await task_queue.get()) is not _END:
+                # 队列里已就绪的任务一起取出，凑成一批交给 worker 并发调查
+                batch = [task]
+                while len(batch) < investigator.workers and not task_queue.empty():
+                    queued = task_queue.get_nowait()
+                    if queued is _END:
+                        ended = True
+                        break
+                    batch.append(queued)
+
+                if procs is None:
+                    continue
+                if state["deferred"]:
+                    inv_stats["deferred"] += len(batch)
+                    continue
+                room = budget - meter.processed
+                if room < len(batch):
+                    inv_stats["left_pending"] += len(batch) - room
+                    batch = batch[:room]
+                if batch:
+                    # 认领刚创建的任务；已被其他调查进程认领的直接跳过
+                    claimed = await asyncio.to_thread(
+                        investigator.claim_tasks_by_ids, procs[0], [t['id'] for t in batch]
+                    )
+                    if len(claimed) < len(batch):
+                        inv_stats["claimed_elsewhere"] += len(batch) - len(claimed)
+                    if claimed:
+                        await investigate(claimed, procs)
+
+            remaining = budget - meter.processed
+            if procs is not None and not state["deferred"] and remaining > 0:
+                backlog = await asyncio.to_thread(investigator.claim_tasks, procs[0], remaining)
+                if backlog:
+                    logger.info(f"  [Investigator] 流结束，补调查 {len(backlog)} 个积压任务")
+                    await investigate(backlog, procs)
+            meter.finished = time.monotonic()
+
+    await asyncio.gather(scout_stage(), parser_stage(), investigator_stage())
+    for name, meter in meters.items():
+        pipeline_stats[name]["stage"] = meter.as_dict()
+
 
 def run_pipeline(
     topics: list = None,
@@ -29,6 +279,9 @@ def run_pipeline(
     investigator_batch_size: int = 10,
     skip_scout: bool = False,
     scout_result_file: str = None,
+    scout_concurrency: int = SCOUT_CONCURRENCY,
+    scout_timeout: float = SCOUT_TOPIC_TIMEOUT,
+    streaming: bool = False,
 ) -> dict:
     """
     运行完整的 CS2 饰品智能分析流水线。
@@ -41,13 +294,18 @@ def run_pipeline(
         investigator_batch_size: Investigator 一次处理的任务数。
         skip_scout: 跳过 Scout 阶段（用于调试，配合 scout_result_file）。
         scout_result_file: 指定 Scout 响应文件（skip_scout=True 时使用）。
+        scout_concurrency: 同时搜索的话题数上限。
+        scout_timeout: 单个话题的搜索超时（秒）。
+        streaming: 流式模式，三个阶段经有界队列同时运行（不支持 skip_scout）。
 
     Returns:
         包含各阶段统计的字典。
     """
     start_time = datetime.now()
+    streaming = streaming and not skip_scout
     pipeline_stats = {
         "started_at": start_time.isoformat(),
+        "mode": "streaming" if streaming else "phased",
         "scout": {},
         "parser": {},
         "investigator": {},
@@ -55,6 +313,33 @@ def run_pipeline(
 
     logger.info(f"[Orchestrator] 启动流水线 @ {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
 
+    if streaming:
+        topics = topics or DEFAULT_SEARCH_TOPICS
+        logger.info(f"[Streaming] Scout → Parser → Investigator: {len(topics)} 个话题，"
+                    f"调查预算 {investigator_batch_size} 个任务")
+        pipeline_stats["scout"] = {"topics_searched": 0, "failed": 0, "total_references": 0,
+                                   "db_errors": 0}
+        pipeline_stats["parser"] = {"total_entities": 0, "total_tasks_created": 0, "errors": 0}
+        pipeline_stats["investigator"] = {"total": 0, "succeeded": 0, "failed": 0, "skipped": 0,
+                                          "deferred": 0, "left_pending": 0,
+                                          "claimed_elsewhere": 0}
+        try:
+            asyncio.run(_run_streaming(
+                ScoutAgent(),
+                SkinParserAgent(),
+                SkinInvestigatorAgent(batch_size=investigator_batch_size),
+                topics,
+                pipeline_stats,
+                concurrency=scout_concurrency,
+                timeout=scout_timeout,
+                max_tool_calls=scout_max_tool_calls,
+                limit=scout_limit,
+            ))
+        except Exception as e:
+            logger.error(f"  流式流水线失败: {e}")
+            pipeline_stats["error"] = str(e)
+        return _finish(pipeline_stats, start_time)
+
     # ─── Phase 1: Scout Agent ─────────────────────────────────────
     scout_results = []
     if skip_scout and scout_result_file:
@@ -81,59 +366,39 @@ def run_pipeline(
             logger.error(f"  加载文件失败: {e}")
             return pipeline_stats
     else:
-        logger.info(f"[Phase 1] Scout: 开始搜索 {len(topics or DEFAULT_SEARCH_TOPICS)} 个话题")
+        # Scout 与 Parser 交叠执行：话题并发搜索，先完成的先入库、先解析
+        topics = topics or DEFAULT_SEARCH_TOPICS
+        logger.info(f"[Phase 1+2] Scout → Parser: 并发搜索 {len(topics)} 个话题 "
+                    f"(并发 {scout_concurrency}，单话题超时 {scout_timeout:.0f}s)")
+        pipeline_stats["scout"] = {"topics_searched": 0, "failed": 0, "total_references": 0,
+                                   "db_errors": 0}
+        pipeline_stats["parser"] = {"total_entities": 0, "total_tasks_created": 0, "errors": 0}
         try:
             scout = ScoutAgent()
-            for topic in (topics or DEFAULT_SEARCH_TOPICS):
-                logger.info(f"  搜索话题: {topic['name']}")
-                result = scout.search(
-                    topic,
-                    max_tool_calls=scout_max_tool_calls,
-                    limit=scout_limit,
-                )
-                if result.get("health", {}).get("is_healthy"):
-                    # 持久化到 DB
-                    scout.process_to_db(result)
-                    scout_results.append(result)
-                    logger.info(f"  找到 {result.get('reference_count', 0)} 条引用")
-                else:
-                    logger.warning(f"  搜索结果不健康，跳过")
-                    scout_results.append(result)
-
-                # 话题间稍作间隔
-                time.sleep(2)
-
-            pipeline_stats["scout"] = {
-                "topics_searched": len(scout_results),
-                "total_references": sum(r.get("reference_count", 0) for r in scout_results),
-            }
+            parser = SkinParserAgent()
+            scout_results = asyncio.run(_scout_and_parse(
+                scout, parser, topics,
+                pipeline_stats["scout"], pipeline_stats["parser"],
+                concurrency=scout_concurrency,
+                timeout=scout_timeout,
+                max_tool_calls=scout_max_tool_calls,
+                limit=scout_limit,
+            ))
         except Exception as e:
-            logger.error(f"  Scout 阶段失败: {e}")
+            logger.error(f"  Scout/Parser 阶段失败: {e}")
             pipeline_stats["scout"]["error"] = str(e)
 
-    # ─── Phase 2: Parser Agent ────────────────────────────────────
-    logger.info(f"[Phase 2] Parser: 从 {len(scout_results)} 条搜索结果中提取饰品实体")
-    total_entities = 0
-    total_tasks_created = 0
-    try:
-        parser = SkinParserAgent()
-        for result in scout_results:
-            if not result:
-                continue
-            parse_result = parser.parse(result)
-            entity_count = len(parse_result.get("entities", []))
-            tasks_count = parse_result.get("tasks_created", 0)
-            total_entities += entity_count
-            total_tasks_created += tasks_count
-            logger.info(f"  提取 {entity_count} 个实体，创建 {tasks_count} 个任务")
-
-        pipeline_stats["parser"] = {
-            "total_entities": total_entities,
-            "total_tasks_created": total_tasks_created,
-        }
-    except Exception as e:
-        logger.error(f"  Parser 阶段失败: {e}")
-        pipeline_stats["parser"]["error"] = str(e)
+    if skip_scout and scout_result_file:
+        # ─── Phase 2: Parser Agent（加载文件模式）─────────────────────
+        logger.info(f"[Phase 2] Parser: 从 {len(scout_results)} 条搜索结果中提取饰品实体")
+        pipeline_stats["parser"] = {"total_entities": 0, "total_tasks_created": 0}
+        try:
+            parser = SkinParserAgent()
+            for result in scout_results:
+                _parse_result(parser, result, pipeline_stats["parser"])
+        except Exception as e:
+            logger.error(f"  Parser 阶段失败: {e}")
+            pipeline_stats["parser"]["error"] = str(e)
 
     # ─── Phase 3: Investigator Agent ──────────────────────────────
     logger.info(f"[Phase 3] Investigator: 处理最多 {investigator_batch_size} 个调查任务")
@@ -145,12 +410,16 @@ def run_pipeline(
         logger.error(f"  Investigator 阶段失败: {e}")
         pipeline_stats["investigator"]["error"] = str(e)
 
-    # ─── 完成 ──────────────────────────────────────────────────────
+    return _finish(pipeline_stats, start_time)
+
+
+def _finish(pipeline_stats: dict, start_time: datetime) -> dict:
+    """记录耗时与结束时间并输出汇总日志。"""
     elapsed = (datetime.now() - start_time).total_seconds()
     pipeline_stats["elapsed_seconds"] = elapsed
     pipeline_stats["finished_at"] = datetime.now().isoformat()
 
-    logger.info(f"[Orchestrator] 流水线完成，耗时 {elapsed:.1f}s | Scout: {pipeline_stats['scout']} | Parser: {pipeline_stats['parser']} | Investigator: {pipeline_stats['investigator']}")
+    logger.info(f"[Orchestrator] 流水线完成（{pipeline_stats['mode']}），耗时 {elapsed:.1f}s | Scout: {pipeline_stats['scout']} | Parser: {pipeline_stats['parser']} | Investigator: {pipeline_stats['investigator']}")
 
     return pipeline_stats
 
@@ -164,6 +433,12 @@ if __name__ == "__main__":
                         help="指定 Scout 响应 JSON 文件路径（配合 --skip-scout 使用）")
     parser.add_argument("--investigator-batch", type=int, default=10,
                         help="Investigator 每次处理任务数（默认 10）")
+    parser.add_argument("--scout-concurrency", type=int, default=SCOUT_CONCURRENCY,
+                        help=f"同时搜索的话题数（默认 {SCOUT_CONCURRENCY}）")
+    parser.add_argument("--scout-timeout", type=float, default=SCOUT_TOPIC_TIMEOUT,
+                        help=f"单个话题搜索超时秒数（默认 {SCOUT_TOPIC_TIMEOUT:.0f}）")
+    parser.add_argument("--streaming", action="store_true",
+                        help="流式模式：三个阶段经有界队列同时运行，首个话题的实体立即开始调查")
     args = parser.parse_args()
 
     # 自动查找最新 scout 文件
@@ -182,4 +457,7 @@ if __name__ == "__main__":
         skip_scout=args.skip_scout,
         scout_result_file=args.scout_file,
         investigator_batch_size=args.investigator_batch,
+        scout_concurrency=args.scout_concurrency,
+        scout_timeout=args.scout_timeout,
+        streaming=args.streaming,
     )
@@ -0,0 +1,314 @@
+"""
+backtest.py — 单饰品价格模型的并行滚动回测（walk-forward）
+
+对每个饰品按时间回放历史：在第 t 天只用 t 及之前的 K 线训练（或沿用最近一次
+训练的模型），预测 t+7 天的价格，再与真实价格比较，汇总 MAE / RMSE / MAPE
+和涨跌方向命中率。
+
+  - 所有饰品的 K 线打包成一块共享内存，worker 进程直接映射成 NumPy 视图，不复制数据；
+  - 按饰品分发到进程池，每个 worker 分到 CPU / worker 数个 LightGBM 线程；
+  - 每个饰品的结果写到磁盘缓存（按回测参数分目录），中断后重跑只补算缺失的饰品，
+    K 线有更新（水位线变化）的饰品会重新回测。
+
+用法: python -m models.backtest [名称 ...] [--workers 4] [--step 7] [--retrain-every 4]
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.feature_store import ItemFeatureState
+from models.item_price_predictor import (
+    _KLINE_COLUMNS,
+    _PREDICTION_HORIZON,
+    _build_features,
+    fit_price_model,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backtests")
+
+
+@dataclass(frozen=True)
+class BacktestConfig:
+    min_train_rows: int = 120  # 第一次训练前至少积累的 K 线天数
+    step: int = 7  # 每隔多少天做一次预测
+    retrain_every: int = 4  # 每做多少次预测重训一次，其余沿用上一次的模型
+    horizon: int = _PREDICTION_HORIZON
+    train_window: int = 500  # 每次训练最多使用最近多少天（与线上一致）
+
+    def key(self) -> str:
+        payload = json.dumps(asdict(self), sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+# --- 共享内存中的 K 线 ---
+
+class SharedKlines:
+    """
+    把多个饰品的 K 线按行拼成一个 float64 矩阵放进共享内存，
+    offsets[name] = (起始行, 行数)。worker 通过 attach 映射，不复制。
+    """
+
+    def __init__(self, klines: Dict[str, pd.DataFrame]):
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+        total = sum(len(df) for df in klines.values())
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=max(1, total * len(_KLINE_COLUMNS) * 8)
+        )
+        matrix = np.ndarray((total, len(_KLINE_COLUMNS)), dtype=np.float64, buffer=self._shm.buf)
+        row = 0
+        for name, df in klines.items():
+            matrix[row:row + len(df)] = df[_KLINE_COLUMNS].to_numpy(dtype=np.float64)
+            self.offsets[name] = (row, len(df))
+            row += len(df)
+        self.shape = (total, len(_KLINE_COLUMNS))
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def close(self) -> None:
+        self._shm.close()
+        self._shm.unlink()
+
+
+_worker_shm: Optional[shared_memory.SharedMemory] = None
+_worker_matrix: Optional[np.ndarray] = None
+
+
+def _attach_worker(shm_name: str, shape: Tuple[int, int], lgbm_threads: int) -> None:
+    global _worker_shm, _worker_matrix
+    os.environ.setdefault("LGBM_NUM_THREADS", str(lgbm_threads))
+    # spawn 出的 worker 与创建方共用同一个 resource_tracker，由创建方负责 unlink
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_matrix = np.ndarray(shape, dtype=np.float64, buffer=_worker_shm.buf)
+
+
+def _item_frame(matrix: np.ndarray, start: int, length: int) -> pd.DataFrame:
+    frame = pd.DataFrame(matrix[start:start + length], columns=_KLINE_COLUMNS, copy=False)
+    frame["timestamp"] = frame["timestamp"].astype(np.int64)
+    return frame
+
+
+# --- 单饰品回测 ---
+
+def walk_forward(kline: pd.DataFrame, config: BacktestConfig, num_threads: int = 1) -> Dict:
+    """
+    对单个饰品做滚动回测，返回误差统计和逐次预测记录。
+    训练只看 t 之前的数据（_build_features 会去掉没有 target 的最后 horizon 行），
+    预测用特征存储增量推进到第 t 天的特征行。
+    """
+    kline = kline[kline["price"] > 0].reset_index(drop=True)
+    prices = kline["price"].to_numpy(dtype=np.float64)
+    rows = kline.to_dict("records")
+    state = ItemFeatureState()
+    model = None
+    predictions = []
+    fed = 0
+    trained = 0
+
+    last_t = len(kline) - config.horizon
+    for n, t in enumerate(range(config.min_train_rows, last_t + 1, config.step)):
+        # 特征状态推进到第 t 天（第 t 行是“今天”，索引 t - 1）
+        while fed < t:
+            state.update(rows[fed])
+            fed += 1
+
+        if model is None or n % config.retrain_every == 0:
+            history = _build_features(kline.iloc[max(0, t - config.train_window):t])
+            if len(history) >= 30:
+                booster, feature_cols, _, _ = fit_price_model(history, num_threads)
+                model = (booster, feature_cols)
+                trained += 1
+        if model is None:
+            continue
+
+        booster, feature_cols = model
+        x = state.vector(feature_cols)
+        if x is None:
+            continue
+        predicted = float(booster.predict(x, num_threads=num_threads)[0])
+        current = prices[t - 1]
+        actual = prices[t - 1 + config.horizon]
+        predictions.append({
+            "timestamp": int(rows[t - 1]["timestamp"]),
+            "current": current,
+            "predicted": round(predicted, 4),
+            "actual": actual,
+        })
+
+    return {"trainings": trained, **summarize(predictions), "predictions": predictions}
+
+
+def summarize(predictions: List[Dict]) -> Dict:
+    """MAE / RMSE / MAPE / 方向命中率；没有预测时各项为 None。"""
+    if not predictions:
+        return {"n": 0, "mae": None, "rmse": None, "mape": None, "hit_rate": None}
+    current = np.array([p["current"] for p in predictions])
+    predicted = np.array([p["predicted"] for p in predictions])
+    actual = np.array([p["actual"] for p in predictions])
+    error = predicted - actual
+    hits = np.sign(predicted - current) == np.sign(actual - current)
+    return {
+        "n": len(predictions),
+        "mae": round(float(np.mean(np.abs(error))), 6),
+        "rmse": round(float(np.sqrt(np.mean(error ** 2))), 6),
+        "mape": round(float(np.mean(np.abs(error) / actual)), 6),
+        "hit_rate": round(float(np.mean(hits)), 6),
+    }
+
+
+def _backtest_worker(name: str, start: int, length: int, config: BacktestConfig) -> Tuple[str, Dict]:
+    kline = _item_frame(_worker_matrix, start, length)
+    threads = int(os.environ.get("LGBM_NUM_THREADS", "1"))
+    began = time.perf_counter()
+    result = walk_forward(kline, config, num_threads=threads)
+    result["seconds"] = round(time.perf_counter() - began, 3)
+    return name, result
+
+
+# --- 结果缓存 ---
+
+class ResultCache:
+    """{cache_dir}/{config.key()}/{sha1(name)}.json，按水位线判断是否仍然有效。"""
+
+    def __init__(self, cache_dir: str, config: BacktestConfig):
+        self.dir = os.path.join(cache_dir, config.key())
+        os.makedirs(self.dir, exist_ok=True)
+        with open(os.path.join(self.dir, "config.json"), "w", encoding="utf-8") as f:
+            json.dump(asdict(config), f)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.dir, hashlib.sha1(name.encode("utf-8")).hexdigest()[:20] + ".json")
+
+    def get(self, name: str, watermark: int) -> Optional[Dict]:
+        try:
+            with open(self._path(name), encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.pop("watermark", None) != watermark:
+            return None
+        cached.pop("market_hash_name", None)
+        return cached
+
+    def put(self, name: str, watermark: int, result: Dict) -> None:
+        payload = {"market_hash_name": name, "watermark": watermark, **result}
+        fd, tmp = tempfile.mkstemp(dir=self.dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp, self._path(name))
+
+
+# --- 入口 ---
+
+def run_backtest(
+    klines: Dict[str, pd.DataFrame],
+    config: BacktestConfig = BacktestConfig(),
+    workers: Optional[int] = None,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+) -> Dict:
+    """
+    并行回测多个饰品。已缓存且水位线未变的饰品直接复用结果。
+    返回 {"config", "summary", "items": {name: 统计（不含逐次预测）}, "computed", "cached"}。
+    """
+    cache = ResultCache(cache_dir, config)
+    results: Dict[str, Dict] = {}
+    computed = 0
+    pending: Dict[str, pd.DataFrame] = {}
+    for name, df in klines.items():
+        if df.empty:
+            continue
+        watermark = int(df["timestamp"].max())
+        cached = cache.get(name, watermark)
+        if cached is not None:
+            results[name] = cached
+        else:
+            pending[name] = df
+
+    logger.info(f"回测 {len(klines)} 个饰品: 缓存命中 {len(results)}，待计算 {len(pending)}")
+    if pending:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(pending)))
+        shared = SharedKlines(pending)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_attach_worker,
+                initargs=(shared.name, shared.shape, max(1, (os.cpu_count() or 1) // workers)),
+            ) as executor:
+                futures = [
+                    executor.submit(_backtest_worker, name, start, length, config)
+                    for name, (start, length) in shared.offsets.items()
+                ]
+                for done, future in enumerate(as_completed(futures), 1):
+                    try:
+                        name, result = future.result()
+                    except Exception as e:
+                        logger.error(f"回测任务失败: {e}")
+                        continue
+                    watermark = int(pending[name]["timestamp"].max())
+                    cache.put(name, watermark, result)
+                    results[name] = result
+                    computed += 1
+                    logger.info(
+                        f"  [{done}/{len(futures)}] {name}: n={result['n']} "
+                        f"MAPE={result['mape']} 命中率={result['hit_rate']}"
+                    )
+        finally:
+            shared.close()
+
+    all_predictions = [p for r in results.values() for p in r.get("predictions", [])]
+    return {
+        "config": asdict(config),
+        "summary": {"items": len(results), **summarize(all_predictions)},
+        "items": {
+            name: {k: v for k, v in r.items() if k != "predictions"} for name, r in results.items()
+        },
+        "computed": computed,
+        "cached": len(results) - computed,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from db.prediction_processor import PredictionProcessor
+    from models.item_price_predictor import _fetch_klines_bulk
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="单饰品价格模型滚动回测")
+    parser.add_argument("names", nargs="*", help="饰品名；不传则回测所有追踪/近期查看的饰品")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--min-train-rows", type=int, default=BacktestConfig.min_train_rows)
+    parser.add_argument("--step", type=int, default=BacktestConfig.step)
+    parser.add_argument("--retrain-every", type=int, default=BacktestConfig.retrain_every)
+    parser.add_argument("--history", type=int, default=2000, help="每个饰品最多读取的 K 线天数")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--output", default=None, help="把汇总结果写成 JSON")
+    args = parser.parse_args()
+
+    names = args.names or PredictionProcessor().get_names_to_precompute()
+    config = BacktestConfig(
+        min_train_rows=args.min_train_rows, step=args.step, retrain_every=args.retrain_every
+    )
+    report = run_backtest(
+        _fetch_klines_bulk(names, limit=args.history), config, args.workers, args.cache_dir
+    )
+    print(json.dumps(report["summary"], ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,328 @@
+"""
+benchmark.py — 价格预测模型的离线基准测试
+
+用合成的 item_kline_day / kline_data_day 数据（不连 MySQL）跑一遍
+训练、单次预测、批量预测和大盘训练流水线，记录：
+  - wall_s / cpu_s：墙钟时间与本进程 CPU 时间（含 LightGBM 线程）
+  - peak_rss_mb：用例所在子进程的峰值常驻内存
+  - booster_bytes：模型序列化大小（近似常驻内存）
+每个用例默认在独立的 spawn 子进程中运行，峰值内存互不干扰。
+结果写成 JSON，附带 git commit，可用 --compare 对比两次提交。
+
+用法:
+    python -m models.benchmark [--lengths 120 500] [--items 10 50]
+                               [--output FILE] [--compare BASELINE.json] [--quick]
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+_DAY = 86400
+_START_TS = 1_700_000_000
+
+
+def synthetic_item_kline(days: int, seed: int = 0) -> pd.DataFrame:
+    """item_kline_day 形状的合成 K 线（随机游走价格）。"""
+    rng = np.random.default_rng(seed)
+    price = np.maximum(1.0, 100 + np.cumsum(rng.normal(0, 1, days)))
+    sell_count = rng.integers(50, 150, days).astype(float)
+    return pd.DataFrame(
+        {
+            "timestamp": _START_TS + np.arange(days) * _DAY,
+            "price": price,
+            "buy_price": price * rng.uniform(0.94, 0.99, days),
+            "sell_count": sell_count,
+            "buy_count": rng.integers(20, 80, days).astype(float),
+            "turnover": price * rng.integers(5, 30, days),
+            "volume": rng.integers(5, 30, days).astype(float),
+            "total_count": sell_count + 1000,
+        }
+    )
+
+
+def synthetic_market_kline(days: int, seed: int = 0) -> pd.DataFrame:
+    """kline_data_day 形状的合成大盘 K 线。"""
+    rng = np.random.default_rng(seed)
+    close = 1000 + np.cumsum(rng.normal(0, 5, days))
+    return pd.DataFrame(
+        {
+            "timestamp": _START_TS + np.arange(days) * _DAY,
+            "open_price": close + rng.normal(0, 1, days),
+            "high_price": close + 5,
+            "low_price": close - 5,
+            "close_price": close,
+            "volume": rng.integers(1000, 5000, days).astype(float),
+            "turnover": close * 3000,
+        }
+    )
+
+
+def _item_names(count: int) -> List[str]:
+    return [f"Bench Item {i} (Field-Tested)" for i in range(count)]
+
+
+@contextmanager
+def offline_predictor(klines: Dict[str, pd.DataFrame], registry_dir: str):
+    """
+    把 item_price_predictor 的数据源换成内存中的合成 K 线，
+    并使用独立的注册表目录和空缓存，返回一个 ItemPricePredictor。
+    """
+    import models.item_price_predictor as predictor_module
+    from models.feature_store import FeatureStore
+    from models.model_cache import ModelCache
+    from models.model_registry import ModelRegistry
+
+    def fetch(name, limit=predictor_module._TRAIN_ROWS):
+        return klines[name].tail(limit).reset_index(drop=True)
+
+    def fetch_bulk(names, limit=predictor_module._TRAIN_ROWS):
+        return {name: fetch(name, limit) for name in names}
+
+    def latest(name):
+        return int(klines[name]["timestamp"].max())
+
+    patched = {
+        "_fetch_item_kline": fetch,
+        "_fetch_klines_bulk": fetch_bulk,
+        "_latest_kline_timestamp": latest,
+        "_model_cache": ModelCache(),
+        "_feature_store": FeatureStore(),
+    }
+    saved = {attr: getattr(predictor_module, attr) for attr in patched}
+    for attr, value in patched.items():
+        setattr(predictor_module, attr, value)
+    try:
+        yield predictor_module.ItemPricePredictor(ModelRegistry(registry_dir))
+    finally:
+        for attr, value in saved.items():
+            setattr(predictor_module, attr, value)
+
+
+def _measure(fn: Callable[[], object]) -> Tuple[Dict, object]:
+    """执行 fn，返回 ({wall_s, cpu_s}, fn 的返回值)。"""
+    wall, cpu = time.perf_counter(), time.process_time()
+    value = fn()
+    return {
+        "wall_s": round(time.perf_counter() - wall, 4),
+        "cpu_s": round(time.process_time() - cpu, 4),
+    }, value
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位是 KB，macOS 是字节
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _booster_bytes(entry) -> int:
+    from models.model_cache import estimate_booster_bytes
+
+    return estimate_booster_bytes(entry) if entry is not None else 0
+
+
+# --- 用例（每个都可以在独立子进程中执行） ---
+
+def case_train_for_item(days: int, predict_calls: int = 50) -> Dict:
+    """单饰品训练 + 热模型上的单次预测延迟。"""
+    name = _item_names(1)[0]
+    klines = {name: synthetic_item_kline(days)}
+    with tempfile.TemporaryDirectory() as registry_dir, \
+            offline_predictor(klines, registry_dir) as predictor:
+        train, entry = _measure(lambda: predictor.train_for_item(name))
+        train["booster_bytes"] = _booster_bytes(entry)
+
+        latencies = []
+        cpu = time.process_time()
+        for _ in range(predict_calls):
+            start = time.perf_counter()
+            predictor.predict_7d_price(name)
+            latencies.append(time.perf_counter() - start)
+        latencies_ms = np.array(latencies) * 1000
+        predict = {
+            "calls": predict_calls,
+            "mean_ms": round(float(latencies_ms.mean()), 3),
+            "p95_ms": round(float(np.percentile(latencies_ms, 95)), 3),
+            "cpu_s": round(time.process_time() - cpu, 4),
+        }
+    return {"train": train, "predict_7d_price": predict, "peak_rss_mb": _peak_rss_mb()}
+
+
+def case_batch_predict(items: int, days: int) -> Dict:
+    """批量预测：冷启动（全部需要训练）与热启动（全部命中缓存）。"""
+    names = _item_names(items)
+    klines = {name: synthetic_item_kline(days, seed=i) for i, name in enumerate(names)}
+    with tempfile.TemporaryDirectory() as registry_dir, \
+            offline_predictor(klines, registry_dir) as predictor:
+        cold, predictions = _measure(lambda: predictor.batch_predict_range(names))
+        warm, _ = _measure(lambda: predictor.batch_predict_range(names))
+        import models.item_price_predictor as predictor_module
+
+        sizes = [
+            _booster_bytes(predictor_module._model_cache.get(name)) for name in names
+        ]
+    return {
+        "cold": {**cold, "predicted": sum(1 for r in predictions.values() if r)},
+        "warm": warm,
+        "booster_bytes_total": int(sum(sizes)),
+        "booster_bytes_mean": int(np.mean(sizes)) if sizes else 0,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def case_market_pipeline(days: int) -> Dict:
+    """大盘训练流水线（跳过抓取，数据库读写换成合成数据）。"""
+    import models.train_model as train_module
+
+    frame = synthetic_market_kline(days)
+    saved = {attr: getattr(train_module, attr) for attr in ("load_kline_frame", "save_predictions_to_db")}
+    train_module.load_kline_frame = lambda: frame.copy()
+    train_module.save_predictions_to_db = lambda df: None
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            pipeline = train_module.TrainingPipeline(skip_fetch=True, output_dir=output_dir)
+            result, _ = _measure(pipeline.run)
+    finally:
+        for attr, value in saved.items():
+            setattr(train_module, attr, value)
+    return {**result, "stages": dict(pipeline.timings), "peak_rss_mb": _peak_rss_mb()}
+
+
+def _run_case(fn: Callable, kwargs: Dict, isolate: bool) -> Dict:
+    if not isolate:
+        return fn(**kwargs)
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(fn, **kwargs).result()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(
+    lengths: List[int], item_counts: List[int], market_days: int = 1000, isolate: bool = True
+) -> Dict:
+    import lightgbm
+
+    cases = []
+    for days in lengths:
+        cases.append(("train_for_item", case_train_for_item, {"days": days}))
+    for items in item_counts:
+        cases.append(("batch_predict_range", case_batch_predict, {"items": items, "days": max(lengths)}))
+    if market_days:
+        cases.append(("market_pipeline", case_market_pipeline, {"days": market_days}))
+
+    results = []
+    for name, fn, kwargs in cases:
+        logger.info(f"运行基准用例 {name} {kwargs}")
+        results.append({"case": name, "params": kwargs, **_run_case(fn, kwargs, isolate)})
+
+    return {
+        "commit": _git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "lightgbm": lightgbm.__version__,
+            "cpu_count": os.cpu_count(),
+            "lgbm_num_threads": os.getenv("LGBM_NUM_THREADS"),
+        },
+        "results": results,
+    }
+
+
+def _flatten(prefix: str, value, out: Dict[str, float]) -> None:
+    if isinstance(value, dict):
+        for key, sub in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, sub, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = float(value)
+
+
+def compare(current: Dict, baseline: Dict) -> List[Dict]:
+    """按 (用例, 参数) 对齐两次结果，列出每个数值指标的变化比例。"""
+    def index(report):
+        return {
+            (r["case"], json.dumps(r["params"], sort_keys=True)): r for r in report["results"]
+        }
+
+    rows = []
+    base_index = index(baseline)
+    for key, result in index(current).items():
+        if key not in base_index:
+            continue
+        now, before = {}, {}
+        _flatten("", {k: v for k, v in result.items() if k not in ("case", "params")}, now)
+        _flatten("", {k: v for k, v in base_index[key].items() if k not in ("case", "params")}, before)
+        for metric, value in now.items():
+            if metric in before and before[metric]:
+                rows.append({
+                    "case": key[0],
+                    "params": json.loads(key[1]),
+                    "metric": metric,
+                    "baseline": before[metric],
+                    "current": value,
+                    "ratio": round(value / before[metric], 3),
+                })
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="价格预测模型离线基准测试")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[120, 500], help="单饰品 K 线天数")
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 50], help="批量预测的饰品数")
+    parser.add_argument("--market-days", type=int, default=1000, help="大盘 K 线天数，0 表示跳过")
+    parser.add_argument("--output", default=None, help="结果 JSON 路径")
+    parser.add_argument("--compare", default=None, help="与之前的结果 JSON 对比")
+    parser.add_argument("--quick", action="store_true", help="小规模快速运行")
+    parser.add_argument("--no-isolate", action="store_true", help="所有用例在当前进程运行")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.lengths, args.items, args.market_days = [120], [5], 300
+    report = run_benchmarks(args.lengths, args.items, args.market_days, isolate=not args.no_isolate)
+
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR,
+        f"predictor-{datetime.now():%Y%m%d-%H%M%S}-{report['commit'] or 'nogit'}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report["results"], ensure_ascii=False, indent=2))
+    print(f"结果已保存到: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for row in compare(report, baseline):
+            print(
+                f"{row['case']:<22} {json.dumps(row['params']):<28} {row['metric']:<28} "
+                f"{row['baseline']:>12.4f} -> {row['current']:>12.4f}  x{row['ratio']}"
+            )
@@ -0,0 +1,206 @@
+"""
+feature_store.py — 增量滚动特征存储
+
+_build_features 每次都用 pandas 在整段历史上重算滞后和滑动窗口特征，
+推理时却只需要最新一行。这里为每个饰品保存滚动状态：
+  - 环形缓冲区保存最近 31 天价格 / 30 天成交量，直接取滞后值；
+  - 每个窗口维护 sum 与 sum of squares，新 K 线到来时 O(1) 更新均值和标准差；
+  - 按模型的 feature_cols 顺序输出 NumPy 向量，直接喂给 booster.predict。
+
+特征定义与 item_price_predictor._build_features 保持一致。
+"""
+
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+LAGS = (7, 14, 30)
+WINDOWS = (7, 14, 30)
+RAW_COLUMNS = ("price", "buy_price", "sell_count", "buy_count", "turnover", "volume")
+
+_HISTORY = max(max(LAGS) + 1, max(WINDOWS))
+# 每累计这么多次增量更新，用缓冲区精确重算一次窗口和，抵消浮点误差累积
+_RESYNC_EVERY = 1024
+
+
+class ItemFeatureState:
+    """单个饰品的滚动特征状态。"""
+
+    def __init__(self):
+        self.last_timestamp: Optional[int] = None
+        self.raw: Dict[str, float] = {}
+        # 多留一格：同一天的 K 线被改写时可以撤回最后一行
+        self._prices: deque = deque(maxlen=_HISTORY + 1)
+        self._volumes: deque = deque(maxlen=max(WINDOWS) + 1)
+        self._price_sum = {w: 0.0 for w in WINDOWS}
+        self._price_sq_sum = {w: 0.0 for w in WINDOWS}
+        self._volume_sum = {w: 0.0 for w in WINDOWS}
+        self._updates = 0
+
+    @property
+    def ready(self) -> bool:
+        """最长的滞后和窗口都已填满。"""
+        return len(self._prices) > max(LAGS) and len(self._volumes) >= max(WINDOWS)
+
+    def update(self, row: Dict) -> bool:
+        """
+        追加一行 K 线，O(1) 更新全部窗口。
+        与最新一行同一时间戳时视为当天数据被改写，撤回后重新应用；
+        更早的行或价格无效（<= 0）的行被忽略。返回是否已应用。
+        """
+        timestamp = int(row["timestamp"])
+        price = float(row["price"])
+        if not price > 0:
+            return False
+        if self.last_timestamp is not None:
+            if timestamp < self.last_timestamp:
+                return False
+            if timestamp == self.last_timestamp:
+                if all(self.raw.get(col) == float(row[col]) for col in RAW_COLUMNS):
+                    return False
+                self._prices.pop()
+                self._volumes.pop()
+                self._resync()
+
+        volume = float(row["volume"])
+        for w in WINDOWS:
+            if len(self._prices) >= w:
+                leaving = self._prices[-w]
+                self._price_sum[w] -= leaving
+                self._price_sq_sum[w] -= leaving * leaving
+            if len(self._volumes) >= w:
+                self._volume_sum[w] -= self._volumes[-w]
+            self._price_sum[w] += price
+            self._price_sq_sum[w] += price * price
+            self._volume_sum[w] += volume
+        self._prices.append(price)
+        self._volumes.append(volume)
+
+        self.raw = {col: float(row[col]) for col in RAW_COLUMNS}
+        self.last_timestamp = timestamp
+        self._updates += 1
+        if self._updates % _RESYNC_EVERY == 0:
+            self._resync()
+        return True
+
+    def _resync(self) -> None:
+        prices = list(self._prices)
+        volumes = list(self._volumes)
+        for w in WINDOWS:
+            self._price_sum[w] = float(np.sum(prices[-w:]))
+            self._price_sq_sum[w] = float(np.sum(np.square(prices[-w:])))
+            self._volume_sum[w] = float(np.sum(volumes[-w:]))
+
+    def features(self) -> Optional[Dict[str, float]]:
+        """最新一行的全部特征；窗口未填满时返回 None。"""
+        if not self.ready:
+            return None
+
+        raw = self.raw
+        date = datetime.fromtimestamp(self.last_timestamp, tz=timezone.utc)
+        feats = dict(raw)
+        feats["day_of_week"] = float(date.weekday())
+        feats["month"] = float(date.month)
+        for lag in LAGS:
+            feats[f"close_lag_{lag}"] = self._prices[-1 - lag]
+        for w in WINDOWS:
+            mean = self._price_sum[w] / w
+            # 样本标准差（ddof=1），与 pandas rolling().std() 一致
+            var = max(self._price_sq_sum[w] - self._price_sum[w] * mean, 0.0) / (w - 1)
+            feats[f"close_rolling_mean_{w}"] = mean
+            feats[f"close_rolling_std_{w}"] = float(np.sqrt(var))
+            feats[f"volume_rolling_mean_{w}"] = self._volume_sum[w] / w
+
+        feats["spread"] = raw["price"] - raw["buy_price"]
+        feats["spread_ratio"] = feats["spread"] / raw["price"]
+        feats["supply_demand_ratio"] = (
+            raw["sell_count"] / raw["buy_count"] if raw["buy_count"] else np.nan
+        )
+        return feats
+
+    def vector(self, feature_cols: List[str]) -> Optional[np.ndarray]:
+        """按 feature_cols 顺序输出 shape 为 (1, n) 的 float64 数组。"""
+        feats = self.features()
+        if feats is None or any(col not in feats for col in feature_cols):
+            return None
+        return np.array([[feats[col] for col in feature_cols]], dtype=np.float64)
+
+
+class FeatureStore:
+    """
+    进程内的多饰品特征状态表（LRU，超过 max_items 时淘汰最久未用的饰品）。
+    sync 只追加水位之后的新 K 线；首次见到的饰品从最近一段历史冷启动。
+    """
+
+    def __init__(self, max_items: int = 4096):
+        self.max_items = max(1, max_items)
+        self._states: "OrderedDict[str, ItemFeatureState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"warm_starts": 0, "rows_applied": 0, "evictions": 0}
+
+    def get(self, market_hash_name: str) -> Optional[ItemFeatureState]:
+        with self._lock:
+            state = self._states.get(market_hash_name)
+            if state is not None:
+                self._states.move_to_end(market_hash_name)
+            return state
+
+    def update(self, market_hash_name: str, row: Dict) -> bool:
+        """追加单行 K 线（例如刚抓取到的当天数据）。"""
+        with self._lock:
+            state = self._state_for(market_hash_name)
+            applied = state.update(row)
+            self._counters["rows_applied"] += int(applied)
+            return applied
+
+    def sync(self, market_hash_name: str, kline: pd.DataFrame) -> ItemFeatureState:
+        """用一段按时间升序的 K 线推进饰品状态，返回更新后的状态。"""
+        with self._lock:
+            state = self._state_for(market_hash_name)
+            if kline.empty:
+                return state
+            if state.last_timestamp is None:
+                # 冷启动只需要最近一段（多取一些以跳过无效价格行）
+                kline = kline.tail(_HISTORY * 2)
+                self._counters["warm_starts"] += 1
+            else:
+                kline = kline[kline["timestamp"] >= state.last_timestamp]
+            for row in kline.to_dict("records"):
+                self._counters["rows_applied"] += int(state.update(row))
+            return state
+
+    def latest_vector(
+        self, market_hash_name: str, kline: pd.DataFrame, feature_cols: List[str]
+    ) -> Optional[np.ndarray]:
+        return self.sync(market_hash_name, kline).vector(feature_cols)
+
+    def pop(self, market_hash_name: str) -> None:
+        with self._lock:
+            self._states.pop(market_hash_name, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._states)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"items": len(self._states), "max_items": self.max_items, **self._counters}
+
+    def _state_for(self, market_hash_name: str) -> ItemFeatureState:
+        state = self._states.get(market_hash_name)
+        if state is None:
+            state = self._states[market_hash_name] = ItemFeatureState()
+            while len(self._states) > self.max_items:
+                self._states.popitem(last=False)
+                self._counters["evictions"] += 1
+        else:
+            self._states.move_to_end(market_hash_name)
+        return state
@@ -0,0 +1,358 @@
+"""
+global_price_model.py — 跨饰品的全局 LightGBM 价格模型
+
+单饰品模型要为每个 market_hash_name 各训练一次，且至少需要 30 天数据，
+新上架的饰品无法预测。全局模型把所有饰品的特征行合在一起训练一次：
+  - 价格特征全部做成相对量（收益率、均线/现价、波动率/现价、对数价格），
+    不同价位的饰品可以共用一棵树；
+  - 滞后和滑动窗口允许缺失（LightGBM 原生处理 NaN），只有几天数据的饰品也能预测；
+  - 饰品属性：从 cs2_items 关联 skin_entities 取 weapon_type / rarity，
+    并从 market_hash_name 解析武器、磨损、StatTrak™/纪念品/★ 和大类，作为类别特征；
+  - 目标是 7 天后的对数收益率，预测价 = 现价 × exp(预测值)。
+模型以 GLOBAL_MODEL_KEY 存在同一个注册表里，类别词表写在 params["vocab"]；
+一次 booster.predict 覆盖任意多个饰品。
+
+用法: python -m models.global_price_model [--chunk-size 200] [--history 500]
+"""
+
+import logging
+import math
+import re
+from typing import Dict, List, Optional
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from models.item_price_predictor import (
+    _PREDICTION_HORIZON,
+    _TRAIN_ROWS,
+    _fetch_klines_bulk,
+    _get_db_connection,
+    lgbm_thread_budget,
+)
+from models.model_registry import ModelRegistry, RegisteredModel
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_MODEL_KEY = "__global__"
+
+_EXTERIORS = ("Factory New", "Minimal Wear", "Field-Tested", "Well-Worn", "Battle-Scarred")
+_NAMED_CATEGORIES = {
+    "Sticker": "sticker",
+    "Patch": "patch",
+    "Graffiti": "graffiti",
+    "Sealed Graffiti": "graffiti",
+    "Music Kit": "music_kit",
+    "Charm": "charm",
+}
+_CATEGORICAL_COLS = ["category", "weapon", "weapon_type", "rarity", "exterior"]
+_LAGS = (7, 14, 30)
+_WINDOWS = (7, 14, 30)
+
+
+def parse_item_name(market_hash_name: str) -> Dict:
+    """从 market_hash_name 解析武器、磨损和大类，例如 'StatTrak™ AK-47 | Redline (Field-Tested)'。"""
+    name = market_hash_name.strip()
+    star = name.startswith("★")
+    base = name.lstrip("★ ").strip()
+    stattrak = "StatTrak™" in base
+    souvenir = base.startswith("Souvenir ")
+    base = base.replace("StatTrak™ ", "").replace("Souvenir ", "", 1)
+
+    exterior = None
+    match = re.search(r"\(([^()]+)\)\s*$", base)
+    if match and match.group(1) in _EXTERIORS:
+        exterior = match.group(1)
+        base = base[:match.start()].strip()
+
+    weapon = base.split(" | ")[0].strip() if " | " in base else None
+    if weapon in _NAMED_CATEGORIES:
+        category = _NAMED_CATEGORIES[weapon]
+    elif star and weapon and ("Gloves" in weapon or "Wraps" in weapon):
+        category = "glove"
+    elif star:
+        category = "knife"
+    elif weapon and exterior:
+        category = "weapon"
+    elif re.search(r"\b(Case|Capsule|Package|Box)\b", base):
+        category = "container"
+    elif weapon:
+        category = "agent"
+    else:
+        category = "other"
+
+    return {
+        "category": category,
+        "weapon": weapon,
+        "exterior": exterior,
+        "is_stattrak": float(stattrak),
+        "is_souvenir": float(souvenir),
+        "is_star": float(star),
+    }
+
+
+def load_item_attributes(market_hash_names: List[str]) -> Dict[str, Dict]:
+    """
+    饰品属性：名称解析 + cs2_items LEFT JOIN skin_entities 的 weapon_type / rarity。
+    数据库不可用或饰品未入库时只返回名称解析的结果。
+    """
+    names = list(dict.fromkeys(market_hash_names))
+    attributes = {
+        name: {**parse_item_name(name), "weapon_type": None, "rarity": None, "in_catalog": 0.0}
+        for name in names
+    }
+    if not names:
+        return attributes
+    conn = None
+    try:
+        conn = _get_db_connection()
+        with conn.cursor() as cursor:
+            for start in range(0, len(names), 1000):
+                chunk = names[start:start + 1000]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(
+                    "SELECT c.market_hash_name, s.weapon_type, s.rarity "
+                    "FROM cs2_items c "
+                    "LEFT JOIN skin_entities s "
+                    "ON s.market_hash_name = c.market_hash_name COLLATE utf8mb4_unicode_ci "
+                    f"WHERE c.market_hash_name IN ({placeholders})",
+                    tuple(chunk),
+                )
+                for name, weapon_type, rarity in cursor.fetchall():
+                    if name in attributes:
+                        attributes[name].update(
+                            weapon_type=weapon_type, rarity=rarity, in_catalog=1.0
+                        )
+    except Exception as e:
+        logger.error(f"读取饰品属性失败，仅使用名称解析特征: {e}")
+    finally:
+        if conn:
+            conn.close()
+    return attributes
+
+
+def build_global_features(kline: pd.DataFrame, attributes: Dict) -> pd.DataFrame:
+    """
+    单个饰品的全局模型特征（每行一天，按时间升序）。
+    target 为 7 天后的对数收益率，最后 7 行为 NaN；其余特征允许缺失。
+    类别列保留原始字符串，编码在 GlobalPriceModel 中按词表完成。
+    """
+    if kline.empty:
+        return pd.DataFrame()
+
+    df = kline.sort_values("timestamp")
+    df = df[df["price"] > 0].reset_index(drop=True)
+    if df.empty:
+        return pd.DataFrame()
+
+    price = df["price"].astype(float)
+    volume = df["volume"].astype(float)
+    date = pd.to_datetime(df["timestamp"], unit="s")
+    feats = pd.DataFrame({"timestamp": df["timestamp"].astype(np.int64)})
+    feats["target"] = np.log(price.shift(-_PREDICTION_HORIZON) / price)
+
+    feats["log_price"] = np.log(price)
+    feats["history_days"] = np.arange(1, len(df) + 1, dtype=float)
+    feats["day_of_week"] = date.dt.dayofweek.astype(float)
+    feats["month"] = date.dt.month.astype(float)
+    for lag in _LAGS:
+        feats[f"return_{lag}"] = price / price.shift(lag) - 1
+    for window in _WINDOWS:
+        feats[f"mean_ratio_{window}"] = price.rolling(window, min_periods=1).mean() / price - 1
+        feats[f"std_ratio_{window}"] = price.rolling(window, min_periods=2).std() / price
+        feats[f"log_volume_mean_{window}"] = np.log1p(volume.rolling(window, min_periods=1).mean())
+    feats["spread_ratio"] = (price - df["buy_price"].astype(float)) / price
+    feats["supply_demand_ratio"] = df["sell_count"] / df["buy_count"].replace(0, np.nan)
+    feats["log_sell_count"] = np.log1p(df["sell_count"].astype(float))
+    feats["log_buy_count"] = np.log1p(df["buy_count"].astype(float))
+
+    for col in ("is_stattrak", "is_souvenir", "is_star", "in_catalog"):
+        feats[col] = float(attributes.get(col) or 0.0)
+    for col in _CATEGORICAL_COLS:
+        feats[col] = attributes.get(col)
+    return feats
+
+
+class GlobalPriceModel:
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        self.registry = registry or ModelRegistry()
+        self._entry: Optional[RegisteredModel] = None
+
+    # --- 编码 ---
+
+    @staticmethod
+    def _encode(feats: pd.DataFrame, vocab: Dict[str, List[str]]) -> pd.DataFrame:
+        """类别列按训练时的词表编码为整数，未见过的取值为 NaN（LightGBM 视为缺失）。"""
+        feats = feats.copy()
+        for col in _CATEGORICAL_COLS:
+            index = {value: float(i) for i, value in enumerate(vocab.get(col, []))}
+            feats[col] = feats[col].map(index).astype(float)
+        return feats
+
+    # --- 训练 ---
+
+    def train(
+        self,
+        klines: Dict[str, pd.DataFrame],
+        attributes: Optional[Dict[str, Dict]] = None,
+        num_threads: Optional[int] = None,
+    ) -> Optional[RegisteredModel]:
+        """用全部饰品的特征行训练一个模型，写入注册表。"""
+        attributes = attributes if attributes is not None else load_item_attributes(list(klines))
+        frames = []
+        for name, kline in klines.items():
+            feats = build_global_features(kline, attributes.get(name) or parse_item_name(name))
+            if not feats.empty:
+                frames.append(feats)
+        if not frames:
+            logger.warning("没有可用于训练全局模型的 K 线数据")
+            return None
+
+        data = pd.concat(frames, ignore_index=True)
+        data = data[data["target"].notna()]
+        if len(data) < 100:
+            logger.warning(f"全局模型训练数据不足: {len(data)} 行")
+            return None
+
+        vocab = {
+            col: sorted(str(v) for v in data[col].dropna().unique()) for col in _CATEGORICAL_COLS
+        }
+        data = self._encode(data, vocab)
+        feature_cols = [col for col in data.columns if col not in ("timestamp", "target")]
+
+        # 按时间切分：全体饰品最近 20% 的日期作为验证集
+        cutoff = data["timestamp"].quantile(0.8)
+        train_mask = data["timestamp"] <= cutoff
+        X_train, y_train = data.loc[train_mask, feature_cols], data.loc[train_mask, "target"]
+        X_val, y_val = data.loc[~train_mask, feature_cols], data.loc[~train_mask, "target"]
+
+        lgb_params = {
+            "objective": "regression_l1",
+            "metric": "l1",
+            "n_estimators": 1000,
+            "learning_rate": 0.05,
+            "num_leaves": 63,
+            "min_child_samples": 50,
+            "feature_fraction": 0.8,
+            "bagging_fraction": 0.8,
+            "bagging_freq": 1,
+            "verbose": -1,
+            "n_jobs": num_threads or lgbm_thread_budget(),
+            "seed": 42,
+        }
+        model = lgb.LGBMRegressor(**lgb_params)
+        if len(X_val) >= 50:
+            model.fit(
+                X_train,
+                y_train,
+                eval_set=[(X_val, y_val)],
+                categorical_feature=_CATEGORICAL_COLS,
+                callbacks=[lgb.early_stopping(50, verbose=False)],
+            )
+            y_pred = model.predict(X_val)
+            mae = float(np.mean(np.abs(y_val - y_pred)))
+            hit = float(np.mean(np.sign(y_pred) == np.sign(y_val)))
+        else:
+            model.fit(data[feature_cols], data["target"], categorical_feature=_CATEGORICAL_COLS)
+            mae = hit = float("nan")
+
+        metrics = {
+            "val_log_return_mae": None if math.isnan(mae) else round(mae, 6),
+            "val_direction_hit_rate": None if math.isnan(hit) else round(hit, 6),
+            "train_rows": int(len(data)),
+            "items": len(frames),
+        }
+        logger.info(f"全局模型训练完成: {len(frames)} 个饰品 / {len(data)} 行, 验证集 {metrics}")
+        self._entry = self.registry.save(
+            GLOBAL_MODEL_KEY,
+            model.booster_,
+            feature_cols,
+            watermark=int(data["timestamp"].max()),
+            metrics=metrics,
+            params={**lgb_params, "vocab": vocab},
+        )
+        return self._entry
+
+    # --- 预测 ---
+
+    def get_entry(self) -> Optional[RegisteredModel]:
+        """注册表中的全局模型，其他进程重训后按版本号重新加载。"""
+        version = self.registry.version_of(GLOBAL_MODEL_KEY)
+        if version is None:
+            return None
+        if self._entry is None or self._entry.version != version:
+            self._entry = self.registry.load(GLOBAL_MODEL_KEY)
+        return self._entry
+
+    @staticmethod
+    def _latest_rows(klines: Dict[str, pd.DataFrame], attributes: Dict[str, Dict]):
+        """
+        每个饰品最新一行特征和现价。
+        特征在完整的已加载历史上构造（与训练时一致），不能只取最近 31 天：
+        history_days 等依赖全部历史的特征会被截断，老饰品会被当成新上架的饰品。
+        """
+        rows, current_prices = [], []
+        for name, kline in klines.items():
+            feats = build_global_features(kline, attributes.get(name) or parse_item_name(name))
+            if feats.empty:
+                continue
+            rows.append((name, feats.iloc[[-1]]))
+            current_prices.append(float(np.exp(feats["log_price"].iloc[-1])))
+        return rows, current_prices
+
+    def predict(
+        self,
+        klines: Dict[str, pd.DataFrame],
+        attributes: Optional[Dict[str, Dict]] = None,
+    ) -> Dict[str, Optional[float]]:
+        """一次 booster.predict 预测所有饰品 7 天后的价格，无数据的饰品为 None。"""
+        results: Dict[str, Optional[float]] = {name: None for name in klines}
+        entry = self.get_entry()
+        if entry is None:
+            return results
+        attributes = attributes if attributes is not None else load_item_attributes(list(klines))
+
+        rows, current_prices = self._latest_rows(klines, attributes)
+        if not rows:
+            return results
+
+        latest = self._encode(pd.concat([row for _, row in rows]), entry.params.get("vocab", {}))
+        X = latest[entry.feature_cols].to_numpy(dtype=np.float64)
+        log_returns = entry.booster.predict(X)
+        for (name, _), price, log_return in zip(rows, current_prices, log_returns):
+            results[name] = round(price * float(np.exp(log_return)), 2)
+        return results
+
+
+def train_global_model(chunk_size: int = 200, history: int = _TRAIN_ROWS) -> Optional[RegisteredModel]:
+    """读取 item_kline_day 中所有饰品的 K 线，训练并注册全局模型。"""
+    conn = None
+    try:
+        conn = _get_db_connection()
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT DISTINCT market_hash_name FROM item_kline_day")
+            names = [row[0] for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"读取饰品列表失败: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+    klines: Dict[str, pd.DataFrame] = {}
+    for start in range(0, len(names), chunk_size):
+        klines.update(_fetch_klines_bulk(names[start:start + chunk_size], limit=history))
+    logger.info(f"已加载 {len(klines)} 个饰品的 K 线，开始训练全局模型")
+    return GlobalPriceModel().train(klines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="训练跨饰品全局价格模型")
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--history", type=int, default=_TRAIN_ROWS)
+    args = parser.parse_args()
+    train_global_model(chunk_size=args.chunk_size, history=args.history)
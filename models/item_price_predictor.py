@@ -3,12 +3,16 @@ item_price_predictor.py — 单饰品 LGBM 7 天价格预测
 
 复用 models/train_model.py 的特征工程模式，基于 item_kline_day 表数据
 训练单饰品 LightGBM 模型，预测 7 天后的卖出价。
+训练好的模型保存在 models/model_registry.py 的磁盘注册表中，
+重启或新 worker 直接加载，只有水位线之后出现新 K 线时才重训。
 """
 
 import logging
 import os
 import math
-from typing import Optional, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, Dict, List, Tuple
 
 import numpy as np
 import pandas as pd
@@ -16,14 +20,42 @@ import lightgbm as lgb
 import pymysql
 from dotenv import load_dotenv
 
+from models.feature_store import FeatureStore
+from models.model_cache import ModelCache
+from models.model_registry import ModelRegistry, RegisteredModel
+
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
 _PREDICTION_HORIZON = 7  # 预测 7 天后价格
+_TRAIN_ROWS = 500  # 训练使用最近 500 天
+_KLINE_COLUMNS = [
+    "timestamp", "price", "buy_price", "sell_count",
+    "buy_count", "turnover", "volume", "total_count",
+]
+
+# per_item：缺模型时按需训练单饰品模型（旧行为）
+# hybrid：历史足够的饰品用单饰品模型（缺失或过期时照常重训），
+#         新上架/历史不足 min_data_points 天、或单饰品模型训练失败的饰品用全局模型
+# global：只用全局模型
+PRICE_MODEL_MODE = os.getenv("PRICE_MODEL_MODE", "hybrid")
+
+# 进程内缓存（LRU + 内存预算 + TTL），未命中时从注册表加载
+_model_cache = ModelCache()
+# 推理用的增量特征状态，只追加新 K 线，不再每次重建 DataFrame
+_feature_store = FeatureStore()
 
-# 内存缓存：{market_hash_name: (model, train_columns, last_trained_at)}
-_model_cache: Dict[str, Tuple] = {}
+
+def lgbm_thread_budget() -> int:
+    """
+    本进程可用于 LightGBM 的线程总数。
+    预测进程池会按 worker 数切分 CPU 并写入 LGBM_NUM_THREADS，避免多个 n_jobs=-1 互相争抢。
+    """
+    configured = os.getenv("LGBM_NUM_THREADS")
+    if configured:
+        return max(1, int(configured))
+    return os.cpu_count() or 1
 
 
 def _get_db_connection():
@@ -37,17 +69,19 @@ def _get_db_connection():
     )
 
 
-def _fetch_item_kline(market_hash_name: str, limit: int = 500) -> pd.DataFrame:
-    """从 item_kline_day 表读取饰品 K 线数据。"""
+def _fetch_item_kline(market_hash_name: str, limit: int = _TRAIN_ROWS) -> pd.DataFrame:
+    """从 item_kline_day 表读取饰品最近 limit 条 K 线数据（按时间升序）。"""
     conn = None
     try:
         conn = _get_db_connection()
         sql = (
+            "SELECT * FROM ("
             "SELECT timestamp, price, buy_price, sell_count, buy_count, "
             "turnover, volume, total_count "
             "FROM item_kline_day "
             "WHERE market_hash_name = %s "
-            "ORDER BY timestamp ASC LIMIT %s"
+            "ORDER BY timestamp DESC LIMIT %s"
+            ") recent ORDER BY timestamp ASC"
         )
         df = pd.read_sql(sql, conn, params=(market_hash_name, limit))
         return df
@@ -59,6 +93,61 @@ def _fetch_item_kline(market_hash_name: str, limit: int = 500) -> pd.DataFrame:
             conn.close()
 
 
+def _fetch_klines_bulk(
+    market_hash_names: List[str], limit: int = _TRAIN_ROWS
+) -> Dict[str, pd.DataFrame]:
+    """
+    一次 IN 查询读取多个饰品的 K 线，按饰品分组，每组保留最近 limit 条（按时间升序）。
+    没有数据的饰品对应空 DataFrame。
+    """
+    names = list(dict.fromkeys(market_hash_names))
+    frames = {name: pd.DataFrame(columns=_KLINE_COLUMNS) for name in names}
+    if not names:
+        return frames
+    conn = None
+    try:
+        conn = _get_db_connection()
+        placeholders = ", ".join(["%s"] * len(names))
+        sql = (
+            "SELECT market_hash_name, " + ", ".join(_KLINE_COLUMNS) + " "
+            "FROM item_kline_day "
+            f"WHERE market_hash_name IN ({placeholders}) "
+            "ORDER BY market_hash_name, timestamp ASC"
+        )
+        df = pd.read_sql(sql, conn, params=tuple(names))
+    except Exception as e:
+        logger.error(f"批量读取 {len(names)} 个饰品K线数据失败: {e}")
+        return frames
+    finally:
+        if conn:
+            conn.close()
+
+    for name, group in df.groupby("market_hash_name", sort=False):
+        if name in frames:
+            frames[name] = group.drop(columns="market_hash_name").tail(limit).reset_index(drop=True)
+    return frames
+
+
+def _latest_kline_timestamp(market_hash_name: str) -> Optional[int]:
+    """饰品最新一条 K 线的 timestamp，用于和模型水位线比较。"""
+    conn = None
+    try:
+        conn = _get_db_connection()
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT MAX(timestamp) FROM item_kline_day WHERE market_hash_name = %s",
+                (market_hash_name,),
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row and row[0] is not None else None
+    except Exception as e:
+        logger.error(f"读取 {market_hash_name} 最新K线时间失败: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+
 def _build_features(df: pd.DataFrame) -> pd.DataFrame:
     """
     特征工程（与 models/train_model.py 保持一致的模式）。
@@ -104,15 +193,127 @@ def _build_features(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def feature_columns(df: pd.DataFrame) -> List[str]:
+    """_build_features 结果中参与训练的数值特征列。"""
+    return [
+        col
+        for col in df.columns
+        if col not in ("timestamp", "target", "total_count")
+        and df[col].dtype in (np.float64, np.int64, float, int)
+    ]
+
+
+def fit_price_model(
+    df: pd.DataFrame, num_threads: Optional[int] = None, params: Optional[Dict] = None
+) -> Tuple[lgb.Booster, List[str], Dict, Dict]:
+    """
+    在已构造特征的数据上训练 7 天价格模型（不写注册表），
+    返回 (booster, feature_cols, metrics, params)。回测等离线场景直接复用。
+    params 覆盖默认超参（例如 models/tuning.py 搜索得到的参数）。
+    """
+    feature_cols = feature_columns(df)
+
+    X = df[feature_cols]
+    y = df["target"]
+
+    # 时间序列划分：后 20% 为验证集
+    train_size = int(len(X) * 0.8)
+    X_train, X_val = X[:train_size], X[train_size:]
+    y_train, y_val = y[:train_size], y[train_size:]
+
+    lgb_params = {
+        "objective": "regression_l1",
+        "metric": "rmse",
+        "n_estimators": 500,
+        "learning_rate": 0.05,
+        "feature_fraction": 0.8,
+        "bagging_fraction": 0.8,
+        "bagging_freq": 1,
+        "verbose": -1,
+        "n_jobs": num_threads or lgbm_thread_budget(),
+        "seed": 42,
+        **(params or {}),
+    }
+
+    model = lgb.LGBMRegressor(**lgb_params)
+
+    if len(X_val) >= 5:
+        model.fit(
+            X_train,
+            y_train,
+            eval_set=[(X_val, y_val)],
+            callbacks=[lgb.early_stopping(50, verbose=False)],
+        )
+        # 微调：用验证集继续训练，需要提供 eval_set
+        model.fit(
+            X_val,
+            y_val,
+            init_model=model,
+            eval_set=[(X_val, y_val)],
+            callbacks=[lgb.early_stopping(10, verbose=False)],
+        )
+    else:
+        model.fit(X, y)
+
+    y_pred_val = model.predict(X_val)
+    corr = float(np.corrcoef(y_val, y_pred_val)[0, 1]) if len(X_val) >= 2 else float("nan")
+    rmse = float(np.sqrt(np.mean((y_val - y_pred_val) ** 2))) if len(X_val) else float("nan")
+    metrics = {
+        "val_corr": None if math.isnan(corr) else round(corr, 6),
+        "val_rmse": None if math.isnan(rmse) else round(rmse, 6),
+        "train_rows": len(X),
+    }
+    return model.booster_, feature_cols, metrics, lgb_params
+
+
+def model_version(entry: RegisteredModel) -> str:
+    """模型版本号：训练完成时间（本地时间，精确到秒）。"""
+    return datetime.fromtimestamp(entry.trained_at).strftime("%Y%m%d%H%M%S")
+
+
 class ItemPricePredictor:
-    def __init__(self):
+    def __init__(self, registry: Optional[ModelRegistry] = None, mode: Optional[str] = None):
         self.min_data_points = 30  # 最少需要 30 天数据才能训练
+        self.registry = registry or ModelRegistry()
+        self.mode = mode or PRICE_MODEL_MODE
+        self._global = None
+
+    def _global_model(self):
+        """已训练的全局模型（models/global_price_model.py）；per_item 模式或尚未训练时返回 None。"""
+        if self.mode == "per_item":
+            return None
+        if self._global is None:
+            from models.global_price_model import GlobalPriceModel
+
+            self._global = GlobalPriceModel(self.registry)
+        return self._global if self._global.get_entry() is not None else None
+
+    def _global_ranges(
+        self, market_hash_names: List[str], klines: Dict[str, pd.DataFrame]
+    ) -> Optional[Dict[str, Optional[Dict]]]:
+        """用全局模型一次预测多个饰品的价格区间；没有全局模型时返回 None。"""
+        global_model = self._global_model()
+        if global_model is None:
+            return None
+        entry = global_model.get_entry()
+        predicted = global_model.predict({name: klines[name] for name in market_hash_names})
+        return {
+            name: (self._price_range(value, klines[name], entry) if value is not None else None)
+            for name, value in predicted.items()
+        }
 
-    def train_for_item(self, market_hash_name: str) -> Optional[lgb.LGBMRegressor]:
+    def train_for_item(
+        self,
+        market_hash_name: str,
+        num_threads: Optional[int] = None,
+        kline: Optional[pd.DataFrame] = None,
+    ) -> Optional[RegisteredModel]:
         """
-        为单个饰品训练 LGBM 模型，返回训练好的模型。
+        为单个饰品训练 LGBM 模型，写入注册表并返回。
+        num_threads 为本次训练使用的线程数，默认占满本进程的线程预算；
+        kline 为已加载的 K 线（批量场景），不传则单独查询。
         """
-        df = _fetch_item_kline(market_hash_name)
+        df = _fetch_item_kline(market_hash_name) if kline is None else kline.tail(_TRAIN_ROWS)
         if len(df) < self.min_data_points:
             logger.warning(
                 f"饰品 {market_hash_name} 仅有 {len(df)} 条数据，"
@@ -120,97 +321,89 @@ class ItemPricePredictor:
             )
             return None
 
+        watermark = int(df["timestamp"].max())
         df = _build_features(df)
         if len(df) < 30:
             logger.warning(f"饰品 {market_hash_name} 特征工程后数据不足: {len(df)}")
             return None
 
-        feature_cols = [
-            col
-            for col in df.columns
-            if col not in ("timestamp", "target", "total_count")
-            and df[col].dtype in (np.float64, np.int64, float, int)
-        ]
-
-        X = df[feature_cols]
-        y = df["target"]
-
-        # 时间序列划分：后 20% 为验证集
-        train_size = int(len(X) * 0.8)
-        X_train, X_val = X[:train_size], X[train_size:]
-        y_train, y_val = y[:train_size], y[train_size:]
-
-        lgb_params = {
-            "objective": "regression_l1",
-            "metric": "rmse",
-            "n_estimators": 500,
-            "learning_rate": 0.05,
-            "feature_fraction": 0.8,
-            "bagging_fraction": 0.8,
-            "bagging_freq": 1,
-            "verbose": -1,
-            "n_jobs": -1,
-            "seed": 42,
-        }
+        booster, feature_cols, metrics, lgb_params = fit_price_model(
+            df, num_threads, self.registry.tuned_params(market_hash_name)
+        )
+        corr = metrics["val_corr"] if metrics["val_corr"] is not None else float("nan")
+        logger.info(f"饰品 {market_hash_name} 模型训练完成, 验证集 ρ={corr:.4f}, 特征数={len(feature_cols)}")
 
-        model = lgb.LGBMRegressor(**lgb_params)
+        # 写入注册表并更新进程内缓存
+        entry = self.registry.save(
+            market_hash_name,
+            booster,
+            feature_cols,
+            watermark=watermark,
+            metrics=metrics,
+            params=lgb_params,
+        )
+        _model_cache.put(market_hash_name, entry)
+        return entry
 
-        if len(X_val) >= 5:
-            model.fit(
-                X_train,
-                y_train,
-                eval_set=[(X_val, y_val)],
-                callbacks=[lgb.early_stopping(50, verbose=False)],
-            )
-            # 微调：用验证集继续训练，需要提供 eval_set
-            model.fit(
-                X_val,
-                y_val,
-                init_model=model,
-                eval_set=[(X_val, y_val)],
-                callbacks=[lgb.early_stopping(10, verbose=False)],
+    def get_model(
+        self, market_hash_name: str, kline: Optional[pd.DataFrame] = None
+    ) -> Optional[RegisteredModel]:
+        """
+        取可用模型：进程内缓存 → 磁盘注册表 → 重新训练。
+        其他 worker 更新过注册表时重新加载；水位线之后有新 K 线，
+        或模型训练时间超过 TTL 时重训。
+        """
+        entry = self._usable_model(market_hash_name, kline)
+        if entry is not None:
+            return entry
+        return self.train_for_item(market_hash_name, kline=kline)
+
+    def _usable_model(
+        self, market_hash_name: str, kline: Optional[pd.DataFrame] = None
+    ) -> Optional[RegisteredModel]:
+        """缓存或注册表中仍然有效的模型；需要（重新）训练时返回 None。"""
+        entry = _model_cache.get(market_hash_name)
+        disk_version = self.registry.version_of(market_hash_name)
+        if entry is None or (disk_version is not None and disk_version != entry.version):
+            entry = self.registry.load(market_hash_name) if disk_version is not None else None
+            if entry is not None and not _model_cache.is_expired(entry):
+                _model_cache.put(market_hash_name, entry)
+
+        if (
+            entry is not None
+            and not _model_cache.is_expired(entry)
+            and not entry.is_outdated(
+                _latest_kline_timestamp(market_hash_name)
+                if kline is None
+                else (int(kline["timestamp"].max()) if not kline.empty else None)
             )
-        else:
-            model.fit(X, y)
-
-        # 缓存模型
-        _model_cache[market_hash_name] = (model, feature_cols)
+        ):
+            return entry
+        return None
 
-        y_pred_val = model.predict(X_val)
-        corr = np.corrcoef(y_val, y_pred_val)[0, 1]
-        logger.info(f"饰品 {market_hash_name} 模型训练完成, 验证集 ρ={corr:.4f}, 特征数={len(feature_cols)}")
-
-        return model
-
-    def predict_7d_price(self, market_hash_name: str) -> Optional[float]:
+    def predict_7d_price(
+        self, market_hash_name: str, kline: Optional[pd.DataFrame] = None
+    ) -> Optional[float]:
         """
         预测饰品 7 天后的价格。
-        先尝试从缓存获取模型，缓存不存在则训练。
+        模型优先从缓存/注册表获取，不存在或已过期时训练。
         """
-        model, feature_cols = _model_cache.get(market_hash_name, (None, None))
-        if model is None:
-            model = self.train_for_item(market_hash_name)
-            if model is None:
-                return None
-            _, feature_cols = _model_cache.get(market_hash_name, (None, None))
-
-        # 取最新一行数据构造特征
-        df = _fetch_item_kline(market_hash_name, limit=100)
-        if df.empty:
-            return None
-
-        df_feat = _build_features(df)
-        if df_feat.empty:
-            return None
-
-        last_row = df_feat.iloc[[-1]]
-        available_features = [f for f in feature_cols if f in last_row.columns]
-        if not available_features:
+        if kline is None:
+            kline = _fetch_item_kline(market_hash_name)
+        result = self._predict_range(market_hash_name, kline)
+        return result["predicted"] if result else None
+
+    @staticmethod
+    def _latest_feature_row(
+        market_hash_name: str, kline: pd.DataFrame, entry: RegisteredModel
+    ) -> Optional[np.ndarray]:
+        """
+        最新一根 K 线的特征向量，列顺序与训练时一致。
+        由特征存储增量维护，只处理上次之后的新 K 线。
+        """
+        if kline.empty:
             return None
-
-        X_pred = last_row[available_features]
-        predicted = model.predict(X_pred)[0]
-        return round(float(predicted), 2)
+        return _feature_store.latest_vector(market_hash_name, kline, entry.feature_cols)
 
     def predict_7d_price_range(
         self, market_hash_name: str
@@ -218,15 +411,51 @@ class ItemPricePredictor:
         """
         预测饰品 7 天后的价格及波动区间。
         返回 {predicted, lower, upper, confidence}
+        训练、预测和区间计算共用同一次读取的 K 线。
         """
-        predicted = self.predict_7d_price(market_hash_name)
-        if predicted is None:
-            return None
+        return self._predict_range(market_hash_name, _fetch_item_kline(market_hash_name))
 
-        # 用最近 7 天的标准差作为波动范围
-        df = _fetch_item_kline(market_hash_name, limit=30)
+    def _uses_item_model(self, kline: pd.DataFrame) -> bool:
+        """历史足够训练单饰品模型的饰品走单饰品模型，其余交给全局模型。"""
+        return self.mode != "global" and len(kline) >= self.min_data_points
+
+    def _predict_range(self, market_hash_name: str, kline: pd.DataFrame) -> Optional[Dict]:
+        """
+        模型选择：历史足够时用单饰品模型（缺失或过期则重训）；
+        新上架/历史太短、或单饰品模型训练失败时用全局模型。
+        """
+        if self._uses_item_model(kline):
+            entry = self._usable_model(market_hash_name, kline) or self.train_for_item(
+                market_hash_name, kline=kline
+            )
+            if entry is not None:
+                X_pred = self._latest_feature_row(market_hash_name, kline, entry)
+                if X_pred is None:
+                    return None
+                predicted = round(float(entry.booster.predict(X_pred)[0]), 2)
+                return self._price_range(predicted, kline, entry)
+        ranges = self._global_ranges([market_hash_name], {market_hash_name: kline})
+        return (ranges or {}).get(market_hash_name)
+
+    @staticmethod
+    def _price_range(predicted: float, kline: pd.DataFrame, entry: RegisteredModel) -> Dict:
+        """
+        用最近 7 天的标准差作为波动范围，并给出简单置信度。
+        model_version / as_of 标明结果来自哪个模型、基于哪天的 K 线。
+        """
+        df = kline.tail(30)
+        provenance = {
+            "model_version": model_version(entry),
+            "as_of": int(kline["timestamp"].max()) if not kline.empty else None,
+        }
         if df.empty:
-            return {"predicted": predicted, "lower": predicted, "upper": predicted, "confidence": "low"}
+            return {
+                "predicted": predicted,
+                "lower": predicted,
+                "upper": predicted,
+                "confidence": "low",
+                **provenance,
+            }
 
         std_7d = float(df["price"].tail(7).std()) if len(df) >= 7 else float(df["price"].std())
         lower = round(predicted - 1.5 * std_7d, 2)
@@ -247,19 +476,93 @@ class ItemPricePredictor:
             "lower": max(lower, 0.01),
             "upper": upper,
             "confidence": confidence,
+            **provenance,
         }
 
     def batch_predict(
-        self, market_hash_names: list[str]
+        self, market_hash_names: List[str], max_workers: Optional[int] = None
     ) -> Dict[str, Optional[float]]:
         """批量预测多个饰品的 7 天后价格。"""
-        results = {}
-        for name in market_hash_names:
+        ranges = self.batch_predict_range(market_hash_names, max_workers)
+        return {name: (r["predicted"] if r else None) for name, r in ranges.items()}
+
+    def batch_predict_range(
+        self, market_hash_names: List[str], max_workers: Optional[int] = None
+    ) -> Dict[str, Optional[Dict]]:
+        """
+        批量预测多个饰品的 7 天后价格及波动区间。
+
+        1. 一次 IN 查询加载全部饰品的 K 线，训练、预测和区间计算都复用它；
+        2. 历史足够的饰品缺模型/模型过期时用线程池并行重训
+           （LightGBM 训练时释放 GIL），并发数 × 每个模型的线程数不超过本进程的线程预算；
+        3. 新上架/历史太短、或训练失败的饰品交给全局模型，一次 predict 全部完成；
+        4. 再一次性构造所有单饰品模型的特征行，逐个 booster 单线程预测。
+        """
+        names = list(dict.fromkeys(market_hash_names))
+        results: Dict[str, Optional[Dict]] = {name: None for name in names}
+        klines = _fetch_klines_bulk(names)
+        entries: Dict[str, RegisteredModel] = {}
+        to_train, to_global = [], []
+        for name in names:
+            if not self._uses_item_model(klines[name]):
+                to_global.append(name)
+                continue
             try:
-                results[name] = self.predict_7d_price(name)
+                entry = self._usable_model(name, klines[name])
+            except Exception as e:
+                logger.error(f"读取 {name} 模型失败: {e}")
+                entry = None
+            if entry is None:
+                to_train.append(name)
+            else:
+                entries[name] = entry
+
+        if to_train:
+            budget = lgbm_thread_budget()
+            workers = max(1, min(len(to_train), max_workers or budget, budget))
+            threads_per_model = max(1, budget // workers)
+            logger.info(
+                f"批量训练 {len(to_train)} 个饰品模型: {workers} 并发 × {threads_per_model} 线程"
+            )
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    name: executor.submit(
+                        self.train_for_item, name, threads_per_model, klines[name]
+                    )
+                    for name in to_train
+                }
+                for name, future in futures.items():
+                    try:
+                        entry = future.result()
+                    except Exception as e:
+                        logger.error(f"训练 {name} 失败: {e}")
+                        continue
+                    if entry is not None:
+                        entries[name] = entry
+            to_global.extend(name for name in to_train if name not in entries)
+
+        if to_global:
+            try:
+                results.update(self._global_ranges(to_global, klines) or {})
+            except Exception as e:
+                logger.error(f"全局模型预测失败: {e}")
+
+        # 先构造全部特征行，再集中预测
+        rows = {}
+        for name, entry in entries.items():
+            try:
+                row = self._latest_feature_row(name, klines[name], entry)
+            except Exception as e:
+                logger.error(f"构造 {name} 特征失败: {e}")
+                continue
+            if row is not None:
+                rows[name] = row
+        for name, row in rows.items():
+            try:
+                predicted = round(float(entries[name].booster.predict(row, num_threads=1)[0]), 2)
+                results[name] = self._price_range(predicted, klines[name], entries[name])
             except Exception as e:
                 logger.error(f"预测 {name} 失败: {e}")
-                results[name] = None
         return results
 
 
@@ -279,6 +582,14 @@ def batch_predict_items(names: list[str]) -> Dict[str, Optional[float]]:
     return _predictor.batch_predict(names)
 
 
+def batch_predict_item_ranges(names: list[str]) -> Dict[str, Optional[Dict]]:
+    return _predictor.batch_predict_range(names)
+
+
+def model_cache_stats() -> Dict:
+    return _model_cache.stats()
+
+
 if __name__ == "__main__":
     import sys
 
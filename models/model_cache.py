@@ -0,0 +1,119 @@
+"""
+model_cache.py — 进程内单饰品模型缓存（LRU + 内存预算 + TTL）
+
+按条目数和估算字节数双重限制，超出时淘汰最久未用的模型；
+训练时间超过 TTL 的模型视为过期，取出时丢弃并触发重训。
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from models.model_registry import RegisteredModel
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("MODEL_CACHE_MAX_ENTRIES", "256"))
+DEFAULT_MAX_BYTES = int(float(os.getenv("MODEL_CACHE_MAX_MB", "256")) * 1024 * 1024)
+DEFAULT_TTL_SECONDS = float(os.getenv("MODEL_TTL_HOURS", "24")) * 3600
+
+
+def estimate_booster_bytes(entry: RegisteredModel) -> int:
+    """用模型文本序列化长度近似 booster 的常驻内存。"""
+    try:
+        return len(entry.booster.model_to_string())
+    except Exception:
+        return 0
+
+
+class ModelCache:
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+        sizer: Callable[[RegisteredModel], int] = estimate_booster_bytes,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._sizer = sizer
+        self._entries: "OrderedDict[str, tuple[RegisteredModel, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0}
+
+    def is_expired(self, entry: RegisteredModel) -> bool:
+        return self.ttl_seconds > 0 and self._clock() - entry.trained_at > self.ttl_seconds
+
+    def get(self, market_hash_name: str) -> Optional[RegisteredModel]:
+        with self._lock:
+            item = self._entries.get(market_hash_name)
+            if item is None:
+                self._counters["misses"] += 1
+                return None
+            entry, size = item
+            if self.is_expired(entry):
+                self._remove(market_hash_name)
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(market_hash_name)
+            self._counters["hits"] += 1
+            return entry
+
+    def put(self, market_hash_name: str, entry: RegisteredModel) -> None:
+        size = self._sizer(entry)
+        with self._lock:
+            if market_hash_name in self._entries:
+                self._remove(market_hash_name)
+            self._entries[market_hash_name] = (entry, size)
+            self._bytes += size
+            self._counters["stores"] += 1
+            # 至少保留刚放入的模型，即使它单独超出字节预算
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._counters["evictions"] += 1
+
+    def pop(self, market_hash_name: str) -> None:
+        with self._lock:
+            if market_hash_name in self._entries:
+                self._remove(market_hash_name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __contains__(self, market_hash_name: str) -> bool:
+        with self._lock:
+            return market_hash_name in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            sizes = [size for _, size in self._entries.values()]
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "avg_bytes_per_booster": int(sum(sizes) / len(sizes)) if sizes else 0,
+                "max_bytes_per_booster": max(sizes) if sizes else 0,
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remove(self, market_hash_name: str) -> None:
+        _, size = self._entries.pop(market_hash_name)
+        self._bytes -= size
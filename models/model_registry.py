@@ -0,0 +1,229 @@
+"""
+model_registry.py — 单饰品 LightGBM 模型的磁盘注册表
+
+每个饰品一个目录，每次训练写入一个版本子目录 v-<时间>-<pid>-<随机>，保存
+LightGBM 原生文本格式的 booster（model.txt）和元数据（meta.json：特征列、
+训练数据水位线、验证指标、训练时间）；CURRENT 文件记录当前版本名，os.replace 原子切换。
+所有 uvicorn worker（以及离线训练进程）共享同一目录：发布新版本期间读者始终能读到完整的
+旧版本或新版本，多个进程同时保存也互不干扰（后写入指针的胜出）。
+首次用到时才从磁盘加载，其他进程重训后按 CURRENT 指向的版本自动重新加载。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import lightgbm as lgb
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY_DIR = os.getenv(
+    "MODEL_REGISTRY_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "registry"),
+)
+
+_MODEL_FILE = "model.txt"
+_META_FILE = "meta.json"
+_TUNED_FILE = "tuned.json"  # 超参搜索得到的参数，与版本无关，重训时保留
+_CURRENT_FILE = "CURRENT"  # 当前版本子目录名
+_KEEP_VERSIONS = 2  # 保留最近的版本数，正在读取上一版本的进程不会读到被删除的目录
+_PRUNE_GRACE_SECONDS = 60.0  # 版本被取代后至少保留这么久，正在读取它的进程总能读完
+
+
+@dataclass
+class RegisteredModel:
+    """注册表中的一个模型：booster + 训练时的上下文。"""
+
+    market_hash_name: str
+    booster: lgb.Booster
+    feature_cols: List[str]
+    watermark: int  # 训练数据中最新一行 K 线的 timestamp
+    trained_at: float
+    metrics: Dict[str, float] = field(default_factory=dict)
+    params: Dict = field(default_factory=dict)
+    version: str = ""  # 版本子目录名，用于判断其他进程是否已发布新版本
+
+    def is_outdated(self, latest_timestamp: Optional[int]) -> bool:
+        """水位线之后有新的 K 线数据时需要重训。"""
+        return latest_timestamp is not None and int(latest_timestamp) > self.watermark
+
+
+class ModelRegistry:
+    def __init__(self, root_dir: Optional[str] = None):
+        self.root_dir = root_dir or DEFAULT_REGISTRY_DIR
+
+    @staticmethod
+    def _key(market_hash_name: str) -> str:
+        # 饰品名含 | ( ) ★ 等字符，目录名用哈希
+        return hashlib.sha1(market_hash_name.encode("utf-8")).hexdigest()[:20]
+
+    def _item_dir(self, market_hash_name: str) -> str:
+        return os.path.join(self.root_dir, self._key(market_hash_name))
+
+    def version_of(self, market_hash_name: str) -> Optional[str]:
+        """磁盘上模型的当前版本，不存在返回 None。"""
+        item_dir = self._item_dir(market_hash_name)
+        try:
+            with open(os.path.join(item_dir, _CURRENT_FILE), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            pass
+        # 旧布局：model.txt / meta.json 直接位于饰品目录
+        try:
+            return f"legacy-{os.path.getmtime(os.path.join(item_dir, _META_FILE))}"
+        except OSError:
+            return None
+
+    def _version_dir(self, market_hash_name: str, version: str) -> str:
+        item_dir = self._item_dir(market_hash_name)
+        return item_dir if version.startswith("legacy-") else os.path.join(item_dir, version)
+
+    def save(
+        self,
+        market_hash_name: str,
+        booster: lgb.Booster,
+        feature_cols: List[str],
+        watermark: int,
+        metrics: Optional[Dict[str, float]] = None,
+        params: Optional[Dict] = None,
+    ) -> RegisteredModel:
+        """
+        写入新版本：先在临时目录写完整，rename 成版本目录，再原子替换 CURRENT 指针。
+        其他进程要么读到旧版本，要么读到新版本，不会看到模型缺失。
+        """
+        item_dir = self._item_dir(market_hash_name)
+        os.makedirs(item_dir, exist_ok=True)
+        trained_at = time.time()
+        meta = {
+            "market_hash_name": market_hash_name,
+            "feature_cols": list(feature_cols),
+            "watermark": int(watermark),
+            "trained_at": trained_at,
+            "metrics": metrics or {},
+            "params": params or {},
+            "lightgbm_version": lgb.__version__,
+        }
+        version = f"v-{time.time_ns()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=item_dir)
+        try:
+            booster.save_model(os.path.join(staging, _MODEL_FILE))
+            with open(os.path.join(staging, _META_FILE), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.rename(staging, os.path.join(item_dir, version))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        fd, tmp = tempfile.mkstemp(prefix=".current-", dir=item_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp, os.path.join(item_dir, _CURRENT_FILE))
+        self._prune(item_dir)
+
+        return RegisteredModel(
+            market_hash_name=market_hash_name,
+            booster=booster,
+            feature_cols=list(feature_cols),
+            watermark=int(watermark),
+            trained_at=trained_at,
+            metrics=meta["metrics"],
+            params=meta["params"],
+            version=version,
+        )
+
+    def _prune(self, item_dir: str) -> None:
+        """
+        删除旧版本目录（保留当前版本和最近 _KEEP_VERSIONS 个）以及旧布局的文件。
+        版本在被下一个版本取代 _PRUNE_GRACE_SECONDS 秒之后才删除：并发保存时
+        读者刚读到的指针可能已不在最近几个版本之内。
+        """
+        try:
+            with open(os.path.join(item_dir, _CURRENT_FILE), encoding="utf-8") as f:
+                current = f.read().strip()
+            versions = sorted(
+                (name for name in os.listdir(item_dir) if name.startswith("v-")),
+                key=lambda name: int(name.split("-")[1]),
+            )
+            created = [int(name.split("-")[1]) for name in versions]
+        except (OSError, ValueError, IndexError):
+            return
+        cutoff = time.time_ns() - int(_PRUNE_GRACE_SECONDS * 1e9)
+        for i, name in enumerate(versions[:-_KEEP_VERSIONS]):
+            if created[i + 1] > cutoff:
+                break
+            if name != current:
+                shutil.rmtree(os.path.join(item_dir, name), ignore_errors=True)
+        for legacy in (_MODEL_FILE, _META_FILE):
+            try:
+                os.remove(os.path.join(item_dir, legacy))
+            except OSError:
+                pass
+
+    def load(self, market_hash_name: str) -> Optional[RegisteredModel]:
+        """从磁盘加载当前版本，不存在或文件损坏返回 None。"""
+        for _ in range(3):
+            version = self.version_of(market_hash_name)
+            if version is None:
+                return None
+            version_dir = self._version_dir(market_hash_name, version)
+            try:
+                with open(os.path.join(version_dir, _META_FILE), encoding="utf-8") as f:
+                    meta = json.load(f)
+                booster = lgb.Booster(model_file=os.path.join(version_dir, _MODEL_FILE))
+                break
+            except Exception as e:
+                # 读取期间该版本已被更新的版本取代并清理，按新的指针重读
+                if self.version_of(market_hash_name) != version:
+                    continue
+                if not isinstance(e, FileNotFoundError):
+                    logger.warning(f"加载 {market_hash_name} 的已注册模型失败，将重新训练: {e}")
+                return None
+        else:
+            return None
+
+        return RegisteredModel(
+            market_hash_name=market_hash_name,
+            booster=booster,
+            feature_cols=meta["feature_cols"],
+            watermark=int(meta["watermark"]),
+            trained_at=float(meta["trained_at"]),
+            metrics=meta.get("metrics", {}),
+            params=meta.get("params", {}),
+            version=version,
+        )
+
+    def tuned_params(self, market_hash_name: str) -> Optional[Dict]:
+        """超参搜索写入的最优参数，没有则返回 None。"""
+        try:
+            with open(os.path.join(self._item_dir(market_hash_name), _TUNED_FILE), encoding="utf-8") as f:
+                return json.load(f).get("params")
+        except (OSError, ValueError):
+            return None
+
+    def save_tuned_params(self, market_hash_name: str, params: Dict, report: Optional[Dict] = None) -> None:
+        """
+        写入超参搜索结果（tuned.json，原子替换）。
+        不修改 meta.json，已加载的模型不会因此被视为新版本。
+        """
+        item_dir = self._item_dir(market_hash_name)
+        os.makedirs(item_dir, exist_ok=True)
+        payload = {
+            "market_hash_name": market_hash_name,
+            "params": params,
+            "tuned_at": time.time(),
+            "report": report or {},
+        }
+        fd, tmp = tempfile.mkstemp(prefix=".tuned-", dir=item_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(item_dir, _TUNED_FILE))
+
+    def delete(self, market_hash_name: str) -> None:
+        shutil.rmtree(self._item_dir(market_hash_name), ignore_errors=True)
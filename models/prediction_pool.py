@@ -0,0 +1,256 @@
+"""
+prediction_pool.py — 价格预测专用的 CPU 进程池
+
+LightGBM 训练和 pandas 特征工程是 CPU 密集型，放在事件循环或默认线程池里
+会卡住整个 API。这里用独立的进程池执行，并提供：
+  - 预热：worker 启动时先导入 lightgbm / pandas / 预测模块
+  - 准入控制：排队+运行中的任务数超过上限时直接拒绝（PredictionPoolBusy）
+  - 去重：按饰品去重，同一饰品正在计算时（无论来自单个预测还是批量预测），
+    后续请求共享同一个结果，批量预测只提交尚未在算的饰品，避免并发训练同一模型
+  - 缓存指标：各 worker 的模型缓存相互独立，每次预测随结果带回所在 worker 的缓存指标，
+    汇总时不再向进程池提交任务，也不占用准入名额
+
+本模块本身不导入 lightgbm，API 进程只在 worker 里加载模型相关依赖。
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionPoolBusy(RuntimeError):
+    """进程池队列已满，调用方应稍后重试。"""
+
+    def __init__(self, pending: int):
+        super().__init__(f"预测任务排队已满（{pending} 个进行中），请稍后重试")
+        self.pending = pending
+
+
+def _warm_worker(lgbm_threads: int) -> None:
+    """
+    worker 进程初始化：提前导入重依赖，避免首个任务承担导入开销；
+    并把 CPU 按 worker 数切分给 LightGBM，防止多个 worker 同时占满所有核。
+    """
+    os.environ.setdefault("LGBM_NUM_THREADS", str(lgbm_threads))
+
+    import lightgbm  # noqa: F401
+    import pandas  # noqa: F401
+
+    import models.item_price_predictor  # noqa: F401
+
+
+def _warm_ping() -> int:
+    return os.getpid()
+
+
+def _cache_snapshot() -> Tuple[int, Dict]:
+    from models.item_price_predictor import model_cache_stats
+
+    return os.getpid(), model_cache_stats()
+
+
+def _predict_range(market_hash_name: str) -> Tuple[Optional[Dict], Tuple[int, Dict]]:
+    from models.item_price_predictor import predict_item_7d_range
+
+    return predict_item_7d_range(market_hash_name), _cache_snapshot()
+
+
+def _batch_predict_range(
+    market_hash_names: List[str],
+) -> Tuple[Dict[str, Optional[Dict]], Tuple[int, Dict]]:
+    from models.item_price_predictor import batch_predict_item_ranges
+
+    return batch_predict_item_ranges(market_hash_names), _cache_snapshot()
+
+
+# 各 worker 的缓存上限与计数可直接相加；其余字段汇总时重新计算
+_SUMMED_CACHE_FIELDS = (
+    "entries", "max_entries", "bytes", "max_bytes",
+    "hits", "misses", "stores", "evictions", "expirations",
+)
+
+
+class PredictionPool:
+    def __init__(self, max_workers: int = 2, max_pending: int = 16):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        # market_hash_name → 该饰品预测结果的 Future（单个与批量预测共用）
+        self._items: Dict[str, asyncio.Future] = {}
+        # worker pid → 该 worker 最近一次预测后的模型缓存指标
+        self._worker_caches: Dict[int, Dict] = {}
+        self._counters = {
+            "submitted": 0,
+            "deduplicated": 0,
+            "rejected": 0,
+            "completed": 0,
+            "failed": 0,
+            "restarts": 0,
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn：不继承 API 进程里的线程和连接池
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+                initargs=(max(1, (os.cpu_count() or 1) // self.max_workers),),
+            )
+        return self._executor
+
+    async def start(self) -> None:
+        """启动全部 worker 并完成预热（在 FastAPI lifespan 中调用）。"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            pids = await asyncio.gather(
+                *(loop.run_in_executor(executor, _warm_ping) for _ in range(self.max_workers))
+            )
+            logger.info(f"预测进程池已就绪: {len(set(pids))} 个 worker")
+        except Exception:
+            logger.exception("预测进程池预热失败，将在首次请求时重试")
+            self._reset_executor()
+
+    def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, key: tuple, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        在进程池中执行 fn(*args)。相同 key 的任务在完成前只执行一次；
+        进行中的任务数达到 max_pending 时抛出 PredictionPoolBusy。
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            self._counters["deduplicated"] += 1
+            return await asyncio.shield(future)
+
+        if len(self._inflight) >= self.max_pending:
+            self._counters["rejected"] += 1
+            raise PredictionPoolBusy(len(self._inflight))
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._get_executor(), fn, *args)
+        except BrokenProcessPool:
+            # worker 异常退出后进程池不可再用，重建一次
+            self._reset_executor()
+            future = loop.run_in_executor(self._get_executor(), fn, *args)
+        self._counters["submitted"] += 1
+        self._inflight[key] = future
+        future.add_done_callback(lambda done: self._on_done(key, done))
+        # shield：调用方断开时不取消其他等待者共享的任务
+        return await asyncio.shield(future)
+
+    async def predict_range(self, market_hash_name: str) -> Optional[Dict]:
+        results = await self._predict_items([market_hash_name], batch=False)
+        return results[market_hash_name]
+
+    async def batch_predict_range(
+        self, market_hash_names: List[str]
+    ) -> Dict[str, Optional[Dict]]:
+        return await self._predict_items(sorted(set(market_hash_names)), batch=True)
+
+    async def _predict_items(self, names: List[str], batch: bool) -> Dict[str, Optional[Dict]]:
+        """
+        按饰品去重：已在计算的饰品等待原任务的结果，其余饰品合并成一个任务提交。
+        任务由独立的 Task 提交并回填各饰品的 Future，调用方断开时不影响其他等待者。
+        """
+        waiting = {name: self._items[name] for name in names if name in self._items}
+        fresh = [name for name in names if name not in waiting]
+        self._counters["deduplicated"] += len(waiting)
+
+        loop = asyncio.get_running_loop()
+        futures = {name: loop.create_future() for name in fresh}
+        if fresh:
+            self._items.update(futures)
+            submitted = asyncio.ensure_future(self._submit_items(fresh, batch))
+            submitted.add_done_callback(lambda done: self._settle_items(futures, done))
+
+        pending = {**waiting, **futures}
+        values = await asyncio.shield(asyncio.gather(*pending.values()))
+        return dict(zip(pending, values))
+
+    async def _submit_items(self, names: List[str], batch: bool) -> Dict[str, Optional[Dict]]:
+        if batch:
+            results, snapshot = await self.run(
+                ("batch_predict_range", tuple(names)), _batch_predict_range, names
+            )
+        else:
+            result, snapshot = await self.run(("predict_range", names[0]), _predict_range, names[0])
+            results = {names[0]: result}
+        self._record_cache(snapshot)
+        return results
+
+    def _settle_items(self, futures: Dict[str, asyncio.Future], done: asyncio.Future) -> None:
+        for name, future in futures.items():
+            if self._items.get(name) is future:
+                self._items.pop(name, None)
+            if future.done():
+                continue
+            if done.cancelled():
+                future.cancel()
+            elif done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result().get(name))
+
+    def model_cache_stats(self) -> Optional[Dict]:
+        """
+        全部 worker 模型缓存指标的汇总（各 worker 最近一次预测后上报的值）。
+        上限与计数为各 worker 之和，workers 为已上报的 worker 数；尚无预测时返回 None。
+        """
+        caches = list(self._worker_caches.values())
+        if not caches:
+            return None
+        total = {field: sum(cache.get(field, 0) for cache in caches) for field in _SUMMED_CACHE_FIELDS}
+        lookups = total["hits"] + total["misses"]
+        return {
+            "workers": len(caches),
+            **total,
+            "ttl_seconds": caches[0].get("ttl_seconds"),
+            "avg_bytes_per_booster": int(total["bytes"] / total["entries"]) if total["entries"] else 0,
+            "max_bytes_per_booster": max(cache.get("max_bytes_per_booster", 0) for cache in caches),
+            "hit_rate": round(total["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "running": self._executor is not None,
+            "pending": len(self._inflight),
+            **self._counters,
+        }
+
+    def _on_done(self, key: tuple, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            self._inflight.pop(key, None)
+        error = None if future.cancelled() else future.exception()
+        if future.cancelled() or error is not None:
+            self._counters["failed"] += 1
+        else:
+            self._counters["completed"] += 1
+        if isinstance(error, BrokenProcessPool):
+            self._reset_executor()
+
+    def _record_cache(self, snapshot: Tuple[int, Dict]) -> None:
+        pid, cache = snapshot
+        self._worker_caches[pid] = cache
+
+    def _reset_executor(self) -> None:
+        self._counters["restarts"] += 1
+        # 旧 worker 连同各自的缓存一起退出
+        self._worker_caches.clear()
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -1,14 +1,26 @@
+"""
+train_model.py — 大盘 K 线 LightGBM 训练 + 未来 30 天预测
+
+进程内流水线：抓取 → 加载数据 → 特征工程 → 训练 → 预测 → 持久化。
+各阶段直接传递 DataFrame，记录耗时；可选把中间结果写成 Parquet 检查点。
+
+用法: python -m models.train_model [--skip-fetch] [--checkpoint-dir DIR]
+"""
+
 import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 import pandas as pd
 import numpy as np
 import lightgbm as lgb
-from sklearn.model_selection import train_test_split
 import os
-import sys
-import subprocess
 import pymysql
 from dotenv import load_dotenv
 
+from db.create_dataset import load_kline_frame
+
 logger = logging.getLogger(__name__)
 
 # 定义评估函数：皮尔逊相关系数
@@ -113,250 +125,305 @@ def save_predictions_to_db(predictions_df):
             conn.close()
             logger.info("数据库连接已关闭。")
 
-def run_script(module_path, cwd):
-    """
-    将指定的 Python 脚本作为模块执行。
-    """
-    try:
-        logger.info(f"--- 开始执行模块: {module_path} ---")
-        # 使用 -m 将脚本作为模块运行，并设置工作目录为项目根目录
-        result = subprocess.run(
-            [sys.executable, "-m", module_path],
-            check=True,
-            capture_output=True,
-            text=True,
-            cwd=cwd
-        )
-        logger.info(result.stdout)
-        logger.info(f"--- 模块 {module_path} 执行成功 ---")
-    except subprocess.CalledProcessError as e:
-        logger.error(f"!!! 执行 {module_path} 时发生错误 !!!")
-        logger.error(e.stderr)
-        raise
-
-def train_and_predict():
+def forecast_future(model, last_features, close_history, last_known_date, future_steps=30):
     """
-    完整的模型训练、评估和预测流程。
+    从最后一个已知数据点出发，逐日递推预测未来 future_steps 天的收盘价。
+
+    每一步只更新时间、滞后和收盘价滚动特征（其余特征沿用最后一个已知数据点），
+    特征行是一个原地修改的 NumPy 向量，价格历史是预分配的数组：
+    不再每步复制 DataFrame、也不再把整段历史重建成 pd.Series。
     """
-    # --- 步骤 0: 更新数据 ---
-    logger.info("步骤 0: 更新数据...")
-
-    # 获取项目根目录的绝对路径
-    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-    # 定义需要执行的模块
-    kline_processor_module = 'db.kline_data_processor'
-    create_dataset_module = 'db.create_dataset'
-
-    # 依次执行脚本
-    run_script(kline_processor_module, project_root)
-    run_script(create_dataset_module, project_root)
-    
-    # --- 步骤 1: 加载与清洗数据 ---
-    logger.info("步骤 1: 加载与清洗数据...")
-    
-    # 构建训练集文件的路径
-    try:
-        current_dir = os.path.dirname(__file__)
-        csv_path = os.path.join(current_dir, 'train.csv')
-        data = pd.read_csv(csv_path)
-    except FileNotFoundError:
-        logger.error(f"错误: 'train.csv' 文件未在 '{current_dir}' 目录下找到。")
-        return
+    columns = list(last_features.columns)
+    col_index = {col: i for i, col in enumerate(columns)}
+    x = last_features.to_numpy(dtype=np.float64).reshape(1, -1).copy()
 
-    # 筛选掉价格或交易量为 0 的无效数据
-    columns_to_check = ['open_price', 'high_price', 'low_price', 'close_price', 'volume']
-    initial_rows = len(data)
-    data = data[(data[columns_to_check] > 0).all(axis=1)]
-    logger.info(f"数据清洗完成：移除了 {initial_rows - len(data)} 行包含 0 值的数据。")
-
-    # 将 timestamp 转换为日期时间格式，并设为索引
-    # 时间戳默认为 UTC，我们将其转换为 UTC+8 (Asia/Shanghai)
-    data['date'] = pd.to_datetime(data['timestamp'], unit='s').dt.tz_localize('UTC').dt.tz_convert('Asia/Shanghai')
-    data.set_index('date', inplace=True)
-    data.sort_index(inplace=True)
-
-    # --- 步骤 2: 特征工程 (在除去最后一行的数据上进行) ---
-    logger.info("步骤 2: 特征工程...")
-
-    # 分离出最后一行用于后续的迭代预测
-    data_for_prediction = data.iloc[-1:].copy()
-    data_for_training = data.iloc[:-1].copy()
-    
-    # 目标变量：未来1天的收盘价
-    data_for_training['target'] = data_for_training['close_price'].shift(-1)
-
-    # 时间特征
-    data_for_training['day_of_week'] = data_for_training.index.dayofweek
-    data_for_training['month'] = data_for_training.index.month
-    data_for_training['year'] = data_for_training.index.year
-
-    # 滞后特征
-    for lag in [7, 14, 30]:
-        data_for_training[f'close_lag_{lag}'] = data_for_training['close_price'].shift(lag)
-
-    # 滑动窗口特征
-    for window in [7, 14, 30]:
-        data_for_training[f'close_rolling_mean_{window}'] = data_for_training['close_price'].rolling(window=window).mean()
-        data_for_training[f'close_rolling_std_{window}'] = data_for_training['close_price'].rolling(window=window).std()
-        data_for_training[f'volume_rolling_mean_{window}'] = data_for_training['volume'].rolling(window=window).mean()
-
-    # 清理因特征工程产生的 NaN 值
-    data_for_training.dropna(inplace=True)
-    
-    # --- 步骤 3: 划分数据集 ---
-    logger.info("步骤 3: 划分数据集...")
-    
-    features = [col for col in data_for_training.columns if col not in ['timestamp', 'target']]
-    X = data_for_training[features]
-    y = data_for_training['target']
-
-    # 按时间顺序划分，后 20% 为验证集
-    train_size = int(len(X) * 0.8)
-    X_train, X_val = X[:train_size], X[train_size:]
-    y_train, y_val = y[:train_size], y[train_size:]
-
-    logger.info(f"训练集大小: {len(X_train)} | 验证集大小: {len(X_val)}")
-
-    # --- 步骤 4: 模型训练与评估 ---
-    logger.info("步骤 4: 模型训练与评估...")
-    
-    lgb_params = {
-        'objective': 'regression_l1',
-        'metric': 'rmse',
-        'n_estimators': 1000,
-        'learning_rate': 0.05,
-        'feature_fraction': 0.8,
-        'bagging_fraction': 0.8,
-        'bagging_freq': 1,
-        'verbose': -1,
-        'n_jobs': -1,
-        'seed': 42
-    }
-
-    model = lgb.LGBMRegressor(**lgb_params)
-    model.fit(X_train, y_train,
-              eval_set=[(X_val, y_val)],
-              eval_metric='rmse',
-              callbacks=[lgb.early_stopping(100, verbose=False)])
-
-    # 在验证集上评估
-    y_pred_val = model.predict(X_val)
-    score = pearson_correlation(y_val, y_pred_val)
-    logger.info(f"验证集上的皮尔逊相关系数 (ρ): {score:.4f}")
-
-    # --- 步骤 5: 模型微调与未来预测 ---
-    logger.info("步骤 5: 模型微调与未来预测...")
-
-    # 在预测前打印最后一个历史数据点的日期以进行调试
-    last_historical_date = data.index[-1]
-    logger.info(f"最后一个历史数据点的日期是: {last_historical_date}")
-
-    # 'model' 已在训练集(前80%数据)上训练完成
-    # 现在，我们使用验证集(最近20%的数据)对其进行微调，使其适应近期市场模式
-    logger.info(f"使用最近 {len(X_val)} 条数据进行模型微调...")
-    model.fit(X_val, y_val,
-              init_model=model,  # 从现有模型继续训练
-              eval_set=[(X_val, y_val)], # 使用微-调数据自身进行监控
-              callbacks=[lgb.early_stopping(10, verbose=False)]) # 为微调设置一个较短的早停
-    
-    logger.info("模型微调完成。")
-
-    # --- 为预测准备初始特征 ---
-    # 我们需要为 data_for_prediction 计算与训练时相同的特征
-    
-    # 完整的数据历史（包括用于训练的数据和用于预测的最后一行）
-    full_history_df = pd.concat([data_for_training, data_for_prediction])
-    
-    # 时间特征
-    data_for_prediction['day_of_week'] = data_for_prediction.index.dayofweek
-    data_for_prediction['month'] = data_for_prediction.index.month
-    data_for_prediction['year'] = data_for_prediction.index.year
-
-    # 滞后特征
-    for lag in [7, 14, 30]:
-        data_for_prediction[f'close_lag_{lag}'] = full_history_df['close_price'].shift(lag).iloc[-1]
-
-    # 滑动窗口特征
-    for window in [7, 14, 30]:
-        data_for_prediction[f'close_rolling_mean_{window}'] = full_history_df['close_price'].rolling(window=window).mean().iloc[-1]
-        data_for_prediction[f'close_rolling_std_{window}'] = full_history_df['close_price'].rolling(window=window).std().iloc[-1]
-        data_for_prediction[f'volume_rolling_mean_{window}'] = full_history_df['volume'].rolling(window=window).mean().iloc[-1]
-    
-    last_data_point_features = data_for_prediction[features].copy()
-    last_known_date = data_for_prediction.index[0]
-    
-    future_steps = 30
-    future_records = []
+    known = len(close_history)
+    history = np.empty(known + future_steps, dtype=np.float64)
+    history[:known] = close_history
+
+    def _set(col, value):
+        if col in col_index:
+            x[0, col_index[col]] = value
 
-    # 将所有已知收盘价（包括最后一行）转换为列表
-    close_price_history = full_history_df['close_price'].tolist()
-    
+    future_records = []
     for i in range(future_steps):
-        # 准备当前时间点的特征
-        current_features = last_data_point_features
-        
-        # 使用微调后的模型进行预测
-        next_day_pred = model.predict(current_features)[0]
-
-        # 更新历史价格列表以包含新的预测值
-        close_price_history.append(next_day_pred)
-        
-        # 计算下一个日期
+        # 使用微调后的模型进行预测（直接走 booster，跳过 sklearn 的输入校验）
+        next_day_pred = float(model.booster_.predict(x)[0])
+        history[known + i] = next_day_pred
+        size = known + i + 1
+
+        # 计算下一个日期，并更新时间特征
         next_date = last_known_date + pd.Timedelta(days=i + 1)
-        
-        # --- 为下一次迭代准备新的特征 ---
-        next_features = current_features.copy()
-        next_features.index = [next_date] # 更新索引为新日期
-        
-        # 更新时间特征
-        next_features['day_of_week'] = next_date.dayofweek
-        next_features['month'] = next_date.month
-        next_features['year'] = next_date.year
-
-        # 使用扩展后的历史价格来计算滞后和滚动特征
-        temp_series = pd.Series(close_price_history)
+        _set('day_of_week', next_date.dayofweek)
+        _set('month', next_date.month)
+        _set('year', next_date.year)
 
+        # 只看历史末尾的窗口来更新滞后和滚动特征
         for lag in [7, 14, 30]:
-            if len(temp_series) > lag:
-                next_features[f'close_lag_{lag}'] = temp_series.shift(lag).iloc[-1]
-            else:
-                next_features[f'close_lag_{lag}'] = np.nan
-        
+            _set(f'close_lag_{lag}', history[size - 1 - lag] if size > lag else np.nan)
+
+        rolling = {}
         for window in [7, 14, 30]:
-            if len(temp_series) >= window:
-                next_features[f'close_rolling_mean_{window}'] = temp_series.rolling(window=window).mean().iloc[-1]
-                next_features[f'close_rolling_std_{window}'] = temp_series.rolling(window=window).std().iloc[-1]
+            if size >= window:
+                recent = history[size - window:size]
+                mean, std = recent.mean(), recent.std(ddof=1)
             else:
-                next_features[f'close_rolling_mean_{window}'] = np.nan
-                next_features[f'close_rolling_std_{window}'] = np.nan
+                mean = std = np.nan
+            _set(f'close_rolling_mean_{window}', mean)
+            _set(f'close_rolling_std_{window}', std)
+            rolling[f'rolling_mean_{window}'] = None if np.isnan(mean) else float(mean)
+            rolling[f'rolling_std_{window}'] = None if np.isnan(std) else float(std)
 
         # 记录当前步骤的详细预测信息
-        record = {
+        future_records.append({
             'day': next_date.strftime('%Y-%m-%d'),
             'predicted_close_price': next_day_pred,
-            'rolling_mean_7': next_features[f'close_rolling_mean_7'].iloc[0] if f'close_rolling_mean_7' in next_features and not np.isnan(next_features[f'close_rolling_mean_7'].iloc[0]) else None,
-            'rolling_std_7': next_features[f'close_rolling_std_7'].iloc[0] if f'close_rolling_std_7' in next_features and not np.isnan(next_features[f'close_rolling_std_7'].iloc[0]) else None,
-            'rolling_mean_14': next_features[f'close_rolling_mean_14'].iloc[0] if f'close_rolling_mean_14' in next_features and not np.isnan(next_features[f'close_rolling_mean_14'].iloc[0]) else None,
-            'rolling_std_14': next_features[f'close_rolling_std_14'].iloc[0] if f'close_rolling_std_14' in next_features and not np.isnan(next_features[f'close_rolling_std_14'].iloc[0]) else None,
-            'rolling_mean_30': next_features[f'close_rolling_mean_30'].iloc[0] if f'close_rolling_mean_30' in next_features and not np.isnan(next_features[f'close_rolling_mean_30'].iloc[0]) else None,
-            'rolling_std_30': next_features[f'close_rolling_std_30'].iloc[0] if f'close_rolling_std_30' in next_features and not np.isnan(next_features[f'close_rolling_std_30'].iloc[0]) else None
+            **rolling,
+        })
+
+    return future_records
+
+@dataclass
+class FeatureSet:
+    """特征工程阶段的产物。"""
+    data: pd.DataFrame               # 清洗后的完整数据（date 索引）
+    data_for_training: pd.DataFrame  # 除最后一行外、已构造特征和 target 的数据
+    data_for_prediction: pd.DataFrame  # 最后一行，已构造与训练一致的特征
+    features: list
+
+
+@dataclass
+class PipelineResult:
+    predictions: Optional[pd.DataFrame] = None
+    validation_score: Optional[float] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+class TrainingPipeline:
+    """
+    大盘模型训练流水线。每个阶段是一个方法，输入输出都是内存中的对象；
+    设置 checkpoint_dir 时，DataFrame 产物额外写成 {阶段}.parquet 便于排查（需要 pyarrow）。
+    """
+
+    def __init__(self, skip_fetch: bool = False, checkpoint_dir: Optional[str] = None,
+                 output_dir: Optional[str] = None):
+        self.skip_fetch = skip_fetch
+        self.checkpoint_dir = checkpoint_dir
+        self.output_dir = output_dir or os.path.dirname(os.path.abspath(__file__))
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def _stage(self, name: str):
+        logger.info(f"--- 阶段 {name} 开始 ---")
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = round(elapsed, 3)
+            logger.info(f"--- 阶段 {name} 结束，耗时 {elapsed:.2f}s ---")
+
+    def _checkpoint(self, name: str, df: pd.DataFrame) -> None:
+        if not self.checkpoint_dir:
+            return
+        try:
+            os.makedirs(self.checkpoint_dir, exist_ok=True)
+            path = os.path.join(self.checkpoint_dir, f"{name}.parquet")
+            df.to_parquet(path)
+            logger.info(f"检查点已写入: {path}")
+        except ImportError:
+            logger.warning("未安装 pyarrow/fastparquet，跳过 Parquet 检查点")
+            self.checkpoint_dir = None
+        except Exception as e:
+            logger.warning(f"写入检查点 {name} 失败: {e}")
+
+    # --- 阶段 0: 抓取 ---
+    def fetch(self) -> None:
+        """抓取最新大盘 K 线并写入 kline_data_day（进程内调用，不再启动子进程）。"""
+        from crawler.daily_crawler import DailyKlineCrawler
+        from db.kline_data_processor import KlineDataProcessor
+
+        raw_data = DailyKlineCrawler().fetch_daily_data()
+        if raw_data:
+            KlineDataProcessor().process_and_store(raw_data)
+        else:
+            logger.warning("未抓取到大盘 K 线数据，使用数据库中的已有数据继续")
+
+    # --- 阶段 1: 加载与清洗数据 ---
+    def load_frame(self) -> pd.DataFrame:
+        data = load_kline_frame()
+
+        # 筛选掉价格或交易量为 0 的无效数据
+        columns_to_check = ['open_price', 'high_price', 'low_price', 'close_price', 'volume']
+        initial_rows = len(data)
+        data = data[(data[columns_to_check] > 0).all(axis=1)].copy()
+        logger.info(f"数据清洗完成：移除了 {initial_rows - len(data)} 行包含 0 值的数据。")
+
+        # 将 timestamp 转换为日期时间格式，并设为索引
+        # 时间戳默认为 UTC，我们将其转换为 UTC+8 (Asia/Shanghai)
+        data['date'] = pd.to_datetime(data['timestamp'], unit='s').dt.tz_localize('UTC').dt.tz_convert('Asia/Shanghai')
+        data.set_index('date', inplace=True)
+        data.sort_index(inplace=True)
+        return data
+
+    # --- 阶段 2: 特征工程 (在除去最后一行的数据上进行) ---
+    def build_features(self, data: pd.DataFrame) -> FeatureSet:
+        # 分离出最后一行用于后续的迭代预测
+        data_for_prediction = data.iloc[-1:].copy()
+        data_for_training = data.iloc[:-1].copy()
+
+        # 目标变量：未来1天的收盘价
+        data_for_training['target'] = data_for_training['close_price'].shift(-1)
+
+        # 时间特征
+        data_for_training['day_of_week'] = data_for_training.index.dayofweek
+        data_for_training['month'] = data_for_training.index.month
+        data_for_training['year'] = data_for_training.index.year
+
+        # 滞后特征
+        for lag in [7, 14, 30]:
+            data_for_training[f'close_lag_{lag}'] = data_for_training['close_price'].shift(lag)
+
+        # 滑动窗口特征
+        for window in [7, 14, 30]:
+            data_for_training[f'close_rolling_mean_{window}'] = data_for_training['close_price'].rolling(window=window).mean()
+            data_for_training[f'close_rolling_std_{window}'] = data_for_training['close_price'].rolling(window=window).std()
+            data_for_training[f'volume_rolling_mean_{window}'] = data_for_training['volume'].rolling(window=window).mean()
+
+        # 清理因特征工程产生的 NaN 值
+        data_for_training.dropna(inplace=True)
+        features = [col for col in data_for_training.columns if col not in ['timestamp', 'target']]
+
+        # 为 data_for_prediction 计算与训练时相同的特征
+        # 完整的数据历史（包括用于训练的数据和用于预测的最后一行）
+        full_history_df = pd.concat([data_for_training, data_for_prediction])
+
+        data_for_prediction['day_of_week'] = data_for_prediction.index.dayofweek
+        data_for_prediction['month'] = data_for_prediction.index.month
+        data_for_prediction['year'] = data_for_prediction.index.year
+        for lag in [7, 14, 30]:
+            data_for_prediction[f'close_lag_{lag}'] = full_history_df['close_price'].shift(lag).iloc[-1]
+        for window in [7, 14, 30]:
+            data_for_prediction[f'close_rolling_mean_{window}'] = full_history_df['close_price'].rolling(window=window).mean().iloc[-1]
+            data_for_prediction[f'close_rolling_std_{window}'] = full_history_df['close_price'].rolling(window=window).std().iloc[-1]
+            data_for_prediction[f'volume_rolling_mean_{window}'] = full_history_df['volume'].rolling(window=window).mean().iloc[-1]
+
+        return FeatureSet(data, data_for_training, data_for_prediction, features)
+
+    # --- 阶段 3/4: 划分数据集、训练、评估与微调 ---
+    def train(self, feature_set: FeatureSet):
+        X = feature_set.data_for_training[feature_set.features]
+        y = feature_set.data_for_training['target']
+
+        # 按时间顺序划分，后 20% 为验证集
+        train_size = int(len(X) * 0.8)
+        X_train, X_val = X[:train_size], X[train_size:]
+        y_train, y_val = y[:train_size], y[train_size:]
+
+        logger.info(f"训练集大小: {len(X_train)} | 验证集大小: {len(X_val)}")
+
+        lgb_params = {
+            'objective': 'regression_l1',
+            'metric': 'rmse',
+            'n_estimators': 1000,
+            'learning_rate': 0.05,
+            'feature_fraction': 0.8,
+            'bagging_fraction': 0.8,
+            'bagging_freq': 1,
+            'verbose': -1,
+            'n_jobs': -1,
+            'seed': 42
         }
-        future_records.append(record)
 
-        # 更新 last_data_point_features 以用于下一次迭代
-        last_data_point_features = next_features
+        model = lgb.LGBMRegressor(**lgb_params)
+        model.fit(X_train, y_train,
+                  eval_set=[(X_val, y_val)],
+                  eval_metric='rmse',
+                  callbacks=[lgb.early_stopping(100, verbose=False)])
+
+        # 在验证集上评估
+        y_pred_val = model.predict(X_val)
+        score = pearson_correlation(y_val, y_pred_val)
+        logger.info(f"验证集上的皮尔逊相关系数 (ρ): {score:.4f}")
+
+        # 'model' 已在训练集(前80%数据)上训练完成
+        # 现在，我们使用验证集(最近20%的数据)对其进行微调，使其适应近期市场模式
+        logger.info(f"使用最近 {len(X_val)} 条数据进行模型微调...")
+        model.fit(X_val, y_val,
+                  init_model=model,  # 从现有模型继续训练
+                  eval_set=[(X_val, y_val)], # 使用微调数据自身进行监控
+                  callbacks=[lgb.early_stopping(10, verbose=False)]) # 为微调设置一个较短的早停
+        logger.info("模型微调完成。")
+        return model, score
+
+    # --- 阶段 5: 未来预测 ---
+    def predict(self, model, feature_set: FeatureSet) -> pd.DataFrame:
+        # 在预测前打印最后一个历史数据点的日期以进行调试
+        logger.info(f"最后一个历史数据点的日期是: {feature_set.data.index[-1]}")
+
+        data_for_prediction = feature_set.data_for_prediction
+        full_history = pd.concat([feature_set.data_for_training, data_for_prediction])
+        future_records = forecast_future(
+            model,
+            data_for_prediction[feature_set.features],
+            full_history['close_price'].to_numpy(dtype=np.float64),
+            data_for_prediction.index[0],
+        )
+        return pd.DataFrame(future_records)
 
-    # 保存预测结果
-    predictions_df = pd.DataFrame(future_records)
-    
-    prediction_path = os.path.join(current_dir, 'next_month_prediction.csv')
-    predictions_df.to_csv(prediction_path, index=False)
-    logger.info(f"未来 30 天的详细预测结果已保存到: {prediction_path}")
+    # --- 阶段 6: 持久化 ---
+    def persist(self, predictions_df: pd.DataFrame) -> None:
+        prediction_path = os.path.join(self.output_dir, 'next_month_prediction.csv')
+        predictions_df.to_csv(prediction_path, index=False)
+        logger.info(f"未来 30 天的详细预测结果已保存到: {prediction_path}")
+        save_predictions_to_db(predictions_df)
 
-    # 新增步骤：将预测保存到数据库
-    save_predictions_to_db(predictions_df)
+    def run(self) -> PipelineResult:
+        result = PipelineResult(timings=self.timings)
+        if self.skip_fetch:
+            logger.info("跳过抓取阶段，直接使用数据库中的数据")
+        else:
+            with self._stage('fetch'):
+                self.fetch()
+
+        with self._stage('load_frame'):
+            data = self.load_frame()
+        self._checkpoint('load_frame', data)
+        if data.empty:
+            logger.error("kline_data_day 中没有可用数据，终止训练。")
+            return result
+
+        with self._stage('features'):
+            feature_set = self.build_features(data)
+        self._checkpoint('features', feature_set.data_for_training)
+
+        with self._stage('train'):
+            model, result.validation_score = self.train(feature_set)
+
+        with self._stage('predict'):
+            result.predictions = self.predict(model, feature_set)
+        self._checkpoint('predict', result.predictions)
+
+        with self._stage('persist'):
+            self.persist(result.predictions)
+
+        logger.info(f"各阶段耗时(秒): {self.timings}")
+        return result
+
+
+def train_and_predict(skip_fetch: bool = False, checkpoint_dir: Optional[str] = None) -> PipelineResult:
+    """
+    完整的模型训练、评估和预测流程。
+    """
+    return TrainingPipeline(skip_fetch=skip_fetch, checkpoint_dir=checkpoint_dir).run()
 
 
 if __name__ == "__main__":
-    train_and_predict()
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="训练大盘模型并预测未来 30 天")
+    parser.add_argument("--skip-fetch", action="store_true", help="不抓取，直接使用数据库中的数据")
+    parser.add_argument("--checkpoint-dir", default=None, help="把各阶段的 DataFrame 写成 Parquet 检查点")
+    args = parser.parse_args()
+    train_and_predict(skip_fetch=args.skip_fetch, checkpoint_dir=args.checkpoint_dir)
@@ -0,0 +1,305 @@
+"""
+tuning.py — 单饰品价格模型的超参搜索（successive halving，进程池 + 时间预算）
+
+  1. 为饰品构造特征并按线上同样的 80/20 时间切分，
+     训练/验证集各保存一份 lgb.Dataset 二进制（按饰品 + 水位线缓存，重复搜索不再重建）；
+  2. 随机采样 n 组超参，第一轮每组只训练 min_rounds 棵树，
+     每轮保留验证 RMSE 最好的 1/eta，下一轮树的数量 ×eta，直到 max_rounds；
+  3. 试验在 spawn 进程池中并行执行，每个 worker 分到 CPU / worker 数个线程；
+     超出墙钟预算时停止提交，用已完成的最高一轮的结果选最优；
+  4. 最优参数写入注册表（tuned.json），之后 train_for_item 重训时自动使用；
+     报告里同时给出速度/精度的帕累托前沿。
+
+用法: python -m models.tuning <market_hash_name> [--trials 27] [--budget 300] [--workers 4]
+"""
+
+import json
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from models.item_price_predictor import (
+    _build_features,
+    _fetch_item_kline,
+    feature_columns,
+)
+from models.model_registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tuning_cache")
+
+# 与 fit_price_model 一致、不参与搜索的参数
+_BASE_PARAMS = {
+    "objective": "regression_l1",
+    "metric": "rmse",
+    "bagging_freq": 1,
+    "verbose": -1,
+    "seed": 42,
+}
+
+
+def sample_params(rng: np.random.Generator) -> Dict:
+    """搜索空间；键名同时兼容 LGBMRegressor 和 lgb.train。"""
+    return {
+        "learning_rate": round(float(np.exp(rng.uniform(np.log(0.01), np.log(0.2)))), 5),
+        "num_leaves": int(rng.choice([7, 15, 31, 63])),
+        "min_child_samples": int(rng.choice([5, 10, 20, 40])),
+        "feature_fraction": round(float(rng.uniform(0.5, 1.0)), 3),
+        "bagging_fraction": round(float(rng.uniform(0.5, 1.0)), 3),
+        "reg_lambda": round(float(np.exp(rng.uniform(np.log(1e-3), np.log(10.0)))), 5),
+    }
+
+
+def build_dataset_cache(
+    market_hash_name: str, kline: pd.DataFrame, cache_dir: str = DEFAULT_CACHE_DIR
+) -> Optional[Tuple[str, str]]:
+    """
+    构造并缓存训练/验证集二进制，返回 (train.bin, val.bin) 路径；数据不足返回 None。
+    缓存目录按饰品和最新 K 线 timestamp 区分，新数据到来后自然失效；
+    写入新水位线时删除该饰品更早水位线的目录，缓存不随 K 线增长无限堆积。
+    """
+    if kline.empty:
+        return None
+    watermark = int(kline["timestamp"].max())
+    key = ModelRegistry._key(market_hash_name)
+    item_dir = os.path.join(cache_dir, f"{key}-{watermark}")
+    train_path = os.path.join(item_dir, "train.bin")
+    val_path = os.path.join(item_dir, "val.bin")
+    if os.path.exists(train_path) and os.path.exists(val_path):
+        return train_path, val_path
+
+    df = _build_features(kline)
+    if len(df) < 30:
+        return None
+    cols = feature_columns(df)
+    train_size = int(len(df) * 0.8)
+    if len(df) - train_size < 5:
+        return None
+
+    os.makedirs(item_dir, exist_ok=True)
+    # feature_pre_filter=False：之后各试验可以使用不同的 min_child_samples
+    dataset_params = {"feature_pre_filter": False, "verbose": -1}
+    train = lgb.Dataset(
+        df[cols].iloc[:train_size], df["target"].iloc[:train_size],
+        params=dataset_params, free_raw_data=False,
+    )
+    val = lgb.Dataset(
+        df[cols].iloc[train_size:], df["target"].iloc[train_size:], reference=train
+    )
+    train.save_binary(train_path + ".tmp")
+    val.save_binary(val_path + ".tmp")
+    os.replace(train_path + ".tmp", train_path)
+    os.replace(val_path + ".tmp", val_path)
+    _prune_dataset_cache(cache_dir, key, watermark)
+    return train_path, val_path
+
+
+def _prune_dataset_cache(cache_dir: str, key: str, watermark: int) -> None:
+    """删除同一饰品水位线早于 watermark 的缓存目录。"""
+    for name in os.listdir(cache_dir):
+        prefix, _, mark = name.rpartition("-")
+        if prefix != key or not mark.isdigit() or int(mark) >= watermark:
+            continue
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        logger.info(f"已删除过期的调参数据集缓存: {name}")
+
+
+def _set_worker_threads(num_threads: int) -> None:
+    os.environ["LGBM_NUM_THREADS"] = str(num_threads)
+
+
+def evaluate_trial(train_path: str, val_path: str, params: Dict, num_boost_round: int) -> Dict:
+    """在缓存的 Dataset 上训练一组参数，返回验证 RMSE、实际树数和耗时。"""
+    started = time.perf_counter()
+    train = lgb.Dataset(train_path, params={"feature_pre_filter": False, "verbose": -1})
+    val = lgb.Dataset(val_path, reference=train)
+    full_params = {
+        **_BASE_PARAMS,
+        **params,
+        "num_threads": int(os.environ.get("LGBM_NUM_THREADS", "1")),
+    }
+    booster = lgb.train(
+        full_params,
+        train,
+        num_boost_round=num_boost_round,
+        valid_sets=[val],
+        callbacks=[lgb.early_stopping(20, verbose=False)],
+    )
+    return {
+        "rmse": float(booster.best_score["valid_0"]["rmse"]),
+        "best_iteration": int(booster.best_iteration or num_boost_round),
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+def pareto_front(trials: List[Dict]) -> List[Dict]:
+    """耗时和 RMSE 都不被其他试验同时超过的试验，按耗时升序。"""
+    front = []
+    best_rmse = math.inf
+    for trial in sorted(trials, key=lambda t: (t["seconds"], t["rmse"])):
+        if trial["rmse"] < best_rmse:
+            front.append(trial)
+            best_rmse = trial["rmse"]
+    return front
+
+
+def successive_halving(
+    train_path: str,
+    val_path: str,
+    n_trials: int = 27,
+    min_rounds: int = 50,
+    max_rounds: int = 450,
+    eta: int = 3,
+    budget_seconds: float = 300.0,
+    workers: Optional[int] = None,
+    seed: int = 42,
+) -> Dict:
+    """对缓存的数据集做 successive halving 搜索，返回 {best, trials, pareto, rungs, elapsed}。"""
+    rng = np.random.default_rng(seed)
+    candidates = [{"id": i, "params": sample_params(rng)} for i in range(n_trials)]
+    workers = max(1, min(workers or os.cpu_count() or 1, n_trials))
+    deadline = time.monotonic() + budget_seconds
+    started = time.monotonic()
+    trials: List[Dict] = []
+    rungs: List[Dict] = []
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_set_worker_threads,
+        initargs=(max(1, (os.cpu_count() or 1) // workers),),
+    ) as executor:
+        rounds = min_rounds
+        while candidates:
+            pending = {
+                executor.submit(evaluate_trial, train_path, val_path, c["params"], rounds): c
+                for c in candidates
+            }
+            finished = []
+            timed_out = False
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    candidate = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"试验 {candidate['id']} 失败: {e}")
+                        continue
+                    trial = {"id": candidate["id"], "rounds": rounds, "params": candidate["params"], **result}
+                    trials.append(trial)
+                    finished.append(trial)
+            for future in pending:
+                future.cancel()
+
+            rungs.append({"rounds": rounds, "submitted": len(candidates), "completed": len(finished)})
+            logger.info(
+                f"rounds={rounds}: 完成 {len(finished)}/{len(candidates)}"
+                + (f"，最优 RMSE {min(t['rmse'] for t in finished):.4f}" if finished else "")
+            )
+            if timed_out or rounds >= max_rounds or len(finished) <= 1:
+                break
+            keep = max(1, len(finished) // eta)
+            survivors = sorted(finished, key=lambda t: t["rmse"])[:keep]
+            candidates = [{"id": t["id"], "params": t["params"]} for t in survivors]
+            rounds = min(max_rounds, rounds * eta)
+
+    best = None
+    if trials:
+        # 取完成的最高一轮里 RMSE 最小的试验（低轮次的结果树太少，不可直接比较）
+        top_rounds = max(t["rounds"] for t in trials)
+        best = min((t for t in trials if t["rounds"] == top_rounds), key=lambda t: t["rmse"])
+    return {
+        "best": best,
+        "trials": trials,
+        "pareto": pareto_front(trials),
+        "rungs": rungs,
+        "elapsed": round(time.monotonic() - started, 3),
+    }
+
+
+def tune_item(
+    market_hash_name: str,
+    kline: Optional[pd.DataFrame] = None,
+    registry: Optional[ModelRegistry] = None,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    **search_kwargs,
+) -> Optional[Dict]:
+    """搜索单个饰品的超参并写入注册表，返回搜索报告；数据不足返回 None。"""
+    kline = _fetch_item_kline(market_hash_name) if kline is None else kline
+    paths = build_dataset_cache(market_hash_name, kline, cache_dir)
+    if paths is None:
+        logger.warning(f"饰品 {market_hash_name} 数据不足，跳过超参搜索")
+        return None
+
+    report = successive_halving(*paths, **search_kwargs)
+    best = report["best"]
+    if best is None:
+        logger.warning(f"饰品 {market_hash_name} 在预算内没有完成任何试验")
+        return report
+
+    # 线上训练仍带早停，n_estimators 作为树数上限
+    tuned = {**best["params"], "n_estimators": best["rounds"]}
+    (registry or ModelRegistry()).save_tuned_params(
+        market_hash_name,
+        tuned,
+        report={
+            "val_rmse": round(best["rmse"], 6),
+            "rounds": best["rounds"],
+            "trials": len(report["trials"]),
+            "elapsed": report["elapsed"],
+            "pareto": [
+                {"params": t["params"], "rounds": t["rounds"], "rmse": t["rmse"], "seconds": t["seconds"]}
+                for t in report["pareto"]
+            ],
+        },
+    )
+    logger.info(f"饰品 {market_hash_name} 最优参数已写入注册表: {tuned} (RMSE {best['rmse']:.4f})")
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="单饰品价格模型超参搜索")
+    parser.add_argument("names", nargs="+", help="饰品 market_hash_name")
+    parser.add_argument("--trials", type=int, default=27)
+    parser.add_argument("--min-rounds", type=int, default=50)
+    parser.add_argument("--max-rounds", type=int, default=450)
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=300.0, help="每个饰品的墙钟预算（秒）")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    for name in args.names:
+        report = tune_item(
+            name,
+            cache_dir=args.cache_dir,
+            n_trials=args.trials,
+            min_rounds=args.min_rounds,
+            max_rounds=args.max_rounds,
+            eta=args.eta,
+            budget_seconds=args.budget,
+            workers=args.workers,
+        )
+        if report and report["best"]:
+            print(f"{name}: 最优 RMSE {report['best']['rmse']:.4f}，耗时 {report['elapsed']}s")
+            print("  速度/精度前沿（秒 → RMSE）:")
+            for trial in report["pareto"]:
+                print(f"    {trial['seconds']:.3f}s → {trial['rmse']:.4f}  rounds={trial['rounds']} {json.dumps(trial['params'])}")
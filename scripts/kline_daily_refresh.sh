@@ -1,6 +1,6 @@
 #!/bin/bash
 # Buffotte 每日K线数据刷新脚本
-# 北京时间 8:30 执行: 刷新所有追踪饰品的K线缓存数据
+# 北京时间 8:30 执行: 刷新所有追踪饰品的K线缓存数据，并预计算价格预测
 # Cron: 30 8 * * * /root/Buffotte/kline_daily_refresh.sh >> /root/Buffotte/logs/kline_daily_refresh.log 2>&1
 
 set -e
@@ -55,5 +55,41 @@ fi
 
 echo "✅ K线缓存刷新完成"
 echo ""
+
+# ─── Step 3: 训练跨饰品全局价格模型 ───────────────────────────────────
+echo "▶ [Step 3] 训练全局价格模型..."
+docker exec \
+    -e HOST="$HOST" \
+    -e PORT="$PORT" \
+    -e DB_USER="$DB_USER" \
+    -e DB_PASSWORD="$DB_PASSWORD" \
+    -e DATABASE="$DATABASE" \
+    -e CHARSET="$CHARSET" \
+    buffotte-backend-1 python -m models.global_price_model || GLOBAL_STATUS=$?
+
+if [ -n "$GLOBAL_STATUS" ]; then
+    echo "⚠️  全局模型训练失败（继续使用上一版全局模型或单饰品模型）"
+else
+    echo "✅ 全局模型训练完成"
+fi
+echo ""
+
+# ─── Step 4: 预计算追踪/近期查看饰品的价格预测 ─────────────────────────
+echo "▶ [Step 4] 预计算饰品价格预测..."
+docker exec \
+    -e HOST="$HOST" \
+    -e PORT="$PORT" \
+    -e DB_USER="$DB_USER" \
+    -e DB_PASSWORD="$DB_PASSWORD" \
+    -e DATABASE="$DATABASE" \
+    -e CHARSET="$CHARSET" \
+    buffotte-backend-1 python -m db.prediction_processor || PREDICT_STATUS=$?
+
+if [ -n "$PREDICT_STATUS" ]; then
+    echo "⚠️  价格预测预计算失败（接口会回退为按需计算）"
+else
+    echo "✅ 价格预测预计算完成"
+fi
+echo ""
 echo "全部任务完成 @ $(date '+%Y-%m-%d %H:%M:%S')"
 echo "=========================================="
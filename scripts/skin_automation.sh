@@ -17,12 +17,12 @@ echo "🔫 饰品流水线启动 @ $TIMESTAMP"
 echo "=========================================="
 
 # ─── Phase 1-3: Orchestrator 流水线 ──────────────────────────────
-echo "▶ [Phase 1-3] 执行 Orchestrator 流水线 (Scout → Parser → Investigator)..."
+echo "▶ [Phase 1-3] 执行 Orchestrator 流式流水线 (Scout → Parser → Investigator)..."
 docker exec "$CONTAINER" python -c "
 import logging, sys
 logging.basicConfig(level=logging.INFO, stream=sys.stdout, format='%(asctime)s %(message)s')
 from llm.orchestrator import run_pipeline
-stats = run_pipeline(investigator_batch_size=15)
+stats = run_pipeline(investigator_batch_size=15, streaming=True)
 print()
 print('=== 流水线统计 ===')
 for phase in ['scout', 'parser', 'investigator']:
@@ -0,0 +1,44 @@
+import numpy as np
+
+from models.backtest import BacktestConfig, run_backtest, summarize, walk_forward
+from models.benchmark import synthetic_item_kline
+
+
+def test_walk_forward_only_scores_future_prices():
+    kline = synthetic_item_kline(200)
+    config = BacktestConfig(min_train_rows=120, step=14, retrain_every=2)
+
+    result = walk_forward(kline, config)
+
+    assert result["n"] == len(range(120, 200 - 7 + 1, 14))
+    assert result["trainings"] == (result["n"] + 1) // 2
+    prices = kline["price"].to_numpy()
+    timestamps = kline["timestamp"].tolist()
+    for p in result["predictions"]:
+        i = timestamps.index(p["timestamp"])
+        assert p["current"] == prices[i] and p["actual"] == prices[i + 7]
+
+
+def test_summarize_hit_rate_and_errors():
+    summary = summarize([
+        {"current": 10.0, "predicted": 11.0, "actual": 12.0},
+        {"current": 10.0, "predicted": 9.0, "actual": 11.0},
+    ])
+    assert summary["n"] == 2
+    assert summary["hit_rate"] == 0.5
+    assert np.isclose(summary["mae"], 1.5)
+
+
+def test_parallel_backtest_uses_shared_memory_and_resumes(tmp_path):
+    klines = {f"Item {i}": synthetic_item_kline(160, seed=i) for i in range(3)}
+    config = BacktestConfig(min_train_rows=120, step=14)
+
+    first = run_backtest(klines, config, workers=2, cache_dir=str(tmp_path))
+    assert first["computed"] == 3 and first["cached"] == 0
+    assert first["summary"]["items"] == 3 and first["summary"]["n"] > 0
+
+    # 一个饰品有新 K 线，只重算它
+    klines["Item 0"] = synthetic_item_kline(161, seed=0)
+    second = run_backtest(klines, config, workers=2, cache_dir=str(tmp_path))
+    assert second["computed"] == 1 and second["cached"] == 2
+    assert second["items"]["Item 1"] == first["items"]["Item 1"]
@@ -0,0 +1,18 @@
+import models.item_price_predictor as predictor_module
+from models.benchmark import compare, run_benchmarks
+
+
+def test_benchmark_runs_offline_and_compares_reports():
+    original_fetch = predictor_module._fetch_item_kline
+
+    report = run_benchmarks([90], [3], market_days=200, isolate=False)
+
+    assert predictor_module._fetch_item_kline is original_fetch
+    cases = {r["case"]: r for r in report["results"]}
+    assert set(cases) == {"train_for_item", "batch_predict_range", "market_pipeline"}
+    assert cases["train_for_item"]["train"]["booster_bytes"] > 0
+    assert cases["batch_predict_range"]["cold"]["predicted"] == 3
+    assert cases["market_pipeline"]["peak_rss_mb"] > 0
+
+    rows = compare(report, report)
+    assert rows and all(row["ratio"] == 1.0 for row in rows)
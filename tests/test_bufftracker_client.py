@@ -1,4 +1,12 @@
+import asyncio
+
+import httpx
+import pytest
+
 from app.integrations.bufftracker import BuffTrackerClient
+from app.integrations.cache import TTLCache
+from app.integrations.quota import Priority, QuotaDeferred, QuotaScheduler
+from app.integrations.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
 
 
 def test_container_base_builds_api_path():
@@ -29,3 +37,323 @@ def test_build_url_accepts_existing_api_prefix_without_duplication():
         == "http://buff-tracker-api-1:8001/api/item/kline-data/AK-47"
     )
 
+
+
+def test_clients_are_pooled_and_reused_until_closed():
+    client = BuffTrackerClient(
+        base_url="http://buff-tracker-api-1:8001",
+        max_connections=8,
+        max_keepalive_connections=4,
+    )
+
+    async def scenario():
+        first = client._get_async_client()
+        assert client._get_async_client() is first
+        await client.aclose()
+        assert client._async_client is None
+
+    asyncio.run(scenario())
+
+    sync_client = client._get_sync_client()
+    assert client._get_sync_client() is sync_client
+    client.close()
+
+    stats = client.pool_stats()
+    assert stats["max_connections"] == 8
+    assert stats["max_keepalive_connections"] == 4
+    assert stats["async_clients_opened"] == 1
+    assert stats["sync_clients_opened"] == 1
+    assert stats["async_connections"] == {"open": 0, "idle": 0, "active": 0}
+
+
+def test_async_pool_is_closed_when_its_event_loop_ends():
+    client = BuffTrackerClient(base_url="http://buff-tracker-api-1:8001")
+
+    async def open_pool():
+        return client._get_async_client()
+
+    first = asyncio.run(open_pool())
+    assert first.is_closed
+    assert client._async_client is None
+
+    second = asyncio.run(open_pool())
+    assert second is not first and second.is_closed
+    assert client.pool_stats()["async_clients_opened"] == 2
+
+
+def test_ttl_cache_expires_and_evicts_least_recently_used():
+    now = [0.0]
+    cache = TTLCache(max_entries=2, clock=lambda: now[0])
+
+    cache.set("a", 1, ttl=10)
+    cache.set("b", 2, ttl=10)
+    assert cache.get("a") == (True, 1)
+    cache.set("c", 3, ttl=10)
+
+    assert cache.get("b") == (False, None)
+    now[0] = 11
+    assert cache.get("a") == (False, None)
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 1
+
+
+def test_price_and_search_responses_are_cached_including_misses():
+    client = BuffTrackerClient(base_url="http://buff-tracker-api-1:8001")
+    calls = []
+    payloads = {
+        "price": {"success": True, "data": [{"platform": "BUFF", "sellPrice": 10}]},
+        "search": {"success": False, "data": []},
+    }
+
+    class FakeResponse:
+        status_code = 200
+
+        def __init__(self, payload):
+            self._payload = payload
+
+        def json(self):
+            return self._payload
+
+    async def fake_request(method, url, **kwargs):
+        calls.append(url)
+        return FakeResponse(payloads["price" if "/price/" in url else "search"])
+
+    client._request = fake_request
+
+    async def scenario():
+        for _ in range(3):
+            await client.get_price("AK-47 | Redline (Field-Tested)", priority=Priority.INTERACTIVE)
+            await client.search_items("红线")
+
+    asyncio.run(scenario())
+
+    assert len(calls) == 2
+    stats = client.cache.stats()
+    assert stats["hits"] == 2
+    assert stats["negative_hits"] == 2
+    assert stats["misses"] == 2
+    # Only the upstream call spends quota; cache hits are not counted.
+    assert client.quota.stats()["priorities"]["interactive"]["granted"] == 1
+
+
+def test_circuit_breaker_opens_then_half_open_probe_closes():
+    now = [0.0]
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now[0] = 10
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_half_open_probe_returns_its_slot():
+    now = [0.0]
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    client = BuffTrackerClient(
+        base_url="http://buff-tracker-api-1:8001",
+        retry_policy=RetryPolicy(max_retries=0),
+        breaker=breaker,
+        hedge=False,
+    )
+    started = []
+
+    async def handler(request):
+        started.append(request.url.path)
+        if len(started) == 1:
+            await asyncio.sleep(10)
+        return httpx.Response(200, json={"success": True})
+
+    async def scenario():
+        client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client._async_client_loop = asyncio.get_running_loop()
+        breaker.record_failure()
+        now[0] = 10
+        # 半开探测在拿到响应前被取消（如 wait_for 超时、客户端断开）
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.search_items("红线"), timeout=0.05)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert await client.search_items("红线") == {"success": True}
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert len(started) == 2
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    # 上一轮半开的探测令牌在新一轮里不再生效
+    breaker.record_failure()
+    now[0] = 20
+    probe = breaker.before_call()
+    breaker.record_failure()
+    now[0] = 30
+    breaker.before_call()
+    breaker.release(probe)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_retry_delay_is_capped():
+    policy = RetryPolicy(max_retries=5, base_delay=1.0, max_delay=3.0)
+
+    assert all(0 <= policy.delay(n) <= 3.0 for n in range(10))
+
+
+def test_get_retries_then_serves_stale_cache_while_breaker_open():
+    now = [0.0]
+    client = BuffTrackerClient(
+        base_url="http://buff-tracker-api-1:8001",
+        retry_policy=RetryPolicy(max_retries=1, base_delay=0, max_delay=0),
+        breaker=CircuitBreaker("test", failure_threshold=2, reset_timeout=30),
+    )
+    client.cache = TTLCache(clock=lambda: now[0])
+    statuses = [200, 503, 503]
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(statuses.pop(0), json={"success": True, "data": [1]})
+
+    client._sync_client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    assert client.search_items_sync("红线") == {"success": True, "data": [1]}
+    now[0] = 10**6
+    assert client.search_items_sync("红线") == {"success": True, "data": [1]}
+    assert len(calls) == 3
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    assert client.search_items_sync("红线") == {"success": True, "data": [1]}
+    assert len(calls) == 3
+    stats = client.resilience_stats()
+    assert stats["retries"] == 1
+    assert stats["stale_served"] == 2
+
+
+def test_timeouts_are_not_retried_but_connect_errors_are():
+    client = BuffTrackerClient(
+        base_url="http://buff-tracker-api-1:8001",
+        retry_policy=RetryPolicy(max_retries=2, base_delay=0, max_delay=0),
+        breaker=CircuitBreaker("test", failure_threshold=10, reset_timeout=30),
+    )
+    errors = []
+
+    def handler(request):
+        error = errors.pop(0)
+        if error is None:
+            return httpx.Response(200, json={"ok": True})
+        raise error("boom", request=request)
+
+    client._sync_client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    errors[:] = [httpx.ReadTimeout, None]
+    with pytest.raises(httpx.ReadTimeout):
+        client.get_quota_sync()
+    assert errors == [None]
+
+    errors[:] = [httpx.ConnectError, None]
+    assert client.get_quota_sync() == {"ok": True}
+    assert client.resilience_stats()["retries"] == 1
+
+
+def test_proxy_stream_pipes_body_and_filters_headers():
+    client = BuffTrackerClient(base_url="http://buff-tracker-api-1:8001")
+    seen = {}
+
+    async def handler(request):
+        seen["body"] = await request.aread()
+        seen["content-length"] = request.headers.get("content-length")
+        return httpx.Response(
+            200,
+            headers={"X-Upstream": "1", "Connection": "keep-alive"},
+            content=b"x" * 1000,
+        )
+
+    async def upload():
+        yield b"ab"
+        yield b"cd"
+
+    async def scenario():
+        client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client._async_client_loop = asyncio.get_running_loop()
+        response = await client.proxy_stream(
+            "POST",
+            "items",
+            headers={"Content-Length": "4", "Host": "buffotte"},
+            body=upload(),
+        )
+        chunks = [chunk async for chunk in client.iter_stream(response, chunk_size=256)]
+        return response, chunks
+
+    response, chunks = asyncio.run(scenario())
+
+    assert seen == {"body": b"abcd", "content-length": "4"}
+    assert max(len(chunk) for chunk in chunks) <= 256
+    assert b"".join(chunks) == b"x" * 1000
+    assert client.response_headers(response.headers) == {"x-upstream": "1"}
+    assert client.pool_stats()["in_flight"] == 0
+
+
+def test_unread_proxy_stream_is_released_once():
+    client = BuffTrackerClient(base_url="http://buff-tracker-api-1:8001")
+
+    async def scenario():
+        client._async_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, content=b"x" * 10))
+        )
+        client._async_client_loop = asyncio.get_running_loop()
+        response = await client.proxy_stream("GET", "base")
+        assert client.pool_stats()["in_flight"] == 1
+        # The body is never iterated; the response background task still runs.
+        await client.release_stream(response)
+        await client.release_stream(response)
+        return response
+
+    response = asyncio.run(scenario())
+
+    assert response.is_closed
+    assert client.pool_stats()["in_flight"] == 0
+
+
+def test_quota_scheduler_admits_by_priority_reserve():
+    now = [0.0]
+    fetches = []
+    quota = {"single_remaining": 25, "single_total": 100, "base_remaining": 0, "base_total": 5}
+
+    def fetch_sync():
+        fetches.append(now[0])
+        return quota
+
+    async def fetch():
+        return fetch_sync()
+
+    scheduler = QuotaScheduler(fetch, fetch_sync, refresh_interval=30, clock=lambda: now[0])
+
+    scheduler.acquire_sync(Priority.TRACKED_REFRESH, max_wait=0)
+    with pytest.raises(QuotaDeferred):
+        scheduler.acquire_sync(Priority.INVESTIGATOR, max_wait=0)
+    with pytest.raises(QuotaDeferred):
+        scheduler.acquire_sync(Priority.BACKFILL, bucket="base", max_wait=0)
+    asyncio.run(scheduler.acquire(Priority.INTERACTIVE, bucket="base"))
+
+    stats = scheduler.stats()
+    assert len(fetches) == 1
+    assert stats["buckets"]["single"]["remaining"] == 24
+    assert stats["buckets"]["single"]["used_since_refresh"] == 1
+    assert stats["priorities"]["tracked_refresh"]["granted"] == 1
+    assert stats["priorities"]["investigator"]["rejected"] == 1
+    assert stats["priorities"]["interactive"]["granted"] == 1
+
+    quota["single_remaining"] = 90
+    now[0] = 31
+    scheduler.acquire_sync(Priority.INVESTIGATOR, max_wait=0)
+    assert len(fetches) == 2
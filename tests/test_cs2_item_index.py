@@ -0,0 +1,168 @@
+import threading
+
+import pytest
+
+import db.cs2_item_index as index_module
+from db.cs2_item_index import Cs2ItemIndex
+from db.item_kline_processor import ItemKlineProcessor
+
+ROWS = [
+    ("AK-47 | Redline (Field-Tested)", "101"),
+    ("AK-47 | Redline (Minimal Wear)", "102"),
+    ("★ Karambit | Doppler (Factory New)", "201"),
+    ("Souvenir AWP | Dragon Lore (Field-Tested)", None),
+    ("M4A4 | Neon Rider (Battle-Scarred)", "301"),
+]
+
+
+def _like(rows, text, anywhere):
+    """LIKE 'x%' / LIKE '%x%' 的参照实现（不区分大小写，取字典序最小）。"""
+    key = text.casefold()
+    matches = sorted(
+        name for name, _ in rows
+        if (key in name.casefold() if anywhere else name.casefold().startswith(key))
+    )
+    return matches[0] if matches else None
+
+
+def test_resolve_exact_prefix_and_substring():
+    index = Cs2ItemIndex(ROWS)
+
+    assert len(index) == 5
+    assert index.resolve("M4A4 | Neon Rider (Battle-Scarred)") == "M4A4 | Neon Rider (Battle-Scarred)"
+    # 前缀：补全品质后缀，多个候选取字典序最小
+    assert index.resolve("AK-47 | Redline") == "AK-47 | Redline (Field-Tested)"
+    # 包含：★ 前缀的刀具、Souvenir 前缀
+    assert index.resolve("Karambit | Doppler") == "★ Karambit | Doppler (Factory New)"
+    assert index.resolve("awp | dragon lore") == "Souvenir AWP | Dragon Lore (Field-Tested)"
+    assert index.resolve("Butterfly Knife | Fade") is None
+    assert index.contains("47") == "AK-47 | Redline (Field-Tested)"
+    assert index.resolve("") is None
+
+
+def test_index_matches_like_semantics_for_all_substrings():
+    index = Cs2ItemIndex(ROWS)
+    for name, _ in ROWS:
+        for start in range(0, len(name), 3):
+            for end in range(start + 1, len(name) + 1, 4):
+                text = name[start:end]
+                assert index.prefix(text) == _like(ROWS, text, anywhere=False)
+                assert index.contains(text) == _like(ROWS, text, anywhere=True)
+
+
+class _FakeConn:
+    """只回答 COUNT/MAX(id) 与单行 c5_id 查询的假连接。"""
+
+    def __init__(self, rows, queries):
+        self.rows = rows
+        self.queries = queries
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.queries.append(sql)
+        self._params = params
+        self._sql = sql
+
+    def fetchone(self):
+        if "COUNT(*)" in self._sql:
+            return len(self.rows), len(self.rows)
+        return next((row for row in self.rows if row[0] == self._params[0]), None)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fresh_index(monkeypatch):
+    for name, value in [("_index", None), ("_loader", None), ("_failures", 0),
+                        ("_next_attempt_at", 0.0), ("_next_miss_check_at", 0.0)]:
+        monkeypatch.setattr(index_module, name, value)
+
+
+def _wait_for_loader():
+    if index_module._loader is not None:
+        index_module._loader.join(timeout=5)
+
+
+def test_c5_id_lookup_falls_back_to_db_for_items_synced_elsewhere(monkeypatch, fresh_index):
+    loads, queries = [], []
+
+    def fake_load(conn=None):
+        loads.append(conn)
+        return Cs2ItemIndex(ROWS[:3], signature=(3, 3))
+
+    monkeypatch.setattr(index_module, "load_index", fake_load)
+    monkeypatch.setattr(index_module, "_get_db_connection", lambda: _FakeConn(ROWS, queries))
+    processor = ItemKlineProcessor()
+
+    # 首次查找不等待加载：回查一行，后台线程加载索引
+    assert processor.get_item_id_from_db("AK-47 | Redline (Field-Tested)") == "101"
+    _wait_for_loader()
+    assert len(loads) == 1 and len(queries) == 1
+
+    assert processor.get_item_id_from_db("ak-47 | redline (field-tested)") == "101"
+    assert len(queries) == 1  # 命中内存索引
+
+    # 另一个进程同步的新饰品：回查一次后记入索引
+    assert processor.get_item_id_from_db("M4A4 | Neon Rider (Battle-Scarred)") == "301"
+    assert processor.get_item_id_from_db("m4a4 | neon rider (battle-scarred)") == "301"
+    assert processor.get_item_id_from_db("Souvenir AWP | Dragon Lore (Field-Tested)") is None
+    assert processor.get_item_id_from_db("Butterfly Knife | Fade (Factory New)") is None
+    assert len(queries) == 4
+    assert len(loads) == 1
+
+
+def test_stale_index_reloads_in_background_and_backs_off_on_failure(monkeypatch, fresh_index):
+    release = threading.Event()
+    calls = []
+
+    def slow_failing_load(conn=None):
+        calls.append(conn)
+        release.wait(timeout=5)
+        raise RuntimeError("db down")
+
+    old = Cs2ItemIndex(ROWS)
+    old.loaded_at -= 10
+    monkeypatch.setattr(index_module, "_index", old)
+    monkeypatch.setattr(index_module, "load_index", slow_failing_load)
+
+    # 过期后立即返回旧索引，只启动一个后台加载
+    assert index_module.get_index(ttl_seconds=1) is old
+    assert index_module.get_index(ttl_seconds=1) is old
+    release.set()
+    _wait_for_loader()
+    assert len(calls) == 1
+
+    # 加载失败后退避期内不再重试，继续使用旧索引
+    assert index_module.get_index(ttl_seconds=1) is old
+    _wait_for_loader()
+    assert len(calls) == 1
+    assert index_module._next_attempt_at > 0
+
+
+def test_resolve_miss_reloads_when_table_has_new_rows(monkeypatch, fresh_index):
+    queries = []
+    loaded = [Cs2ItemIndex(ROWS[:3], signature=(3, 3)), Cs2ItemIndex(ROWS, signature=(5, 5))]
+    monkeypatch.setattr(index_module, "load_index", lambda conn=None: loaded.pop(0))
+    monkeypatch.setattr(index_module, "_get_db_connection", lambda: _FakeConn(ROWS, queries))
+
+    assert index_module.resolve_name("AK-47 | Redline") == "AK-47 | Redline (Field-Tested)"
+    assert queries == []
+
+    assert index_module.resolve_name("Neon Rider") is None
+    _wait_for_loader()
+    assert len(queries) == 1  # 只查了 COUNT/MAX(id)
+    assert index_module.resolve_name("Neon Rider") == "M4A4 | Neon Rider (Battle-Scarred)"
+
+    # 签名一致时不重新加载，且检查有最小间隔
+    assert index_module.resolve_name("Butterfly Knife") is None
+    assert index_module.resolve_name("Butterfly Knife") is None
+    assert len(queries) == 1
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from models.feature_store import FeatureStore
+from models.item_price_predictor import _build_features
+
+_FEATURE_COLS = [
+    "price", "buy_price", "sell_count", "buy_count", "turnover", "volume",
+    "close_lag_7", "close_lag_14", "close_lag_30",
+    "close_rolling_mean_7", "close_rolling_std_7", "volume_rolling_mean_7",
+    "close_rolling_mean_14", "close_rolling_std_14", "volume_rolling_mean_14",
+    "close_rolling_mean_30", "close_rolling_std_30", "volume_rolling_mean_30",
+    "spread", "spread_ratio", "supply_demand_ratio", "day_of_week", "month",
+]
+
+
+def _synthetic_kline(days: int, start: int = 1_700_000_000) -> pd.DataFrame:
+    rng = np.random.default_rng(11)
+    price = 100 + np.cumsum(rng.normal(0, 1, days))
+    price[5] = 0.0  # 无效行，两边都应跳过
+    return pd.DataFrame(
+        {
+            "timestamp": start + np.arange(days) * 86400,
+            "price": price,
+            "buy_price": price * 0.97,
+            "sell_count": rng.integers(50, 150, days).astype(float),
+            "buy_count": rng.integers(20, 80, days).astype(float),
+            "turnover": price * 10,
+            "volume": rng.integers(5, 30, days).astype(float),
+            "total_count": 1000.0,
+        }
+    )
+
+
+def _expected_row(kline: pd.DataFrame) -> np.ndarray:
+    # _build_features 会丢弃没有 target 的最后 7 行，补 7 行占位后取原最后一行
+    pad = kline.tail(7).copy()
+    pad["timestamp"] += 7 * 86400
+    feats = _build_features(pd.concat([kline, pad], ignore_index=True))
+    row = feats[feats["timestamp"] == kline["timestamp"].iloc[-1]]
+    return row[_FEATURE_COLS].to_numpy(dtype=np.float64)
+
+
+def test_incremental_updates_match_pandas_features():
+    kline = _synthetic_kline(200)
+    store = FeatureStore()
+
+    # 冷启动
+    vector = store.latest_vector("AK", kline.iloc[:120], _FEATURE_COLS)
+    np.testing.assert_allclose(vector, _expected_row(kline.iloc[:120]), rtol=1e-9)
+
+    # 逐行增量推进，每一步都与 pandas 全量重算一致
+    for end in range(121, 201):
+        vector = store.latest_vector("AK", kline.iloc[:end], _FEATURE_COLS)
+        np.testing.assert_allclose(vector, _expected_row(kline.iloc[:end]), rtol=1e-9)
+
+    assert store.stats()["warm_starts"] == 1
+    assert vector.shape == (1, len(_FEATURE_COLS))
+
+
+def test_rewritten_latest_row_and_short_history():
+    kline = _synthetic_kline(80)
+    store = FeatureStore()
+    store.sync("AK", kline)
+
+    revised = kline.copy()
+    revised.loc[revised.index[-1], ["price", "volume"]] = [123.0, 99.0]
+    vector = store.latest_vector("AK", revised, _FEATURE_COLS)
+    np.testing.assert_allclose(vector, _expected_row(revised), rtol=1e-9)
+
+    # 历史不足 31 天时窗口未填满
+    assert store.latest_vector("M4A4", kline.iloc[:20], _FEATURE_COLS) is None
@@ -0,0 +1,108 @@
+import models.global_price_model as global_module
+import models.item_price_predictor as predictor_module
+from models.benchmark import synthetic_item_kline
+from models.global_price_model import GLOBAL_MODEL_KEY, GlobalPriceModel, parse_item_name
+from models.item_price_predictor import ItemPricePredictor
+from models.model_cache import ModelCache
+from models.model_registry import ModelRegistry
+
+
+def _offline_attributes(names):
+    return {name: {**parse_item_name(name), "weapon_type": None, "rarity": None} for name in names}
+
+
+def test_parse_item_name():
+    assert parse_item_name("StatTrak™ AK-47 | Redline (Field-Tested)") == {
+        "category": "weapon",
+        "weapon": "AK-47",
+        "exterior": "Field-Tested",
+        "is_stattrak": 1.0,
+        "is_souvenir": 0.0,
+        "is_star": 0.0,
+    }
+    assert parse_item_name("★ Sport Gloves | Vice (Minimal Wear)")["category"] == "glove"
+    assert parse_item_name("★ Karambit | Doppler (Factory New)")["category"] == "knife"
+    assert parse_item_name("Sticker | Crown (Foil)")["category"] == "sticker"
+    assert parse_item_name("Recoil Case")["category"] == "container"
+
+
+def test_global_model_predicts_new_items_in_one_batch(tmp_path, monkeypatch):
+    names = [f"AK-47 | Skin {i} (Field-Tested)" for i in range(6)]
+    klines = {name: synthetic_item_kline(200, seed=i) for i, name in enumerate(names)}
+    registry = ModelRegistry(str(tmp_path))
+    entry = GlobalPriceModel(registry).train(klines, _offline_attributes(names), num_threads=1)
+    assert entry.market_hash_name == GLOBAL_MODEL_KEY
+    assert "weapon" in entry.params["vocab"]
+
+    # 只有 5 天数据的新饰品，单饰品模型无法训练，但全局模型可以预测
+    new_item = "M4A4 | New Skin (Minimal Wear)"
+    klines[new_item] = synthetic_item_kline(5, seed=99)
+    monkeypatch.setattr(global_module, "load_item_attributes", _offline_attributes)
+    monkeypatch.setattr(
+        predictor_module, "_fetch_klines_bulk", lambda names, limit=500: {n: klines[n] for n in names}
+    )
+    monkeypatch.setattr(predictor_module, "_model_cache", ModelCache())
+
+    predictor = ItemPricePredictor(registry, mode="hybrid")
+    trained = []
+    original_train = predictor.train_for_item
+    monkeypatch.setattr(
+        predictor, "train_for_item", lambda name, *args: trained.append(name) or original_train(name, *args)
+    )
+    results = predictor.batch_predict_range([names[0], new_item])
+
+    # 历史足够的饰品仍训练单饰品模型，只有新饰品走全局模型
+    assert trained == [names[0]]
+    for name in (names[0], new_item):
+        current = float(klines[name]["price"].iloc[-1])
+        assert results[name]["predicted"] > 0
+        assert abs(results[name]["predicted"] / current - 1) < 0.5
+        assert results[name]["as_of"] == int(klines[name]["timestamp"].max())
+
+
+def test_hybrid_retrains_outdated_item_models_when_global_exists(tmp_path, monkeypatch):
+    name = "AK-47 | Skin 0 (Field-Tested)"
+    kline = {"df": synthetic_item_kline(120, seed=0)}
+    registry = ModelRegistry(str(tmp_path))
+    GlobalPriceModel(registry).train(
+        {f"AK-47 | Skin {i} (Field-Tested)": synthetic_item_kline(200, seed=i) for i in range(6)},
+        _offline_attributes([f"AK-47 | Skin {i} (Field-Tested)" for i in range(6)]),
+        num_threads=1,
+    )
+    monkeypatch.setattr(global_module, "load_item_attributes", _offline_attributes)
+    monkeypatch.setattr(
+        predictor_module, "_latest_kline_timestamp", lambda n: int(kline["df"]["timestamp"].max())
+    )
+    monkeypatch.setattr(predictor_module, "_model_cache", ModelCache())
+    predictor = ItemPricePredictor(registry, mode="hybrid")
+
+    predictor._predict_range(name, kline["df"])
+    first = registry.load(name)
+    assert first is not None
+
+    # 水位线之后来了新 K 线：单饰品模型重训，而不是悄悄切换到全局模型
+    kline["df"] = synthetic_item_kline(121, seed=0)
+    predictor._predict_range(name, kline["df"])
+    assert registry.load(name).watermark == int(kline["df"]["timestamp"].max()) > first.watermark
+
+
+def test_global_features_use_full_history_at_inference():
+    name = "AK-47 | Redline (Field-Tested)"
+    kline = synthetic_item_kline(300, seed=3)
+    attributes = _offline_attributes([name])
+
+    [(_, row)], _ = GlobalPriceModel._latest_rows({name: kline}, attributes)
+    full = global_module.build_global_features(kline, attributes[name]).iloc[[-1]]
+
+    assert row["history_days"].iloc[0] == 300.0
+    assert row.equals(full)
+
+
+def test_per_item_mode_ignores_global_model(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    names = [f"AK-47 | Skin {i} (Field-Tested)" for i in range(3)]
+    klines = {name: synthetic_item_kline(150, seed=i) for i, name in enumerate(names)}
+    GlobalPriceModel(registry).train(klines, _offline_attributes(names), num_threads=1)
+
+    assert ItemPricePredictor(registry, mode="per_item")._global_model() is None
+    assert ItemPricePredictor(registry, mode="hybrid")._global_model() is not None
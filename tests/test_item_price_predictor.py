@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+
+import models.item_price_predictor as predictor_module
+import models.model_registry as model_registry_module
+from models.item_price_predictor import ItemPricePredictor
+from models.model_cache import ModelCache
+from models.model_registry import ModelRegistry, RegisteredModel
+
+
+def _synthetic_kline(days: int, start: int = 1_700_000_000) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    price = 100 + np.cumsum(rng.normal(0, 1, days))
+    return pd.DataFrame(
+        {
+            "timestamp": start + np.arange(days) * 86400,
+            "price": price,
+            "buy_price": price * 0.97,
+            "sell_count": rng.integers(50, 150, days).astype(float),
+            "buy_count": rng.integers(20, 80, days).astype(float),
+            "turnover": price * 10,
+            "volume": rng.integers(5, 30, days).astype(float),
+            "total_count": 1000.0,
+        }
+    )
+
+
+def test_registry_reuses_model_until_new_rows_pass_watermark(tmp_path, monkeypatch):
+    kline = {"df": _synthetic_kline(120)}
+    monkeypatch.setattr(
+        predictor_module, "_fetch_item_kline", lambda name, limit=500: kline["df"].tail(limit)
+    )
+    monkeypatch.setattr(
+        predictor_module, "_latest_kline_timestamp", lambda name: int(kline["df"]["timestamp"].max())
+    )
+    monkeypatch.setattr(predictor_module, "_model_cache", ModelCache())
+
+    registry = ModelRegistry(str(tmp_path))
+    predictor = ItemPricePredictor(registry=registry)
+    trained = []
+    original_train = predictor.train_for_item
+    predictor.train_for_item = lambda name, **kwargs: trained.append(name) or original_train(
+        name, **kwargs
+    )
+
+    first = predictor.predict_7d_price("AK-47 | Redline (Field-Tested)")
+    assert first is not None
+    assert trained == ["AK-47 | Redline (Field-Tested)"]
+
+    # 新 worker：空的进程内缓存，直接从磁盘加载，不重训
+    monkeypatch.setattr(predictor_module, "_model_cache", ModelCache())
+    fresh = ItemPricePredictor(registry=ModelRegistry(str(tmp_path)))
+    assert fresh.predict_7d_price("AK-47 | Redline (Field-Tested)") == first
+    entry = predictor_module._model_cache.get("AK-47 | Redline (Field-Tested)")
+    assert entry.watermark == int(kline["df"]["timestamp"].max())
+    assert entry.trained_at > 0
+    assert "val_rmse" in entry.metrics
+
+    kline["df"] = _synthetic_kline(121)
+    predictor.predict_7d_price("AK-47 | Redline (Field-Tested)")
+    assert len(trained) == 2
+
+
+def test_model_cache_evicts_by_bytes_and_expires_by_ttl():
+    now = [1000.0]
+
+    def entry(trained_at):
+        return RegisteredModel(
+            market_hash_name="x", booster=None, feature_cols=[], watermark=0, trained_at=trained_at
+        )
+
+    cache = ModelCache(
+        max_entries=10, max_bytes=250, ttl_seconds=60, clock=lambda: now[0], sizer=lambda e: 100
+    )
+    cache.put("a", entry(1000))
+    cache.put("b", entry(1000))
+    assert cache.get("a") is not None
+    cache.put("c", entry(1000))
+
+    assert "b" not in cache
+    assert cache.stats()["bytes"] == 200
+
+    now[0] = 1061
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+    assert stats["avg_bytes_per_booster"] == 100
+
+
+def test_batch_predict_trains_missing_models_with_split_thread_budget(tmp_path, monkeypatch):
+    frames = {"a": _synthetic_kline(90), "b": _synthetic_kline(100), "c": _synthetic_kline(10)}
+    monkeypatch.setattr(
+        predictor_module, "_fetch_item_kline", lambda name, limit=500: frames[name].tail(limit)
+    )
+    bulk_loads = []
+
+    def fake_bulk(names, limit=500):
+        bulk_loads.append(list(names))
+        return {name: frames[name].tail(limit) for name in names}
+
+    monkeypatch.setattr(predictor_module, "_fetch_klines_bulk", fake_bulk)
+    monkeypatch.setattr(
+        predictor_module, "_latest_kline_timestamp", lambda name: int(frames[name]["timestamp"].max())
+    )
+    monkeypatch.setattr(predictor_module, "_model_cache", ModelCache())
+    monkeypatch.setenv("LGBM_NUM_THREADS", "4")
+
+    predictor = ItemPricePredictor(registry=ModelRegistry(str(tmp_path)))
+    thread_counts = []
+    original_train = predictor.train_for_item
+
+    def tracking_train(name, num_threads=None, kline=None):
+        thread_counts.append(num_threads)
+        return original_train(name, num_threads, kline)
+
+    predictor.train_for_item = tracking_train
+
+    results = predictor.batch_predict(["a", "b", "c", "a"])
+
+    assert bulk_loads == [["a", "b", "c"]]
+    assert set(results) == {"a", "b", "c"}
+    assert results["c"] is None
+    # c 只有 10 天数据，不再尝试训练单饰品模型；4 线程预算分给 2 个训练任务
+    assert thread_counts == [2, 2]
+    assert results["a"] == predictor.predict_7d_price("a")
+    assert results["b"] == predictor.predict_7d_price("b")
+    assert len(thread_counts) == 2
+
+    ranges = predictor.batch_predict_range(["a"])
+    assert ranges["a"] == predictor.predict_7d_price_range("a")
+    assert ranges["a"]["lower"] <= ranges["a"]["predicted"] <= ranges["a"]["upper"]
+
+
+def test_registry_publishes_versions_without_a_missing_window(tmp_path, monkeypatch):
+    import json
+    import lightgbm as lgb
+    import threading
+
+    rng = np.random.default_rng(0)
+    booster = lgb.train(
+        {"objective": "regression", "verbose": -1},
+        lgb.Dataset(rng.normal(size=(50, 2)), rng.normal(size=50)),
+        num_boost_round=2,
+    )
+    name = "AK-47 | Redline (Field-Tested)"
+    item_dir = tmp_path / ModelRegistry._key(name)
+
+    # 旧布局：model.txt / meta.json 直接位于饰品目录，仍可读取
+    item_dir.mkdir()
+    booster.save_model(str(item_dir / "model.txt"))
+    (item_dir / "meta.json").write_text(json.dumps(
+        {"feature_cols": ["a", "b"], "watermark": 1, "trained_at": 1.0}
+    ))
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.load(name).watermark == 1
+
+    # 两个“进程”并发发布新版本，读者在整个过程中始终能读到完整模型
+    writers = [ModelRegistry(str(tmp_path)) for _ in range(2)]
+    stop = threading.Event()
+    misses = []
+
+    def read():
+        while not stop.is_set():
+            if registry.load(name) is None:
+                misses.append(1)
+
+    def write(writer):
+        for i in range(10):
+            writer.save(name, booster, ["a", "b"], watermark=100 + i)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    threads = [threading.Thread(target=write, args=(w,)) for w in writers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stop.set()
+    reader.join()
+
+    assert misses == []
+    entry = registry.load(name)
+    assert entry.version == registry.version_of(name)
+    assert entry.watermark == 109
+    # 刚被取代的版本在宽限期内保留
+    versions = [p.name for p in item_dir.iterdir() if p.name.startswith("v-")]
+    assert len(versions) == 20
+    assert not (item_dir / "meta.json").exists()
+
+    monkeypatch.setattr(model_registry_module, "_PRUNE_GRACE_SECONDS", 0)
+    latest = registry.save(name, booster, ["a", "b"], watermark=200)
+    versions = [p.name for p in item_dir.iterdir() if p.name.startswith("v-")]
+    assert latest.version in versions and len(versions) <= 3
+    assert registry.load(name).watermark == 200
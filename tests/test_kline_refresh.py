@@ -0,0 +1,92 @@
+import asyncio
+
+import api
+
+
+def test_schedule_kline_refresh_deduplicates_in_flight_tasks(monkeypatch):
+    calls = []
+
+    async def fake_fetch(name, priority=None):
+        calls.append(name)
+        await asyncio.sleep(0.01)
+        return [{"timestamp": 1}]
+
+    monkeypatch.setattr(api, "_fetch_and_store_kline_via_bufftracker", fake_fetch)
+
+    async def scenario():
+        first = api._schedule_kline_refresh("AK-47 | Redline")
+        second = api._schedule_kline_refresh("AK-47 | Redline")
+        assert first is second
+        assert api._is_kline_refreshing("AK-47 | Redline")
+        await first
+        await asyncio.sleep(0)
+        assert not api._is_kline_refreshing("AK-47 | Redline")
+
+    asyncio.run(scenario())
+    assert calls == ["AK-47 | Redline"]
+
+
+def test_stale_cache_returns_immediately_and_refreshes_in_background(monkeypatch):
+    started = []
+
+    async def fake_fetch(name, priority=None):
+        started.append(name)
+        await asyncio.sleep(0.01)
+        return []
+
+    monkeypatch.setattr(api, "_fetch_and_store_kline_via_bufftracker", fake_fetch)
+    monkeypatch.setattr(
+        api.item_kline_processor,
+        "get_cached_kline_data",
+        lambda name: ([{"timestamp": 1, "price": 10}], "2020-01-01T00:00:00"),
+    )
+
+    async def scenario():
+        result = await api.refresh_item_kline("AK-47 | Redline")
+        assert result["stale"] is True
+        assert result["refreshing"] is True
+        assert result["source"] == "cache"
+        assert result["version"] == "2020-01-01T00:00:00"
+
+        unchanged = await api.get_cached_item_kline(
+            "AK-47 | Redline", version="2020-01-01T00:00:00"
+        )
+        assert unchanged["not_modified"] is True
+        assert unchanged["data"] == []
+        await asyncio.gather(*(task for task, _ in api._kline_refresh_tasks.values()))
+
+    asyncio.run(scenario())
+    assert started == ["AK-47 | Redline"]
+
+
+def test_interactive_refresh_does_not_wait_on_deferred_tracked_refresh(monkeypatch):
+    calls = []
+    release = None
+
+    async def fake_fetch(name, priority=None):
+        calls.append(priority)
+        if priority != api.Priority.INTERACTIVE:
+            # 配额不足：追踪刷新一直等待准入，最终被推迟放弃
+            await release.wait()
+            return []
+        return [{"timestamp": 1, "price": 10}]
+
+    monkeypatch.setattr(api, "_fetch_and_store_kline_via_bufftracker", fake_fetch)
+    monkeypatch.setattr(api.item_kline_processor, "get_cached_kline_data", lambda name: ([], None))
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        tracked = api._schedule_kline_refresh("AK-47 | Redline")
+        await asyncio.sleep(0)
+
+        result = await asyncio.wait_for(api.refresh_item_kline("AK-47 | Redline", wait=True), 1)
+        assert result["source"] == "api"
+        assert result["data"] == [{"timestamp": 1, "price": 10}]
+        assert not tracked.done()
+
+        release.set()
+        await tracked
+
+    asyncio.run(scenario())
+    assert calls == [api.Priority.TRACKED_REFRESH, api.Priority.INTERACTIVE]
@@ -0,0 +1,102 @@
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from llm.clients.llm_client import LLMClient, ResponseCache, cache_key
+
+
+class _FakeCompletions:
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = self.replies.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _client(tmp_path, replies, **cache_kwargs):
+    completions = _FakeCompletions(replies)
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    cache = ResponseCache(str(tmp_path), **cache_kwargs)
+    return LLMClient(model="flash", cache=cache, client=fake), completions
+
+
+MESSAGES = [{"role": "user", "content": "同一批新闻"}]
+
+
+def test_cache_key_covers_model_messages_and_params():
+    base = cache_key("flash", MESSAGES, {"temperature": 0.1})
+    assert base == cache_key("flash", MESSAGES, {"temperature": 0.1})
+    assert base != cache_key("pro", MESSAGES, {"temperature": 0.1})
+    assert base != cache_key("flash", MESSAGES, {"temperature": 0.7})
+    assert base != cache_key("flash", [{"role": "user", "content": "另一批"}], {"temperature": 0.1})
+
+
+def test_repeated_prompt_is_served_from_cache(tmp_path):
+    client, completions = _client(tmp_path, ["第一次"])
+
+    assert client.chat(MESSAGES, temperature=0.1) == "第一次"
+    assert client.chat(MESSAGES, temperature=0.1) == "第一次"
+    # 另起一个客户端（如重跑进程）也命中磁盘缓存
+    other = LLMClient(model="flash", cache=ResponseCache(str(tmp_path)), client=SimpleNamespace())
+    assert other.chat(MESSAGES, temperature=0.1) == "第一次"
+
+    assert len(completions.calls) == 1
+    assert client.cache.stats()["hits"] == 1
+
+
+def test_unparseable_reply_is_not_cached(tmp_path):
+    client, completions = _client(tmp_path, ["不是 JSON", "[1, 2]"])
+
+    with pytest.raises(ValueError):
+        client.chat(MESSAGES, parse=json.loads)
+    assert client.chat(MESSAGES, parse=json.loads) == [1, 2]
+    assert client.chat(MESSAGES, parse=json.loads) == [1, 2]
+    assert len(completions.calls) == 2
+
+
+def test_expired_and_too_old_entries_are_refetched(tmp_path):
+    client, completions = _client(tmp_path, ["旧", "新", "更新"], ttl_seconds=60)
+    client.chat(MESSAGES)
+
+    path = client.cache._path(cache_key("flash", MESSAGES, {}))
+    with open(path, encoding="utf-8") as f:
+        entry = json.load(f)
+    entry["created_at"] = time.time() - 30
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+
+    assert client.chat(MESSAGES) == "旧"
+    assert client.chat(MESSAGES, max_age=10) == "新"
+
+    entry["created_at"] = time.time() - 120
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    assert client.chat(MESSAGES) == "更新"
+    assert len(completions.calls) == 3
+
+
+def test_size_bound_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=2000)
+    for i in range(10):
+        cache.set(f"{i:02d}" + "0" * 62, "x" * 300)
+        path = cache._path(f"{i:02d}" + "0" * 62)
+        os.utime(path, (i, i))
+
+    total = sum(size for _, size, _ in cache._entries())
+    assert total <= 2000
+    assert cache.get("09" + "0" * 62) == "x" * 300
+    assert cache.get("00" + "0" * 62) is None
+    assert cache.stats()["evicted"] > 0
+
+
+def test_zero_ttl_disables_cache(tmp_path):
+    client, completions = _client(tmp_path, ["a", "b"], ttl_seconds=0)
+    assert client.chat(MESSAGES) == "a"
+    assert client.chat(MESSAGES) == "b"
+    assert not os.listdir(tmp_path)
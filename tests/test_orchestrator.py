@@ -0,0 +1,279 @@
+import asyncio
+import time
+
+import llm.agents.scout_agent as scout_module
+import llm.orchestrator as orchestrator
+from llm.agents.scout_agent import ScoutAgent
+
+TOPICS = [
+    {"name": "slow", "prompt": "slow"},
+    {"name": "fast", "prompt": "fast"},
+    {"name": "hang", "prompt": "hang"},
+]
+DELAYS = {"slow": 0.3, "fast": 0.05, "hang": 5.0}
+
+
+class _FakeResponses:
+    def __init__(self, log):
+        self.log = log
+        self.active = 0
+        self.peak = 0
+
+    async def create(self, **kwargs):
+        topic = kwargs["input"][0]["content"]
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(DELAYS[topic])
+        finally:
+            self.active -= 1
+        self.log.append(("searched", topic))
+        return topic
+
+
+class _FakeAsyncOpenAI:
+    instances = []
+
+    def __init__(self, **kwargs):
+        self.responses = _FakeResponses(self.log)
+        _FakeAsyncOpenAI.instances.append(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeParser:
+    def __init__(self, log):
+        self.log = log
+
+    def parse(self, result):
+        self.log.append(("parsed", result["topic"]))
+        return {"entities": [{"cn_name": result["topic"]}], "tasks_created": 1}
+
+
+def _make_scout(monkeypatch, log):
+    monkeypatch.setenv("ARK_API_KEY", "test")
+    _FakeAsyncOpenAI.log = log
+    monkeypatch.setattr(scout_module, "AsyncOpenAI", _FakeAsyncOpenAI)
+    scout = ScoutAgent(model="flash")
+    monkeypatch.setattr(
+        scout, "_build_result",
+        lambda response, topic: {"topic": topic["name"], "reference_count": 2, "health": {"is_healthy": True}},
+    )
+    monkeypatch.setattr(scout, "process_to_db", lambda result: log.append(("stored", result["topic"])))
+    return scout
+
+
+def test_topics_are_searched_concurrently_and_parsed_as_they_finish(monkeypatch):
+    log = []
+    scout = _make_scout(monkeypatch, log)
+    scout_stats = {"topics_searched": 0, "failed": 0, "total_references": 0, "db_errors": 0}
+    parser_stats = {"total_entities": 0, "total_tasks_created": 0, "errors": 0}
+
+    started = time.monotonic()
+    results = asyncio.run(orchestrator._scout_and_parse(
+        scout, _FakeParser(log), TOPICS, scout_stats, parser_stats,
+        concurrency=3, timeout=1.0, max_tool_calls=3, limit=10,
+    ))
+    elapsed = time.monotonic() - started
+
+    # 三个话题同时在飞，超时的话题不拖住整体
+    assert _FakeAsyncOpenAI.instances[-1].responses.peak == 3
+    assert elapsed < 2.0
+    assert [r["topic"] for r in results] == ["fast", "slow", "hang"]
+    assert "error" in results[-1]
+    # 先完成的话题在慢话题搜索结束之前就已经入库并解析
+    assert log.index(("parsed", "fast")) < log.index(("searched", "slow"))
+    assert scout_stats == {"topics_searched": 2, "failed": 1, "total_references": 4, "db_errors": 0}
+    assert parser_stats == {"total_entities": 2, "total_tasks_created": 2, "errors": 0}
+
+
+def test_db_error_on_one_topic_does_not_stop_the_others(monkeypatch):
+    log = []
+    scout = _make_scout(monkeypatch, log)
+
+    def flaky_store(result):
+        if result["topic"] == "fast":
+            raise RuntimeError("db down")
+        log.append(("stored", result["topic"]))
+
+    monkeypatch.setattr(scout, "process_to_db", flaky_store)
+    scout_stats = {"topics_searched": 0, "failed": 0, "total_references": 0, "db_errors": 0}
+    parser_stats = {"total_entities": 0, "total_tasks_created": 0, "errors": 0}
+
+    results = asyncio.run(orchestrator._scout_and_parse(
+        scout, _FakeParser(log), TOPICS[:2], scout_stats, parser_stats,
+        concurrency=2, timeout=1.0, max_tool_calls=3, limit=10,
+    ))
+
+    assert [r["topic"] for r in results] == ["fast", "slow"]
+    assert ("stored", "slow") in log and ("parsed", "slow") in log
+    assert scout_stats["db_errors"] == 1
+    assert scout_stats["topics_searched"] == 2
+
+
+def test_concurrency_cap_limits_in_flight_searches(monkeypatch):
+    log = []
+    scout = _make_scout(monkeypatch, log)
+
+    async def collect():
+        return [r async for r in scout.iter_search_results(TOPICS[:2], concurrency=1, timeout=1.0)]
+
+    results = asyncio.run(collect())
+    assert _FakeAsyncOpenAI.instances[-1].responses.peak == 1
+    assert [r["topic"] for r in results] == ["slow", "fast"]
+
+
+class _StreamingScout:
+    def __init__(self, log):
+        self.log = log
+
+    async def iter_search_results(self, topics, **kwargs):
+        for topic in topics:
+            await asyncio.sleep(0.1)
+            self.log.append(("searched", topic["name"]))
+            yield {"topic": topic["name"], "reference_count": 1, "health": {"is_healthy": False}}
+
+    def process_to_db(self, result):
+        raise AssertionError("unhealthy results are not stored")
+
+
+class _StreamingParser:
+    def __init__(self, log):
+        self.log = log
+        self.next_id = 0
+
+    def parse(self, result):
+        tasks = []
+        for _ in range(2):
+            self.next_id += 1
+            tasks.append({"id": self.next_id, "skin_entity_id": self.next_id, "priority": 5})
+        self.log.append(("parsed", result["topic"]))
+        return {"entities": [{}, {}], "tasks_created": len(tasks), "tasks": tasks}
+
+
+class _FakeTaskProc:
+    def __init__(self, taken=()):
+        self.taken = set(taken)
+
+    def claim_tasks(self, limit):
+        return [{"id": 100 + i, "skin_entity_id": 100 + i} for i in range(limit)]
+
+    def claim_tasks_by_ids(self, task_ids):
+        return [{"id": i, "skin_entity_id": i} for i in task_ids if i not in self.taken]
+
+
+class _StreamingInvestigator:
+    workers = 2
+
+    def __init__(self, log, batch_size, taken=()):
+        self.log = log
+        self.batch_size = batch_size
+        self.task_proc = _FakeTaskProc(taken)
+
+    def session(self):
+        from contextlib import nullcontext
+        return nullcontext((self.task_proc, None, None))
+
+    def claim_tasks(self, task_proc, limit):
+        return task_proc.claim_tasks(limit)
+
+    def claim_tasks_by_ids(self, task_proc, task_ids):
+        return task_proc.claim_tasks_by_ids(task_ids)
+
+    def rate_limiter(self):
+        return None
+
+    async def investigate_batch(self, tasks, procs, stats, limiter=None):
+        records = []
+        for task in tasks:
+            await asyncio.sleep(0.01)
+            self.log.append(("investigated", task["id"]))
+            stats["succeeded"] += 1
+            records.append({"task_id": task["id"], "outcome": "done"})
+        return records
+
+
+def _streaming_stats():
+    return {
+        "scout": {"topics_searched": 0, "failed": 0, "total_references": 0, "db_errors": 0},
+        "parser": {"total_entities": 0, "total_tasks_created": 0, "errors": 0},
+        "investigator": {"total": 0, "succeeded": 0, "failed": 0, "skipped": 0,
+                         "deferred": 0, "left_pending": 0, "claimed_elsewhere": 0},
+    }
+
+
+def _run_streaming(log, batch_size, topics, taken=()):
+    stats = _streaming_stats()
+    asyncio.run(orchestrator._run_streaming(
+        _StreamingScout(log), _StreamingParser(log), _StreamingInvestigator(log, batch_size, taken),
+        topics, stats, concurrency=3, timeout=1.0, max_tool_calls=3, limit=10,
+    ))
+    return stats
+
+
+def test_streaming_investigates_first_topic_while_later_topics_search():
+    log = []
+    topics = [{"name": f"t{i}"} for i in range(3)]
+
+    stats = _run_streaming(log, batch_size=5, topics=topics)
+
+    assert log.index(("investigated", 1)) < log.index(("searched", "t2"))
+    investigated = [entry[1] for entry in log if entry[0] == "investigated"]
+    # 预算 5：流内 6 个任务调查前 5 个，第 6 个保持 pending
+    assert investigated == [1, 2, 3, 4, 5]
+    assert stats["investigator"]["left_pending"] == 1
+    assert stats["parser"]["total_tasks_created"] == 6
+    for stage in ("scout", "parser", "investigator"):
+        assert set(stats[stage]["stage"]) == {
+            "processed", "busy_seconds", "blocked_seconds", "active_seconds", "throughput_per_min"
+        }
+    assert stats["scout"]["stage"]["processed"] == 3
+    assert stats["investigator"]["stage"]["processed"] == 5
+
+
+def test_streaming_fills_remaining_budget_from_backlog():
+    log = []
+
+    stats = _run_streaming(log, batch_size=4, topics=[{"name": "only"}])
+
+    investigated = [entry[1] for entry in log if entry[0] == "investigated"]
+    assert investigated == [1, 2, 100, 101]
+    assert stats["investigator"]["succeeded"] == 4
+    assert stats["investigator"]["total"] == 4
+
+
+def test_streaming_skips_tasks_claimed_by_another_investigator():
+    log = []
+
+    stats = _run_streaming(log, batch_size=2, topics=[{"name": "only"}], taken={1})
+
+    investigated = [entry[1] for entry in log if entry[0] == "investigated"]
+    assert investigated == [2, 100]
+    assert stats["investigator"]["claimed_elsewhere"] == 1
+
+
+class _FailingStoreScout(_StreamingScout):
+    async def iter_search_results(self, topics, **kwargs):
+        async for result in super().iter_search_results(topics, **kwargs):
+            yield {**result, "health": {"is_healthy": True}}
+
+    def process_to_db(self, result):
+        raise RuntimeError("db down")
+
+
+def test_streaming_db_error_does_not_stop_the_scout_stage():
+    log = []
+    stats = _streaming_stats()
+    asyncio.run(orchestrator._run_streaming(
+        _FailingStoreScout(log), _StreamingParser(log), _StreamingInvestigator(log, 10),
+        [{"name": "t0"}, {"name": "t1"}], stats,
+        concurrency=3, timeout=1.0, max_tool_calls=3, limit=10,
+    ))
+
+    assert stats["scout"]["db_errors"] == 2
+    assert "error" not in stats["scout"]
+    assert [entry[1] for entry in log if entry[0] == "parsed"] == ["t0", "t1"]
@@ -0,0 +1,91 @@
+import asyncio
+import operator
+import time
+
+import pytest
+
+from models.prediction_pool import PredictionPool, PredictionPoolBusy
+
+
+def test_pool_deduplicates_and_rejects_when_full():
+    pool = PredictionPool(max_workers=1, max_pending=1)
+
+    async def scenario():
+        first = asyncio.ensure_future(pool.run(("sleep", "a"), time.sleep, 0.5))
+        await asyncio.sleep(0)
+        duplicate = asyncio.ensure_future(pool.run(("sleep", "a"), time.sleep, 0.5))
+        await asyncio.sleep(0)
+        with pytest.raises(PredictionPoolBusy):
+            await pool.run(("sleep", "b"), time.sleep, 0.5)
+        await asyncio.gather(first, duplicate)
+        return await pool.run(("add",), operator.add, 2, 3)
+
+    try:
+        assert asyncio.run(scenario()) == 5
+    finally:
+        pool.shutdown()
+
+    stats = pool.stats()
+    assert stats["submitted"] == 2
+    assert stats["deduplicated"] == 1
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+    assert stats["pending"] == 0
+
+
+def test_model_cache_stats_sum_worker_reports_without_submitting():
+    pool = PredictionPool(max_workers=2, max_pending=1)
+    assert pool.model_cache_stats() is None
+
+    base = {"max_entries": 256, "max_bytes": 1000, "ttl_seconds": 60.0, "stores": 0,
+            "evictions": 0, "expirations": 0}
+    pool._record_cache((101, {**base, "entries": 2, "bytes": 300, "hits": 3, "misses": 1,
+                              "max_bytes_per_booster": 200}))
+    pool._record_cache((102, {**base, "entries": 1, "bytes": 100, "hits": 0, "misses": 1,
+                              "max_bytes_per_booster": 100}))
+    # 同一 worker 的新报告覆盖旧的
+    pool._record_cache((102, {**base, "entries": 2, "bytes": 300, "hits": 1, "misses": 2,
+                              "max_bytes_per_booster": 250}))
+
+    cache = pool.model_cache_stats()
+    assert cache["workers"] == 2
+    assert cache["entries"] == 4 and cache["bytes"] == 600
+    assert cache["max_entries"] == 512
+    assert cache["avg_bytes_per_booster"] == 150
+    assert cache["max_bytes_per_booster"] == 250
+    assert cache["hit_rate"] == round(4 / 7, 4)
+    assert pool.stats()["submitted"] == 0
+    assert pool._executor is None
+
+
+def test_items_are_deduplicated_across_single_and_batch_predictions():
+    pool = PredictionPool(max_workers=1, max_pending=4)
+    submitted = []
+
+    async def fake_run(key, fn, *args):
+        submitted.append(key)
+        await asyncio.sleep(0.05)
+        if key[0] == "batch_predict_range":
+            return {name: {"predicted": name} for name in args[0]}, (1, {})
+        return {"predicted": args[0]}, (1, {})
+
+    pool.run = fake_run
+
+    async def scenario():
+        single = asyncio.ensure_future(pool.predict_range("a"))
+        await asyncio.sleep(0)
+        first = asyncio.ensure_future(pool.batch_predict_range(["a", "b"]))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(pool.batch_predict_range(["b", "c"]))
+        return await asyncio.gather(single, first, second)
+
+    single, first, second = asyncio.run(scenario())
+
+    # 每个饰品只被提交一次：a 随单个预测，b 随第一个批量，c 随第二个批量
+    assert submitted == [("predict_range", "a"), ("batch_predict_range", ("b",)),
+                         ("batch_predict_range", ("c",))]
+    assert single == {"predicted": "a"}
+    assert first == {"a": {"predicted": "a"}, "b": {"predicted": "b"}}
+    assert second == {"b": {"predicted": "b"}, "c": {"predicted": "c"}}
+    assert pool.stats()["deduplicated"] == 2
+    assert pool._items == {}
@@ -0,0 +1,110 @@
+from datetime import datetime
+from decimal import Decimal
+
+import models.item_price_predictor as predictor_module
+from db.prediction_processor import PredictionProcessor
+
+
+def test_precompute_predicts_in_chunks_and_skips_failures(monkeypatch):
+    processor = PredictionProcessor()
+    processor.ensure_tables = lambda: None
+    processor.prune_unpredicted = lambda viewed_days: 0
+    processor.get_names_to_precompute = lambda viewed_days: ["a", "b", "c"]
+    chunks = []
+    saved = {}
+
+    def fake_batch(names):
+        chunks.append(list(names))
+        return {
+            name: None if name == "b" else {"predicted": 1.0, "lower": 0.9, "upper": 1.1, "confidence": "high"}
+            for name in names
+        }
+
+    def fake_save(predictions):
+        rows = {name: p for name, p in predictions.items() if p}
+        saved.update(rows)
+        return len(rows)
+
+    monkeypatch.setattr(predictor_module, "batch_predict_item_ranges", fake_batch)
+    processor.save_predictions = fake_save
+
+    stats = processor.precompute(chunk_size=2)
+
+    assert chunks == [["a", "b"], ["c"]]
+    assert set(saved) == {"a", "c"}
+    assert stats == {"total": 3, "saved": 2, "failed": 1}
+
+
+def test_prediction_rows_are_serialized_for_api():
+    prediction = PredictionProcessor._row_to_prediction(
+        {
+            "predicted": Decimal("105.20"),
+            "lower_bound": Decimal("99.00"),
+            "upper_bound": None,
+            "confidence": "medium",
+            "model_version": "20261018031500",
+            "as_of": 1791072000,
+            "predicted_at": datetime(2026, 10, 18, 3, 20),
+        }
+    )
+
+    assert prediction == {
+        "predicted": 105.2,
+        "lower": 99.0,
+        "upper": None,
+        "confidence": "medium",
+        "model_version": "20261018031500",
+        "as_of": 1791072000,
+        "predicted_at": "2026-10-18T03:20:00",
+    }
+
+
+class _RecordingCursor:
+    def __init__(self, statements):
+        self.statements = statements
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.statements.append((" ".join(sql.split()), list(params or [])))
+        return 0
+
+    def executemany(self, sql, rows):
+        self.statements.append((" ".join(sql.split()), list(rows)))
+
+    def fetchall(self):
+        return []
+
+
+class _RecordingConnection:
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self, *args):
+        return _RecordingCursor(self.statements)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_viewing_only_inserts_rows_for_known_items():
+    conn = _RecordingConnection()
+    processor = PredictionProcessor()
+    processor.get_db_connection = lambda: conn
+
+    assert processor.get_predictions(["AK-47 | Redline (Field-Tested)", "whatever"]) == {}
+
+    update, insert, select = [sql for sql, _ in conn.statements]
+    assert update.startswith("UPDATE item_price_prediction SET last_viewed_at = NOW()")
+    # 没有行的名称只有在 cs2_items 中存在时才会插入
+    assert insert.startswith("INSERT INTO item_price_prediction")
+    assert "SELECT c.market_hash_name, NOW() FROM cs2_items c" in insert
+    assert "VALUES" not in insert
+    assert select.startswith("SELECT")
@@ -0,0 +1,235 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import llm.agents.skin_investigator as investigator_module
+from app.integrations.quota import Priority, QuotaDeferred
+from llm.agents.skin_investigator import AsyncRateLimiter, SkinInvestigatorAgent
+
+KLINE = {"success": True, "data": [[1, 100.0, 0, 0, 0, 0, 5, 0], [2, 110.0, 0, 0, 0, 0, 7, 0]]}
+
+
+class _TaskProc:
+    def __init__(self, pending=()):
+        self.pending = list(pending)
+        self.claims = []
+        self.updates = []
+        self.update_agents = []
+
+    def claim_tasks(self, limit, assigned_agent, lease_seconds):
+        claimed, self.pending = self.pending[:limit], self.pending[limit:]
+        self.claims.append((limit, assigned_agent, lease_seconds))
+        return claimed
+
+    def update_task_statuses(self, updates, assigned_agent=None):
+        self.updates.append(list(updates))
+        self.update_agents.append(assigned_agent)
+
+
+class _EntityProc:
+    def __init__(self, entities):
+        self.entities = entities
+        self.lookups = 0
+        self.renamed = []
+
+    def get_skin_entities_by_ids(self, ids):
+        self.lookups += 1
+        return {i: self.entities[i] for i in ids if i in self.entities}
+
+    def update_market_hash_name(self, entity_id, name):
+        self.renamed.append((entity_id, name))
+
+
+class _DetailProc:
+    def __init__(self):
+        self.calls = []
+
+    def upsert_skin_details(self, platform, details):
+        self.calls.append(details)
+        return {d["skin_entity_id"]: 1000 + d["skin_entity_id"] for d in details}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    calls = {"fetch": [], "in_flight": 0, "peak": 0}
+
+    async def fake_fetch(market_hash_name, platform="BUFF", type_day="2"):
+        calls["fetch"].append(market_hash_name)
+        calls["in_flight"] += 1
+        calls["peak"] = max(calls["peak"], calls["in_flight"])
+        await asyncio.sleep(0.1)
+        calls["in_flight"] -= 1
+        return None if market_hash_name.startswith("Missing") else KLINE
+
+    async def fake_search(name):
+        return ""
+
+    async def admit(priority, bucket="single", max_wait=None):
+        assert priority == Priority.INVESTIGATOR
+
+    monkeypatch.setattr(investigator_module, "_fetch_kline_from_bufftracker", fake_fetch)
+    monkeypatch.setattr(investigator_module, "_search_hash_name_via_bufftracker", fake_search)
+    monkeypatch.setattr(investigator_module, "_lookup_full_hash_name", lambda name: name)
+    monkeypatch.setattr(investigator_module._bufftracker_client.quota, "acquire", admit)
+    return calls
+
+
+def _procs(n):
+    entities = {i: {"skin_name": f"饰品{i}", "market_hash_name": f"AK-47 | Skin {i}"} for i in range(1, n + 1)}
+    return _TaskProc(), _EntityProc(entities), _DetailProc()
+
+
+def _stats():
+    return {"total": 0, "succeeded": 0, "failed": 0, "skipped": 0, "deferred": 0}
+
+
+def test_batch_db_reads_and_writes_run_off_the_event_loop(upstream):
+    procs = _procs(2)
+    tasks = [{"id": 100 + i, "skin_entity_id": i} for i in range(1, 3)]
+    loop_thread = []
+    db_threads = []
+    for proc, method in [(procs[1], "get_skin_entities_by_ids"), (procs[2], "upsert_skin_details"),
+                         (procs[0], "update_task_statuses")]:
+        original = getattr(proc, method)
+
+        def tracked(*args, _original=original, **kwargs):
+            db_threads.append(threading.get_ident())
+            return _original(*args, **kwargs)
+
+        setattr(proc, method, tracked)
+
+    async def scenario():
+        loop_thread.append(threading.get_ident())
+        await SkinInvestigatorAgent(workers=2, rate_per_second=1000).investigate_batch(tasks, procs, _stats())
+
+    asyncio.run(scenario())
+
+    assert len(db_threads) == 3
+    assert loop_thread[0] not in db_threads
+
+
+def test_batch_is_investigated_concurrently_with_batched_writes(upstream):
+    procs = _procs(8)
+    procs[1].entities[7]["market_hash_name"] = "Missing | Skin"
+    del procs[1].entities[8]
+    tasks = [{"id": 100 + i, "skin_entity_id": i} for i in range(1, 9)]
+    agent = SkinInvestigatorAgent(workers=4, rate_per_second=1000)
+    stats = _stats()
+
+    started = time.monotonic()
+    asyncio.run(agent.investigate_batch(tasks, procs, stats))
+    elapsed = time.monotonic() - started
+
+    assert upstream["peak"] == 4
+    assert elapsed < 0.5  # 串行至少 0.7s
+    assert stats == {"total": 0, "succeeded": 6, "failed": 1, "skipped": 1, "deferred": 0}
+
+    task_proc, entity_proc, detail_proc = procs
+    assert task_proc.update_agents == [agent.agent_id]
+    assert entity_proc.lookups == 1
+    assert len(detail_proc.calls) == 1 and len(detail_proc.calls[0]) == 6
+    [updates] = task_proc.updates
+    by_id = {u["task_id"]: u for u in updates}
+    assert by_id[101]["status"] == "done"
+    assert by_id[101]["result_json"]["detail_id"] == 1001
+    assert by_id[101]["result_json"]["current_price"] == 110.0
+    assert by_id[107] == {"task_id": 107, "status": "failed", "error_message": "empty kline from bufftracker"}
+    assert by_id[108]["error_message"] == "entity not found"
+
+
+def test_quota_deferral_releases_remaining_tasks(upstream, monkeypatch):
+    admitted = []
+
+    async def admit_two(priority, bucket="single", max_wait=None):
+        if len(admitted) >= 2:
+            raise QuotaDeferred(priority, bucket, 0.1)
+        admitted.append(priority)
+
+    monkeypatch.setattr(investigator_module._bufftracker_client.quota, "acquire", admit_two)
+    procs = _procs(5)
+    tasks = [{"id": i, "skin_entity_id": i} for i in range(1, 6)]
+    stats = _stats()
+
+    asyncio.run(SkinInvestigatorAgent(workers=1, rate_per_second=1000).investigate_batch(tasks, procs, stats))
+
+    assert stats["succeeded"] == 2
+    assert stats["deferred"] == 3
+    statuses = [u["status"] for u in procs[0].updates[0]]
+    assert statuses.count("pending") == 3
+    assert len(upstream["fetch"]) == 2
+
+
+def test_failed_detail_write_returns_tasks_to_pending(upstream):
+    procs = _procs(3)
+    procs[2].upsert_skin_details = lambda platform, details: {}
+    tasks = [{"id": i, "skin_entity_id": i} for i in range(1, 4)]
+    stats = _stats()
+
+    asyncio.run(SkinInvestigatorAgent(workers=3, rate_per_second=1000).investigate_batch(tasks, procs, stats))
+
+    assert stats["succeeded"] == 0 and stats["failed"] == 3
+    [updates] = procs[0].updates
+    assert {u["status"] for u in updates} == {"pending"}
+    assert all(u["error_message"] == "skin_details write failed" for u in updates)
+
+
+def test_run_claims_tasks_with_agent_lease(upstream, monkeypatch):
+    from contextlib import nullcontext
+
+    procs = _procs(3)
+    procs[0].pending = [{"id": i, "skin_entity_id": i} for i in range(1, 4)]
+    agent = SkinInvestigatorAgent(batch_size=2, workers=2, rate_per_second=1000, lease_seconds=120)
+    monkeypatch.setattr(agent, "session", lambda: nullcontext(procs))
+
+    stats = agent.run_pending_tasks()
+
+    assert agent.agent_id.startswith(investigator_module.AGENT_ID + "@")
+    assert procs[0].claims == [(2, agent.agent_id, 120)]
+    assert stats["total"] == 2 and stats["succeeded"] == 2
+    assert [t["id"] for t in procs[0].pending] == [3]
+    assert procs[0].update_agents == [agent.agent_id]
+
+
+def test_session_migrates_task_table_before_claiming(monkeypatch):
+    created = []
+
+    class _Proc:
+        conn = object()
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def create_table_if_not_exists(self):
+            created.append(type(self).__name__)
+
+    for name in ("SkinSearchTaskProcessor", "SkinEntityProcessor", "SkinDetailProcessor"):
+        monkeypatch.setattr(investigator_module, name, type(name, (_Proc,), {}))
+
+    with SkinInvestigatorAgent().session() as procs:
+        assert procs is not None
+
+    assert created == ["SkinSearchTaskProcessor", "SkinDetailProcessor"]
+
+
+def test_rate_limiter_spaces_requests_across_workers():
+    limiter = AsyncRateLimiter(rate_per_second=20)
+    stamps = []
+
+    async def worker():
+        for _ in range(3):
+            await limiter.wait()
+            stamps.append(time.monotonic())
+
+    async def scenario():
+        await asyncio.gather(*(worker() for _ in range(3)))
+
+    asyncio.run(scenario())
+    stamps.sort()
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    assert len(stamps) == 9
+    assert min(gaps) >= 0.04
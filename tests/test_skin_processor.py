@@ -0,0 +1,84 @@
+import re
+
+from db.skin_processor import CLAIM_INDEX_COLUMNS, CLAIM_ORDER_BY, SkinSearchTaskProcessor
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append(" ".join(sql.split()))
+        self.result = self.conn.results.pop(0) if self.conn.results else None
+        return 0
+
+    def fetchone(self):
+        return self.result
+
+    def fetchall(self):
+        return self.result or []
+
+
+class _Connection:
+    def __init__(self, results=()):
+        self.statements = []
+        self.results = list(results)
+
+    def cursor(self, *args):
+        return _Cursor(self)
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def _processor(conn):
+    processor = SkinSearchTaskProcessor.__new__(SkinSearchTaskProcessor)
+    processor.conn = conn
+    return processor
+
+
+def _directions(columns):
+    """'a DESC, b' → [('a', 'DESC'), ('b', 'ASC')]"""
+    pairs = []
+    for part in columns.split(","):
+        tokens = part.split()
+        pairs.append((tokens[0], tokens[1].upper() if len(tokens) > 1 else "ASC"))
+    return pairs
+
+
+def test_claim_order_is_served_by_the_claim_index():
+    conn = _Connection(results=[None, []])
+    _processor(conn).claim_tasks(5, "agent@host:1", lease_seconds=60)
+
+    claim_sql = next(sql for sql in conn.statements if "FOR UPDATE SKIP LOCKED" in sql)
+    assert "FORCE INDEX (idx_status_priority)" in claim_sql
+    order_by = re.search(r"ORDER BY (.+?) LIMIT", claim_sql).group(1)
+    # 索引在 status 等值条件之后的列方向必须与 ORDER BY 完全一致，否则会 filesort 并锁住全部 pending 行
+    assert _directions(order_by) == _directions(CLAIM_INDEX_COLUMNS)[1:]
+    assert _directions(CLAIM_ORDER_BY) == [("priority", "DESC"), ("created_at", "ASC")]
+
+
+def test_migration_rebuilds_ascending_claim_index():
+    # lease 列已存在；旧索引的 priority 为升序（collation 'A'）
+    conn = _Connection(results=[(1,), ("A",)])
+    _processor(conn).ensure_lease_columns()
+
+    alter = conn.statements[-1]
+    assert alter.startswith("ALTER TABLE skin_search_tasks DROP INDEX idx_status_priority")
+    assert f"ADD INDEX idx_status_priority ({CLAIM_INDEX_COLUMNS})" in alter
+
+    conn = _Connection(results=[(1,), ("D",)])
+    _processor(conn).ensure_lease_columns()
+    assert not any(sql.startswith("ALTER") for sql in conn.statements)
@@ -0,0 +1,111 @@
+import warnings
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from models.train_model import forecast_future
+
+
+def _legacy_forecast(model, last_features, close_history, last_known_date, future_steps=30):
+    """改写前 train_and_predict 中的逐日递推实现，作为对照。"""
+    last_data_point_features = last_features.copy()
+    close_price_history = list(close_history)
+    records = []
+    for i in range(future_steps):
+        current_features = last_data_point_features
+        next_day_pred = model.predict(current_features)[0]
+        close_price_history.append(next_day_pred)
+        next_date = last_known_date + pd.Timedelta(days=i + 1)
+        next_features = current_features.copy()
+        next_features.index = [next_date]
+        next_features['day_of_week'] = next_date.dayofweek
+        next_features['month'] = next_date.month
+        next_features['year'] = next_date.year
+        temp_series = pd.Series(close_price_history)
+        for lag in [7, 14, 30]:
+            next_features[f'close_lag_{lag}'] = temp_series.shift(lag).iloc[-1]
+        for window in [7, 14, 30]:
+            next_features[f'close_rolling_mean_{window}'] = temp_series.rolling(window=window).mean().iloc[-1]
+            next_features[f'close_rolling_std_{window}'] = temp_series.rolling(window=window).std().iloc[-1]
+        record = {'day': next_date.strftime('%Y-%m-%d'), 'predicted_close_price': next_day_pred}
+        for window in [7, 14, 30]:
+            record[f'rolling_mean_{window}'] = next_features[f'close_rolling_mean_{window}'].iloc[0]
+            record[f'rolling_std_{window}'] = next_features[f'close_rolling_std_{window}'].iloc[0]
+        records.append(record)
+        last_data_point_features = next_features
+    return records
+
+
+def _training_frame(days=300):
+    rng = np.random.default_rng(3)
+    index = pd.date_range('2024-01-01', periods=days, freq='D', tz='Asia/Shanghai')
+    close = 1000 + np.cumsum(rng.normal(0, 5, days))
+    df = pd.DataFrame(
+        {'close_price': close, 'volume': rng.integers(100, 500, days).astype(float)}, index=index
+    )
+    df['day_of_week'] = df.index.dayofweek
+    df['month'] = df.index.month
+    df['year'] = df.index.year
+    for lag in [7, 14, 30]:
+        df[f'close_lag_{lag}'] = df['close_price'].shift(lag)
+    for window in [7, 14, 30]:
+        df[f'close_rolling_mean_{window}'] = df['close_price'].rolling(window=window).mean()
+        df[f'close_rolling_std_{window}'] = df['close_price'].rolling(window=window).std()
+        df[f'volume_rolling_mean_{window}'] = df['volume'].rolling(window=window).mean()
+    df['target'] = df['close_price'].shift(-1)
+    return df
+
+
+def test_forecast_future_matches_legacy_recursive_loop():
+    df = _training_frame()
+    train = df.dropna()
+    features = [col for col in train.columns if col != 'target']
+    model = lgb.LGBMRegressor(n_estimators=50, verbose=-1, seed=42)
+    model.fit(train[features], train['target'])
+
+    last_features = df[features].iloc[[-1]]
+    history = df['close_price'].to_numpy()
+    last_date = df.index[-1]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = _legacy_forecast(model, last_features, history, last_date)
+    actual = forecast_future(model, last_features, history, last_date)
+
+    assert [r['day'] for r in actual] == [r['day'] for r in expected]
+    assert list(actual[0]) == list(expected[0])
+    for got, want in zip(actual, expected):
+        for key in got:
+            if key != 'day':
+                assert np.isclose(got[key], want[key], rtol=1e-9), key
+
+
+def test_pipeline_runs_in_process_and_records_stage_timings(tmp_path, monkeypatch):
+    import models.train_model as train_module
+
+    rng = np.random.default_rng(5)
+    days = 200
+    close = 1000 + np.cumsum(rng.normal(0, 5, days))
+    frame = pd.DataFrame(
+        {
+            'timestamp': 1_700_000_000 + np.arange(days) * 86400,
+            'open_price': close,
+            'high_price': close + 3,
+            'low_price': close - 3,
+            'close_price': close,
+            'volume': rng.integers(100, 500, days).astype(float),
+            'turnover': close * 100,
+        }
+    )
+    saved = {}
+    monkeypatch.setattr(train_module, 'load_kline_frame', lambda: frame.copy())
+    monkeypatch.setattr(train_module, 'save_predictions_to_db', lambda df: saved.setdefault('df', df))
+
+    pipeline = train_module.TrainingPipeline(skip_fetch=True, output_dir=str(tmp_path))
+    result = pipeline.run()
+
+    assert len(result.predictions) == 30
+    assert saved['df'] is result.predictions
+    assert (tmp_path / 'next_month_prediction.csv').exists()
+    assert list(result.timings) == ['load_frame', 'features', 'train', 'predict', 'persist']
@@ -0,0 +1,53 @@
+import os
+
+import models.item_price_predictor as predictor_module
+from models.benchmark import synthetic_item_kline
+from models.item_price_predictor import ItemPricePredictor
+from models.model_cache import ModelCache
+from models.model_registry import ModelRegistry
+from models.tuning import build_dataset_cache, pareto_front, tune_item
+
+
+def test_dataset_cache_is_reused_until_new_rows(tmp_path):
+    kline = synthetic_item_kline(200)
+    first = build_dataset_cache("AK", kline, str(tmp_path))
+    assert first == build_dataset_cache("AK", kline, str(tmp_path))
+    other = build_dataset_cache("M4", kline, str(tmp_path))
+    newer = build_dataset_cache("AK", synthetic_item_kline(201), str(tmp_path))
+    assert newer != first
+    # 旧水位线的目录被删除，其他饰品的缓存保留
+    assert not os.path.exists(os.path.dirname(first[0]))
+    assert os.path.exists(other[0]) and os.path.exists(newer[0])
+
+
+def test_pareto_front_keeps_only_non_dominated_trials():
+    trials = [
+        {"seconds": 1.0, "rmse": 3.0},
+        {"seconds": 2.0, "rmse": 2.0},
+        {"seconds": 3.0, "rmse": 2.5},
+        {"seconds": 4.0, "rmse": 1.0},
+    ]
+    assert [t["rmse"] for t in pareto_front(trials)] == [3.0, 2.0, 1.0]
+
+
+def test_tuned_params_are_written_and_used_on_retrain(tmp_path, monkeypatch):
+    name = "AK-47 | Redline (Field-Tested)"
+    kline = synthetic_item_kline(300)
+    registry = ModelRegistry(str(tmp_path / "registry"))
+
+    report = tune_item(
+        name, kline, registry, cache_dir=str(tmp_path / "cache"),
+        n_trials=4, min_rounds=10, max_rounds=40, eta=2, budget_seconds=120, workers=2,
+    )
+
+    assert [r["rounds"] for r in report["rungs"]] == [10, 20, 40]
+    assert [r["submitted"] for r in report["rungs"]] == [4, 2, 1]
+    tuned = registry.tuned_params(name)
+    assert tuned["n_estimators"] == 40
+    assert tuned["learning_rate"] == report["best"]["params"]["learning_rate"]
+
+    monkeypatch.setattr(predictor_module, "_model_cache", ModelCache())
+    entry = ItemPricePredictor(registry, mode="per_item").train_for_item(name, num_threads=1, kline=kline)
+    assert entry.params["num_leaves"] == tuned["num_leaves"]
+    # 重训替换模型目录时保留 tuned.json
+    assert registry.tuned_params(name) == tuned